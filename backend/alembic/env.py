@@ -9,7 +9,7 @@ import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from app.database import Base
-from app.models import Survey, SurveyQuestion, SurveySubmission, SurveyAnswer, MediaFile
+from app.models import Survey, SurveyQuestion, SurveySubmission, SurveyAnswer, MediaFile, UploadSession, Job
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
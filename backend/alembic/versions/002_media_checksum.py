@@ -0,0 +1,25 @@
+"""Add size and checksum to media files
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-16 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('media_files', sa.Column('size_bytes', sa.BigInteger(), nullable=True))
+    op.add_column('media_files', sa.Column('checksum', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('media_files', 'checksum')
+    op.drop_column('media_files', 'size_bytes')
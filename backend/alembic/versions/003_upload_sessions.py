@@ -0,0 +1,40 @@
+"""Add upload sessions for resumable uploads
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'upload_sessions',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('submission_id', sa.Integer(), nullable=False),
+        sa.Column('type', sa.String(), nullable=False),
+        sa.Column('question_number', sa.Integer(), nullable=True),
+        sa.Column('offset', sa.BigInteger(), nullable=False),
+        sa.Column('total_size', sa.BigInteger(), nullable=True),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('media_file_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['media_file_id'], ['media_files.id'], ),
+        sa.ForeignKeyConstraint(['submission_id'], ['survey_submissions.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_upload_sessions_submission_id'), 'upload_sessions', ['submission_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_upload_sessions_submission_id'), table_name='upload_sessions')
+    op.drop_table('upload_sessions')
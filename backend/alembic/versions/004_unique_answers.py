@@ -0,0 +1,37 @@
+"""Unique answer per submission and question
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-16 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Keep only the most recent answer where duplicates slipped in
+    op.execute(
+        """
+        DELETE FROM survey_answers a
+        USING survey_answers b
+        WHERE a.submission_id = b.submission_id
+          AND a.question_id = b.question_id
+          AND a.id < b.id
+        """
+    )
+    op.create_unique_constraint(
+        'uq_survey_answers_submission_question',
+        'survey_answers',
+        ['submission_id', 'question_id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_survey_answers_submission_question', 'survey_answers', type_='unique')
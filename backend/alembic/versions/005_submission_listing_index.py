@@ -0,0 +1,36 @@
+"""Composite index for paginated submission listing
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Built concurrently so existing deployments keep accepting submissions
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_survey_submissions_survey_started',
+            'survey_submissions',
+            ['survey_id', sa.text('started_at DESC'), sa.text('id DESC')],
+            unique=False,
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_survey_submissions_survey_started',
+            table_name='survey_submissions',
+            postgresql_concurrently=True
+        )
@@ -0,0 +1,34 @@
+"""Server-side face verification results on answers
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('survey_answers', sa.Column('server_face_detected', sa.Boolean(), nullable=True))
+    op.add_column('survey_answers', sa.Column('server_face_score', sa.Float(), nullable=True))
+    # Lets verification find unverified answers without scanning the table
+    op.create_index(
+        'ix_survey_answers_face_unverified',
+        'survey_answers',
+        ['id'],
+        unique=False,
+        postgresql_where=sa.text('face_image_path IS NOT NULL AND server_face_detected IS NULL')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_survey_answers_face_unverified', table_name='survey_answers')
+    op.drop_column('survey_answers', 'server_face_score')
+    op.drop_column('survey_answers', 'server_face_detected')
@@ -0,0 +1,32 @@
+"""Question number and path index on media files, for content-addressed storage
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-16 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('media_files', sa.Column('question_number', sa.Integer(), nullable=True))
+    # Deleting an object checks whether any row still references its path
+    op.create_index('ix_media_files_path', 'media_files', ['path'], unique=False)
+
+    # Existing files carry the question number in their name ("..._q3_...")
+    op.execute(
+        "UPDATE media_files SET question_number = substring(path from '_q([0-9]+)_')::integer "
+        "WHERE path ~ '_q[0-9]+_'"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_media_files_path', table_name='media_files')
+    op.drop_column('media_files', 'question_number')
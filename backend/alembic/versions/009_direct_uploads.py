@@ -0,0 +1,23 @@
+"""Storage key on upload sessions, for direct-to-storage uploads
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-16 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('upload_sessions', sa.Column('storage_key', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('upload_sessions', 'storage_key')
@@ -0,0 +1,46 @@
+"""Tombstones on surveys and submissions, and the deletions progress table
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-16 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('surveys', sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('survey_submissions', sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+    # Batched deletes select a submission's media rows by submission
+    op.create_index('ix_media_files_submission_id', 'media_files', ['submission_id'], unique=False)
+
+    op.create_table(
+        'deletions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('target', sa.String(), nullable=False),
+        sa.Column('target_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('submissions_total', sa.Integer(), nullable=False),
+        sa.Column('submissions_deleted', sa.Integer(), nullable=False),
+        sa.Column('files_total', sa.Integer(), nullable=False),
+        sa.Column('files_deleted', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_deletions_id'), 'deletions', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_deletions_id'), table_name='deletions')
+    op.drop_table('deletions')
+    op.drop_index('ix_media_files_submission_id', table_name='media_files')
+    op.drop_column('survey_submissions', 'deleted_at')
+    op.drop_column('surveys', 'deleted_at')
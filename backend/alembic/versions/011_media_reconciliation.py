@@ -0,0 +1,23 @@
+"""Index on upload session storage keys, for media reconciliation
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Reconciliation looks up scanned keys among direct uploads in progress
+    op.create_index('ix_upload_sessions_storage_key', 'upload_sessions', ['storage_key'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_upload_sessions_storage_key', table_name='upload_sessions')
@@ -0,0 +1,78 @@
+"""Rollup tables for survey answer analytics
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-16 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'question_answer_stats',
+        sa.Column('question_id', sa.Integer(), nullable=False),
+        sa.Column('score_bucket', sa.Integer(), nullable=False),
+        sa.Column('survey_id', sa.Integer(), nullable=False),
+        sa.Column('answers', sa.Integer(), nullable=False),
+        sa.Column('yes_answers', sa.Integer(), nullable=False),
+        sa.Column('face_detected', sa.Integer(), nullable=False),
+        sa.Column('face_score_sum', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['question_id'], ['survey_questions.id'], ),
+        sa.ForeignKeyConstraint(['survey_id'], ['surveys.id'], ),
+        sa.PrimaryKeyConstraint('question_id', 'score_bucket')
+    )
+    op.create_index(
+        op.f('ix_question_answer_stats_survey_id'), 'question_answer_stats', ['survey_id'], unique=False
+    )
+    op.create_table(
+        'survey_stats',
+        sa.Column('survey_id', sa.Integer(), nullable=False),
+        sa.Column('started', sa.Integer(), nullable=False),
+        sa.Column('completed', sa.Integer(), nullable=False),
+        sa.Column('scored', sa.Integer(), nullable=False),
+        sa.Column('overall_score_sum', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['survey_id'], ['surveys.id'], ),
+        sa.PrimaryKeyConstraint('survey_id')
+    )
+
+    # Backfill from the existing rows (the same aggregation as rebuild-analytics)
+    op.execute("""
+        INSERT INTO question_answer_stats
+            (question_id, score_bucket, survey_id, answers, yes_answers, face_detected, face_score_sum)
+        SELECT a.question_id,
+               CASE WHEN a.face_score IS NULL THEN -1
+                    WHEN a.face_score >= 100 THEN 100
+                    ELSE CAST(FLOOR(a.face_score) AS INTEGER) END AS bucket,
+               q.survey_id,
+               COUNT(*),
+               SUM(CASE WHEN a.answer = 'Yes' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN a.face_detected THEN 1 ELSE 0 END),
+               COALESCE(SUM(a.face_score), 0)
+        FROM survey_answers a
+        JOIN survey_questions q ON q.id = a.question_id
+        GROUP BY a.question_id, bucket, q.survey_id
+    """)
+    op.execute("""
+        INSERT INTO survey_stats (survey_id, started, completed, scored, overall_score_sum)
+        SELECT survey_id,
+               COUNT(*),
+               COUNT(completed_at),
+               SUM(CASE WHEN completed_at IS NOT NULL AND overall_score IS NOT NULL THEN 1 ELSE 0 END),
+               COALESCE(SUM(CASE WHEN completed_at IS NOT NULL THEN overall_score END), 0)
+        FROM survey_submissions
+        GROUP BY survey_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('survey_stats')
+    op.drop_index(op.f('ix_question_answer_stats_survey_id'), table_name='question_answer_stats')
+    op.drop_table('question_answer_stats')
@@ -0,0 +1,60 @@
+"""Hourly and daily submission rollups, with the watermarks of the job maintaining them
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-16 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+ROLLUP_TABLES = ('submission_rollups_hourly', 'submission_rollups_daily')
+
+
+def upgrade() -> None:
+    for table in ROLLUP_TABLES:
+        op.create_table(
+            table,
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('survey_id', sa.Integer(), nullable=False),
+            sa.Column('bucket_start', sa.DateTime(timezone=True), nullable=False),
+            sa.Column('device', sa.String(), nullable=False),
+            sa.Column('browser', sa.String(), nullable=False),
+            sa.Column('os', sa.String(), nullable=False),
+            sa.Column('location', sa.String(), nullable=False),
+            sa.Column('starts', sa.Integer(), nullable=False),
+            sa.Column('completions', sa.Integer(), nullable=False),
+            sa.Column('scored', sa.Integer(), nullable=False),
+            sa.Column('overall_score_sum', sa.Float(), nullable=False),
+            sa.Column('duration_histogram', sa.JSON(), nullable=False),
+            sa.ForeignKeyConstraint(['survey_id'], ['surveys.id'], ),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint(
+                'survey_id', 'bucket_start', 'device', 'browser', 'os', 'location', name=f'uq_{table}_key'
+            )
+        )
+    op.create_table(
+        'rollup_watermarks',
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('position_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('position_id', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+    # The rollup job reads new starts and completions in order; existing rows
+    # are folded in by its first runs, starting from an empty watermark
+    op.create_index('ix_survey_submissions_started_id', 'survey_submissions', ['started_at', 'id'], unique=False)
+    op.create_index('ix_survey_submissions_completed_id', 'survey_submissions', ['completed_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_survey_submissions_completed_id', table_name='survey_submissions')
+    op.drop_index('ix_survey_submissions_started_id', table_name='survey_submissions')
+    op.drop_table('rollup_watermarks')
+    for table in ROLLUP_TABLES:
+        op.drop_table(table)
@@ -0,0 +1,23 @@
+"""Claim marker for face verification batches
+
+Revision ID: 014
+Revises: 013
+Create Date: 2026-10-16 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '014'
+down_revision = '013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('survey_answers', sa.Column('face_verify_claimed_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('survey_answers', 'face_verify_claimed_at')
@@ -0,0 +1,37 @@
+"""Spread each survey's submission totals over several rows
+
+Revision ID: 015
+Revises: 014
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '015'
+down_revision = '014'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing totals become shard 0
+    op.add_column('survey_stats', sa.Column('shard', sa.Integer(), nullable=False, server_default='0'))
+    op.alter_column('survey_stats', 'shard', server_default=None)
+    op.drop_constraint('survey_stats_pkey', 'survey_stats', type_='primary')
+    op.create_primary_key('survey_stats_pkey', 'survey_stats', ['survey_id', 'shard'])
+
+
+def downgrade() -> None:
+    # Fold the shards back into one row per survey
+    op.execute("""
+        INSERT INTO survey_stats (survey_id, shard, started, completed, scored, overall_score_sum)
+        SELECT survey_id, -1, SUM(started), SUM(completed), SUM(scored), SUM(overall_score_sum)
+        FROM survey_stats
+        GROUP BY survey_id
+    """)
+    op.execute("DELETE FROM survey_stats WHERE shard <> -1")
+    op.drop_constraint('survey_stats_pkey', 'survey_stats', type_='primary')
+    op.drop_column('survey_stats', 'shard')
+    op.create_primary_key('survey_stats_pkey', 'survey_stats', ['survey_id'])
@@ -0,0 +1,144 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Optional
+from app.database import get_async_db
+from app.utils.profiling import TimedRoute
+from app.api.surveys import get_survey_with_questions
+from app.jobs.queue import utcnow
+from app.jobs.rollup import ROLLUPS, as_utc, bucket_start, rollup_watermark
+from app.models.survey import Survey
+from app.schemas.analytics import QuestionAnalytics, SurveyAnalyticsResponse, TimeSeriesPoint, TimeSeriesResponse
+from app.utils.analytics import (
+    duration_bucket_value, histogram_percentile, load_question_stats, load_survey_totals, merge_histograms,
+    score_percentiles
+)
+import os
+
+router = APIRouter(route_class=TimedRoute)
+
+# Most buckets one time series request may span
+TIMESERIES_MAX_BUCKETS = int(os.getenv("TIMESERIES_MAX_BUCKETS", "1000"))
+# Range returned when none is given
+TIMESERIES_DEFAULT_RANGE = {"hour": timedelta(hours=48), "day": timedelta(days=30)}
+
+
+def ratio(part: float, whole: float):
+    return part / whole if whole else None
+
+
+@router.get("/surveys/{survey_id}/analytics", response_model=SurveyAnalyticsResponse)
+async def get_survey_analytics(survey_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Answer statistics for a survey: per-question splits, face detection and score distribution.
+
+    Read from rollups maintained as answers arrive, so the cost doesn't grow
+    with the number of responses. Answers of unfinished submissions count
+    too; ``completion_rate`` is completed over started submissions.
+    """
+    survey = await get_survey_with_questions(db, survey_id)
+    totals = await load_survey_totals(db, survey_id)
+    question_stats = await load_question_stats(db, survey_id)
+    
+    questions = []
+    for question in survey.questions:
+        stats = question_stats[question.id]
+        scored = sum(stats["histogram"].values())
+        questions.append(QuestionAnalytics(
+            question_id=question.id,
+            question_order=question.order,
+            question_text=question.question_text,
+            answers=stats["answers"],
+            yes_answers=stats["yes_answers"],
+            no_answers=stats["answers"] - stats["yes_answers"],
+            face_detected=stats["face_detected"],
+            face_detected_ratio=ratio(stats["face_detected"], stats["answers"]),
+            face_scores=scored,
+            face_score_mean=ratio(stats["face_score_sum"], scored),
+            face_score_percentiles=score_percentiles(stats["histogram"])
+        ))
+    
+    return SurveyAnalyticsResponse(
+        survey_id=survey_id,
+        started=totals["started"],
+        completed=totals["completed"],
+        completion_rate=ratio(totals["completed"], totals["started"]),
+        overall_score_mean=ratio(totals["overall_score_sum"], totals["scored"]),
+        questions=questions
+    )
+
+
+@router.get("/surveys/{survey_id}/timeseries", response_model=TimeSeriesResponse)
+async def get_survey_timeseries(
+    survey_id: int,
+    interval: str = Query("hour", pattern="^(hour|day)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    group_by: Optional[str] = Query(None, pattern="^(device|browser|os|location)$"),
+    device: Optional[str] = None,
+    browser: Optional[str] = None,
+    os: Optional[str] = None,
+    location: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Starts, completions, median time to complete and mean overall score per hour or day.
+
+    Read from the rollups of the ``analytics.rollup`` job, never from the
+    submissions. ``start``/``end`` (UTC unless they carry an offset) default
+    to the last 48 hours or 30 days. With ``group_by`` there is one point per
+    bucket and value of that dimension; the dimension parameters filter on an
+    exact value. Buckets without submissions are left out. Submissions from
+    ``complete_until`` on have not been counted yet.
+    """
+    survey = await db.get(Survey, survey_id)
+    if not survey or survey.deleted_at:
+        raise HTTPException(status_code=404, detail="Survey not found")
+    
+    step = timedelta(hours=1) if interval == "hour" else timedelta(days=1)
+    end = as_utc(end) if end else bucket_start(utcnow(), interval) + step
+    start = as_utc(start) if start else end - TIMESERIES_DEFAULT_RANGE[interval]
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if (end - start) / step > TIMESERIES_MAX_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range spans more than {TIMESERIES_MAX_BUCKETS} buckets; use a shorter range or interval=day"
+        )
+    
+    rollup = ROLLUPS[interval]
+    stmt = select(rollup).where(
+        rollup.survey_id == survey_id,
+        rollup.bucket_start >= bucket_start(start, interval),
+        rollup.bucket_start < end
+    )
+    filters = {"device": device, "browser": browser, "os": os, "location": location}
+    for dimension, value in filters.items():
+        if value is not None:
+            stmt = stmt.where(getattr(rollup, dimension) == value)
+    
+    # Rows are per combination of all dimensions; merge them into the requested groups
+    groups = defaultdict(list)
+    for row in await db.scalars(stmt):
+        groups[(as_utc(row.bucket_start), getattr(row, group_by) if group_by else None)].append(row)
+    
+    points = []
+    for (bucket, group), rows in sorted(groups.items(), key=lambda item: (item[0][0], item[0][1] or "")):
+        scored = sum(row.scored for row in rows)
+        median_bucket = histogram_percentile(merge_histograms(row.duration_histogram for row in rows), 50)
+        points.append(TimeSeriesPoint(
+            bucket_start=bucket,
+            group=group,
+            starts=sum(row.starts for row in rows),
+            completions=sum(row.completions for row in rows),
+            median_completion_seconds=duration_bucket_value(median_bucket) if median_bucket is not None else None,
+            overall_score_mean=ratio(sum(row.overall_score_sum for row in rows), scored)
+        ))
+    
+    return TimeSeriesResponse(
+        survey_id=survey_id,
+        interval=interval,
+        group_by=group_by,
+        complete_until=await rollup_watermark(db),
+        points=points
+    )
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
+from app.utils.profiling import TimedRoute
+from app.models.deletion import Deletion
+from app.schemas.deletion import DeletionResponse
+
+router = APIRouter(route_class=TimedRoute)
+
+
+@router.get("/deletions/{deletion_id}", response_model=DeletionResponse)
+async def get_deletion(deletion_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Progress of a survey or submission deletion.
+
+    ``status`` goes from ``deleting_rows`` (submissions removed in batches)
+    to ``deleting_files`` (queued files being removed) to ``completed``.
+    """
+    deletion = await db.get(Deletion, deletion_id)
+    if not deletion:
+        raise HTTPException(status_code=404, detail="Deletion not found")
+    return deletion
@@ -1,37 +1,96 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request, UploadFile, File, Form
-from sqlalchemy.orm import Session
-from app.database import get_db
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Request, UploadFile, File, Form, Query
+from sqlalchemy import select, func, update, case, and_, Float
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from app.database import get_async_db, AsyncSessionLocal, dialect_insert
+from app.utils.profiling import TimedRoute
 from app.models.submission import SurveySubmission, SurveyAnswer, MediaFile
 from app.models.survey import Survey, SurveyQuestion
+from app.models.upload import UploadSession
 from app.schemas.submission import (
     SubmissionStartResponse, AnswerSubmit, AnswerResponse,
+    AnswerBatchSubmit, AnswerBatchResponse,
     MediaResponse, SubmissionComplete, SubmissionResponse,
     SubmissionDetailResponse, SubmissionListResponse, AnswerWithQuestion
 )
-from app.utils.metadata import extract_metadata
-from app.utils.media import save_media_file
-from fastapi.responses import FileResponse, StreamingResponse
+from app.schemas.deletion import DeletionResponse
+from app.utils.metadata import extract_metadata, get_location_from_ip_async
+from app.utils.media import (
+    MediaTooLargeError, stream_upload_to_disk, remove_file_quietly,
+    guess_media_type, is_immutable_media_path
+)
+from app.storage import STORAGE_URL_EXPIRES, get_storage, store_media_file
+from app.utils.http import file_response
+from app.utils.thumbnails import InvalidVariantError, get_image_variant
+from fastapi.responses import RedirectResponse, StreamingResponse
+from app.utils.zipstream import ZipEntry, stream_zip
+from app.utils.metrics import EXPORT_DURATION, EXPORT_SIZE
+from app.jobs import discard_files, enqueue_face_verification, start_deletion
+from app.utils.analytics import record_answers, record_submission_started, record_submission_completed
+from app.utils.face_verification import face_verification_available
+from app.utils.pagination import (
+    InvalidCursorError, encode_cursor, decode_cursor, keyset_after, sortable_timestamp, count_rows
+)
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional
 import os
-import zipfile
+import io
+import csv
 import json
-from io import BytesIO
+import time
 from datetime import datetime
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+
+# Survey-wide exports read rows in batches through a server-side cursor and
+# read media files on a bounded thread pool
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+EXPORT_READ_WORKERS = int(os.getenv("EXPORT_READ_WORKERS", "8"))
+_export_executor = ThreadPoolExecutor(max_workers=EXPORT_READ_WORKERS, thread_name_prefix="export-read")
+
+# Submission listing page sizes
+SUBMISSION_PAGE_SIZE = int(os.getenv("SUBMISSION_PAGE_SIZE", "50"))
+SUBMISSION_PAGE_MAX_SIZE = int(os.getenv("SUBMISSION_PAGE_MAX_SIZE", "200"))
+
+ANSWER_CSV_COLUMNS = [
+    "submission_id", "started_at", "completed_at", "device", "browser", "os", "location",
+    "overall_score", "question_order", "question_text", "answer", "face_detected", "face_score"
+]
+
+
+async def enrich_submission_location(submission_id: int, ip_address: str):
+    """Resolve the submission's location after the response has been sent."""
+    location = await get_location_from_ip_async(ip_address)
+    
+    async with AsyncSessionLocal() as db:
+        try:
+            await db.execute(
+                update(SurveySubmission)
+                .where(SurveySubmission.id == submission_id)
+                .values(location=location)
+            )
+            await db.commit()
+        except Exception as e:
+            print(f"Error updating location for submission {submission_id}: {e}")
 
 
 @router.post("/surveys/{survey_id}/start", response_model=SubmissionStartResponse, status_code=status.HTTP_201_CREATED)
-async def start_submission(survey_id: int, request: Request, db: Session = Depends(get_db)):
+async def start_submission(
+    survey_id: int,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db)
+):
     """Start a new survey submission."""
     # Check if survey exists and is active
-    survey = db.query(Survey).filter(Survey.id == survey_id).first()
-    if not survey:
+    survey = await db.get(Survey, survey_id)
+    if not survey or survey.deleted_at:
         raise HTTPException(status_code=404, detail="Survey not found")
     
     if not survey.is_active:
         raise HTTPException(status_code=400, detail="Survey is not published")
     
-    # Extract metadata
+    # Extract metadata (location comes from cache or background enrichment)
     metadata = extract_metadata(request)
     
     # Create submission
@@ -44,8 +103,11 @@ async def start_submission(survey_id: int, request: Request, db: Session = Depen
         location=metadata["location"]
     )
     db.add(submission)
-    db.commit()
-    db.refresh(submission)
+    await record_submission_started(db, survey_id)
+    await db.commit()
+    
+    if submission.location is None:
+        background_tasks.add_task(enrich_submission_location, submission.id, metadata["ip_address"])
     
     return SubmissionStartResponse(
         submission_id=submission.id,
@@ -54,54 +116,163 @@ async def start_submission(survey_id: int, request: Request, db: Session = Depen
     )
 
 
+async def get_live_submission(
+    db: AsyncSession,
+    submission_id: int,
+    *options,
+    for_update: bool = False
+) -> Optional[SurveySubmission]:
+    """Load a submission, or None if it doesn't exist or it (or its survey) is being deleted.
+
+    With ``for_update`` the submission row stays locked until the transaction ends.
+    """
+    stmt = (
+        select(SurveySubmission)
+        .options(*options)
+        .join(Survey, Survey.id == SurveySubmission.survey_id)
+        .where(
+            SurveySubmission.id == submission_id,
+            SurveySubmission.deleted_at.is_(None),
+            Survey.deleted_at.is_(None)
+        )
+    )
+    if for_update:
+        stmt = stmt.with_for_update(of=SurveySubmission)
+    return await db.scalar(stmt)
+
+
+async def upsert_answers(db: AsyncSession, submission_id: int, answers: List[AnswerSubmit]) -> list:
+    """Insert or update answers for a submission in a single statement.
+
+    The INSERT ... SELECT only produces rows for questions of the
+    submission's survey while the submission is still open, so validation
+    and the write happen in one round-trip. Returns the written rows.
+    
+    The answers being replaced are read first, under a lock on the
+    submission, so the survey analytics can swap their contribution for
+    that of the new answers in the same transaction.
+    """
+    question_ids = [a.question_id for a in answers]
+    if len(set(question_ids)) != len(question_ids):
+        raise HTTPException(status_code=400, detail="Duplicate question in answers")
+    
+    current = (await db.execute(
+        select(
+            SurveySubmission.survey_id,
+            SurveyAnswer.question_id,
+            SurveyAnswer.answer,
+            SurveyAnswer.face_detected,
+            SurveyAnswer.face_score
+        )
+        .outerjoin(SurveyAnswer, and_(
+            SurveyAnswer.submission_id == SurveySubmission.id,
+            SurveyAnswer.question_id.in_(question_ids)
+        ))
+        .where(SurveySubmission.id == submission_id)
+        .with_for_update(of=SurveySubmission)
+    )).mappings().all()
+    if not current:
+        raise HTTPException(status_code=404, detail="Submission not found")
+    previous = [row for row in current if row["question_id"] is not None]
+    
+    by_question = {a.question_id: a for a in answers}
+    answer_value = case({qid: a.answer for qid, a in by_question.items()}, value=SurveyQuestion.id)
+    face_detected_value = case({qid: a.face_detected for qid, a in by_question.items()}, value=SurveyQuestion.id)
+    face_score_value = case(
+        {qid: a.face_score for qid, a in by_question.items()},
+        value=SurveyQuestion.id
+    ).cast(Float)
+    
+    rows = (
+        select(
+            SurveySubmission.id,
+            SurveyQuestion.id,
+            answer_value,
+            face_detected_value,
+            face_score_value
+        )
+        .join(SurveyQuestion, SurveyQuestion.survey_id == SurveySubmission.survey_id)
+        .join(Survey, Survey.id == SurveySubmission.survey_id)
+        .where(
+            SurveySubmission.id == submission_id,
+            SurveySubmission.completed_at.is_(None),
+            SurveySubmission.deleted_at.is_(None),
+            Survey.deleted_at.is_(None),
+            SurveyQuestion.id.in_(question_ids)
+        )
+    )
+    insert = dialect_insert(db)
+    stmt = insert(SurveyAnswer).from_select(
+        ["submission_id", "question_id", "answer", "face_detected", "face_score"],
+        rows
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SurveyAnswer.submission_id, SurveyAnswer.question_id],
+        set_={
+            "answer": stmt.excluded.answer,
+            "face_detected": stmt.excluded.face_detected,
+            "face_score": stmt.excluded.face_score,
+        }
+    ).returning(*SurveyAnswer.__table__.c)
+    written = (await db.execute(stmt)).mappings().all()
+    
+    if len(written) != len(answers):
+        # Something didn't validate; nothing is kept. Work out what to report.
+        await db.rollback()
+        submission = await get_live_submission(db, submission_id)
+        if not submission:
+            raise HTTPException(status_code=404, detail="Submission not found")
+        if submission.completed_at:
+            raise HTTPException(status_code=400, detail="Submission already completed")
+        raise HTTPException(status_code=404, detail="Question not found")
+    
+    await record_answers(db, current[0]["survey_id"], previous, written)
+    await db.commit()
+    written_by_question = {row["question_id"]: row for row in written}
+    return [written_by_question[qid] for qid in question_ids]
+
+
 @router.post("/submissions/{submission_id}/answers", response_model=AnswerResponse, status_code=status.HTTP_201_CREATED)
 async def submit_answer(
     submission_id: int,
     answer_data: AnswerSubmit,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Submit an answer for a question."""
-    # Check if submission exists
-    submission = db.query(SurveySubmission).filter(SurveySubmission.id == submission_id).first()
-    if not submission:
-        raise HTTPException(status_code=404, detail="Submission not found")
-    
-    # Check if submission is already completed
-    if submission.completed_at:
-        raise HTTPException(status_code=400, detail="Submission already completed")
-    
-    # Check if question exists and belongs to the survey
-    question = db.query(SurveyQuestion).filter(SurveyQuestion.id == answer_data.question_id).first()
-    if not question or question.survey_id != submission.survey_id:
-        raise HTTPException(status_code=404, detail="Question not found")
-    
-    # Check if answer already exists for this question
-    existing_answer = db.query(SurveyAnswer).filter(
-        SurveyAnswer.submission_id == submission_id,
-        SurveyAnswer.question_id == answer_data.question_id
-    ).first()
-    
-    if existing_answer:
-        # Update existing answer
-        existing_answer.answer = answer_data.answer
-        existing_answer.face_detected = answer_data.face_detected
-        existing_answer.face_score = answer_data.face_score
-        db.commit()
-        db.refresh(existing_answer)
-        return existing_answer
-    
-    # Create new answer
-    answer = SurveyAnswer(
-        submission_id=submission_id,
-        question_id=answer_data.question_id,
-        answer=answer_data.answer,
-        face_detected=answer_data.face_detected,
-        face_score=answer_data.face_score
+    """Submit (or replace) an answer for a question."""
+    written = await upsert_answers(db, submission_id, [answer_data])
+    return written[0]
+
+
+@router.post("/submissions/{submission_id}/answers:batch", response_model=AnswerBatchResponse, status_code=status.HTTP_201_CREATED)
+async def submit_answers_batch(
+    submission_id: int,
+    batch_data: AnswerBatchSubmit,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Submit (or replace) several answers at once; either all are written or none."""
+    written = await upsert_answers(db, submission_id, batch_data.answers)
+    return AnswerBatchResponse(answers=written)
+
+
+async def attach_face_image(db: AsyncSession, submission: SurveySubmission, question_number: int, key: str):
+    """Point the answer for a question (by order) at an uploaded face image."""
+    # Find the answer for the question with this order
+    answer = await db.scalar(
+        select(SurveyAnswer)
+        .join(SurveyQuestion, SurveyQuestion.id == SurveyAnswer.question_id)
+        .where(
+            SurveyAnswer.submission_id == submission.id,
+            SurveyQuestion.survey_id == submission.survey_id,
+            SurveyQuestion.order == question_number
+        )
     )
-    db.add(answer)
-    db.commit()
-    db.refresh(answer)
-    return answer
+    if answer:
+        # Store relative path for URL access
+        answer.face_image_path = get_storage().media_url(key)
+        # A new image needs verifying again
+        answer.server_face_detected = None
+        answer.server_face_score = None
+        answer.face_verify_claimed_at = None
 
 
 @router.post("/submissions/{submission_id}/media", response_model=MediaResponse, status_code=status.HTTP_201_CREATED)
@@ -110,15 +281,11 @@ async def upload_media(
     file: UploadFile = File(...),
     type: str = Form(...),
     question_number: int = Form(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Upload media file (video or image)."""
-    # File size limits (in bytes)
-    MAX_VIDEO_SIZE = 100 * 1024 * 1024  # 100MB
-    MAX_IMAGE_SIZE = 10 * 1024 * 1024    # 10MB
-    
     # Check if submission exists
-    submission = db.query(SurveySubmission).filter(SurveySubmission.id == submission_id).first()
+    submission = await get_live_submission(db, submission_id)
     if not submission:
         raise HTTPException(status_code=404, detail="Submission not found")
     
@@ -132,69 +299,43 @@ async def upload_media(
     if type == "image" and file.content_type and not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="Invalid image file type")
     
-    # Read file content with size limit
-    max_size = MAX_VIDEO_SIZE if type == "video" else MAX_IMAGE_SIZE
-    file_content = b""
-    total_size = 0
+    # Stream to disk chunk by chunk, enforcing the size limit as we go
+    try:
+        stored = await stream_upload_to_disk(file, type)
+    except MediaTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     
-    # Stream read to avoid loading entire file into memory at once
-    while True:
-        chunk = await file.read(1024 * 1024)  # Read 1MB chunks
-        if not chunk:
-            break
-        total_size += len(chunk)
-        if total_size > max_size:
-            raise HTTPException(
-                status_code=413,
-                detail=f"File too large. Maximum size for {type} is {max_size // (1024 * 1024)}MB"
-            )
-        file_content += chunk
-    
-    # Save file
-    file_path = save_media_file(
-        file_content,
-        submission_id,
-        type,
-        question_number
-    )
+    # Move into the content-addressed store; identical bytes are stored once
+    try:
+        file_path = await store_media_file(db, stored.path, stored.checksum, type)
+    except BaseException:
+        await remove_file_quietly(stored.path)
+        raise
     
     # Create media file record
     media_file = MediaFile(
         submission_id=submission_id,
         type=type,
-        path=file_path
+        path=file_path,
+        question_number=question_number,
+        size_bytes=stored.size,
+        checksum=stored.checksum
     )
     db.add(media_file)
     
     # If this is an image and we have a question_number, update the answer's face_image_path
     if type == "image" and question_number:
-        # Find the question by order
-        submission = db.query(SurveySubmission).filter(SurveySubmission.id == submission_id).first()
-        if submission:
-            question = db.query(SurveyQuestion).filter(
-                SurveyQuestion.survey_id == submission.survey_id,
-                SurveyQuestion.order == question_number
-            ).first()
-            if question:
-                # Find the answer for this question
-                answer = db.query(SurveyAnswer).filter(
-                    SurveyAnswer.submission_id == submission_id,
-                    SurveyAnswer.question_id == question.id
-                ).first()
-                if answer:
-                    # Store relative path for URL access
-                    from app.utils.media import get_media_root
-                    media_root = get_media_root()
-                    # Convert absolute path to relative path
-                    if file_path.startswith(media_root):
-                        relative_path = file_path[len(media_root):].lstrip(os.sep).replace(os.sep, "/")
-                    else:
-                        # If already relative, use as is
-                        relative_path = file_path.replace(os.sep, "/")
-                    answer.face_image_path = f"/api/media/{relative_path}"
-    
-    db.commit()
-    db.refresh(media_file)
+        await attach_face_image(db, submission, question_number, file_path)
+    
+    try:
+        await db.commit()
+    except Exception:
+        # Don't leave an orphaned file behind if the row was never written
+        # (it is only removed if no other media file shares it)
+        await db.rollback()
+        await discard_files([file_path])
+        raise
+    await db.refresh(media_file)
     
     return media_file
 
@@ -203,11 +344,11 @@ async def upload_media(
 async def complete_submission(
     submission_id: int,
     complete_data: SubmissionComplete,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Complete a survey submission."""
-    # Check if submission exists
-    submission = db.query(SurveySubmission).filter(SurveySubmission.id == submission_id).first()
+    # Check if submission exists; locked so it is only counted as completed once
+    submission = await get_live_submission(db, submission_id, for_update=True)
     if not submission:
         raise HTTPException(status_code=404, detail="Submission not found")
     
@@ -216,7 +357,9 @@ async def complete_submission(
         raise HTTPException(status_code=400, detail="Submission already completed")
     
     # Check if all 5 answers are submitted
-    answer_count = db.query(SurveyAnswer).filter(SurveyAnswer.submission_id == submission_id).count()
+    answer_count = await db.scalar(
+        select(func.count()).select_from(SurveyAnswer).where(SurveyAnswer.submission_id == submission_id)
+    )
     if answer_count < 5:
         raise HTTPException(
             status_code=400,
@@ -226,29 +369,38 @@ async def complete_submission(
     # Update submission
     submission.completed_at = datetime.utcnow()
     submission.overall_score = complete_data.overall_score
-    db.commit()
-    db.refresh(submission)
+    await record_submission_completed(db, submission.survey_id, submission.overall_score)
+    if face_verification_available():
+        enqueue_face_verification(db)
+    await db.commit()
     
     return submission
 
 
-@router.get("/submissions/{submission_id}", response_model=SubmissionDetailResponse)
-async def get_submission(submission_id: int, db: Session = Depends(get_db)):
-    """Get a single submission with answers."""
-    submission = db.query(SurveySubmission).filter(SurveySubmission.id == submission_id).first()
+async def load_submission(db: AsyncSession, submission_id: int, with_media: bool = False) -> SurveySubmission:
+    """Load a submission with its answers and their questions, or raise 404.
+
+    Answers (with questions joined in) and, if requested, media files are
+    each fetched with one extra query.
+    """
+    options = [selectinload(SurveySubmission.answers).joinedload(SurveyAnswer.question)]
+    if with_media:
+        options.append(selectinload(SurveySubmission.media_files))
+    submission = await get_live_submission(db, submission_id, *options)
     if not submission:
         raise HTTPException(status_code=404, detail="Submission not found")
-    
-    # Get answers with questions
-    answers = db.query(SurveyAnswer).filter(SurveyAnswer.submission_id == submission_id).all()
-    questions = {q.id: q for q in db.query(SurveyQuestion).filter(
-        SurveyQuestion.survey_id == submission.survey_id
-    ).all()}
+    return submission
+
+
+@router.get("/submissions/{submission_id}", response_model=SubmissionDetailResponse)
+async def get_submission(submission_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Get a single submission with answers."""
+    submission = await load_submission(db, submission_id, with_media=False)
     
     # Build answer list with question text
     answer_list = []
-    for answer in sorted(answers, key=lambda x: questions[x.question_id].order):
-        question = questions[answer.question_id]
+    for answer in sorted(submission.answers, key=lambda x: x.question.order):
+        question = answer.question
         answer_list.append(AnswerWithQuestion(
             id=answer.id,
             question_id=answer.question_id,
@@ -257,7 +409,9 @@ async def get_submission(submission_id: int, db: Session = Depends(get_db)):
             answer=answer.answer,
             face_detected=answer.face_detected,
             face_score=answer.face_score,
-            face_image_path=answer.face_image_path
+            face_image_path=answer.face_image_path,
+            server_face_detected=answer.server_face_detected,
+            server_face_score=answer.server_face_score
         ))
     
     return SubmissionDetailResponse(
@@ -275,65 +429,144 @@ async def get_submission(submission_id: int, db: Session = Depends(get_db)):
     )
 
 
+def filter_submissions(
+    stmt,
+    completed: Optional[bool],
+    started_from: Optional[datetime],
+    started_to: Optional[datetime],
+    device: Optional[str],
+    browser: Optional[str],
+    location: Optional[str],
+    min_score: Optional[float],
+    max_score: Optional[float]
+):
+    """Apply the submission listing filters to a statement over SurveySubmission."""
+    if completed is True:
+        stmt = stmt.where(SurveySubmission.completed_at.isnot(None))
+    elif completed is False:
+        stmt = stmt.where(SurveySubmission.completed_at.is_(None))
+    if started_from:
+        stmt = stmt.where(SurveySubmission.started_at >= started_from)
+    if started_to:
+        stmt = stmt.where(SurveySubmission.started_at < started_to)
+    if device:
+        stmt = stmt.where(SurveySubmission.device == device)
+    if browser:
+        stmt = stmt.where(SurveySubmission.browser == browser)
+    if location:
+        stmt = stmt.where(SurveySubmission.location.ilike(f"%{location}%"))
+    if min_score is not None:
+        stmt = stmt.where(SurveySubmission.overall_score >= min_score)
+    if max_score is not None:
+        stmt = stmt.where(SurveySubmission.overall_score <= max_score)
+    return stmt
+
+
 @router.get("/surveys/{survey_id}/submissions", response_model=SubmissionListResponse)
-async def get_submissions_by_survey(survey_id: int, db: Session = Depends(get_db)):
-    """Get all submissions for a survey."""
+async def get_submissions_by_survey(
+    survey_id: int,
+    limit: int = Query(SUBMISSION_PAGE_SIZE, ge=1, le=SUBMISSION_PAGE_MAX_SIZE),
+    cursor: Optional[str] = None,
+    completed: Optional[bool] = None,
+    started_from: Optional[datetime] = None,
+    started_to: Optional[datetime] = None,
+    device: Optional[str] = None,
+    browser: Optional[str] = None,
+    location: Optional[str] = None,
+    min_score: Optional[float] = Query(None, ge=0, le=100),
+    max_score: Optional[float] = Query(None, ge=0, le=100),
+    include_total: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a page of submissions for a survey, newest first.
+
+    Pass the returned ``next_cursor`` back as ``cursor`` to get the next
+    page. With ``include_total`` the response carries the number of matching
+    submissions; for large surveys this is the planner's estimate.
+    """
     # Check if survey exists
-    survey = db.query(Survey).filter(Survey.id == survey_id).first()
-    if not survey:
+    survey = await db.get(Survey, survey_id)
+    if not survey or survey.deleted_at:
         raise HTTPException(status_code=404, detail="Survey not found")
     
-    # Get all submissions for this survey
-    submissions = db.query(SurveySubmission).filter(
-        SurveySubmission.survey_id == survey_id
-    ).order_by(SurveySubmission.started_at.desc()).all()
-    
-    return SubmissionListResponse(submissions=submissions)
-
-
-@router.delete("/submissions/{submission_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_submission(submission_id: int, db: Session = Depends(get_db)):
-    """Delete a submission and all associated data."""
-    submission = db.query(SurveySubmission).filter(SurveySubmission.id == submission_id).first()
-    if not submission:
-        raise HTTPException(status_code=404, detail="Submission not found")
+    stmt = filter_submissions(
+        select(SurveySubmission).where(
+            SurveySubmission.survey_id == survey_id,
+            SurveySubmission.deleted_at.is_(None)
+        ),
+        completed, started_from, started_to, device, browser, location, min_score, max_score
+    )
     
-    # Delete associated media files from filesystem
-    media_files = db.query(MediaFile).filter(MediaFile.submission_id == submission_id).all()
-    for media_file in media_files:
-        if os.path.exists(media_file.path):
-            try:
-                os.remove(media_file.path)
-            except Exception as e:
-                print(f"Error deleting media file {media_file.path}: {e}")
+    total = None
+    total_is_estimate = False
+    if include_total and not cursor:
+        total, total_is_estimate = await count_rows(db, stmt, approximate=True)
     
-    # Delete submission (cascade will delete answers and media_file records)
-    db.delete(submission)
-    db.commit()
+    page_stmt = stmt.order_by(
+        sortable_timestamp(db.bind.dialect.name, SurveySubmission.started_at).desc(), SurveySubmission.id.desc()
+    )
+    if cursor:
+        try:
+            after_started_at, after_id = decode_cursor(cursor)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        page_stmt = page_stmt.where(keyset_after(
+            db.bind.dialect.name,
+            SurveySubmission.started_at, SurveySubmission.id,
+            after_started_at, after_id
+        ))
     
-    return None
+    # Fetch one extra row to know whether another page follows
+    submissions = (await db.scalars(page_stmt.limit(limit + 1))).all()
+    next_cursor = None
+    if len(submissions) > limit:
+        submissions = submissions[:limit]
+        last = submissions[-1]
+        next_cursor = encode_cursor(last.started_at, last.id)
+    
+    return SubmissionListResponse(
+        submissions=submissions,
+        next_cursor=next_cursor,
+        total=total,
+        total_is_estimate=total_is_estimate
+    )
 
 
-@router.get("/submissions/{submission_id}/export")
-async def export_submission(submission_id: int, db: Session = Depends(get_db)):
-    """Export submission as ZIP file."""
-    # Get submission
-    submission = db.query(SurveySubmission).filter(SurveySubmission.id == submission_id).first()
+@router.delete("/submissions/{submission_id}", response_model=DeletionResponse, status_code=status.HTTP_202_ACCEPTED)
+async def delete_submission(submission_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Delete a submission and all associated data.
+    
+    The submission is hidden immediately; its rows and files are removed in
+    the background. Progress is at ``GET /api/deletions/{id}``.
+    """
+    submission = await get_live_submission(db, submission_id)
     if not submission:
         raise HTTPException(status_code=404, detail="Submission not found")
     
-    # Get survey
-    survey = db.query(Survey).filter(Survey.id == submission.survey_id).first()
-    
-    # Get answers with questions
-    answers = db.query(SurveyAnswer).filter(SurveyAnswer.submission_id == submission_id).all()
-    questions = {q.id: q for q in db.query(SurveyQuestion).filter(
-        SurveyQuestion.survey_id == submission.survey_id
-    ).all()}
-    
-    # Get media files
-    media_files = db.query(MediaFile).filter(MediaFile.submission_id == submission_id).all()
+    deletion = await start_deletion(db, "submission", submission_id)
+    await db.commit()
+    await db.refresh(deletion)
     
+    return deletion
+
+
+def media_entry(name: str, key: str) -> ZipEntry:
+    """Archive member for a stored media file, read from disk when the backend keeps one."""
+    storage = get_storage()
+    path = storage.local_path(key)
+    if path:
+        return ZipEntry(name, path=path)
+    return ZipEntry(name, chunks=storage.read(key))
+
+
+def build_export_entries(
+    submission: SurveySubmission,
+    answers: List[SurveyAnswer],
+    questions: Dict[int, SurveyQuestion],
+    media_files: List[MediaFile],
+    prefix: str = ""
+) -> List[ZipEntry]:
+    """Build the archive members (metadata.json, video, face images) for a submission."""
     # Build metadata JSON
     responses = []
     for answer in sorted(answers, key=lambda x: questions[x.question_id].order):
@@ -342,7 +575,7 @@ async def export_submission(submission_id: int, db: Session = Depends(get_db)):
         
         # Find face image for this question
         for media in media_files:
-            if media.type == "image" and f"_q{question.order}_" in media.path:
+            if media.type == "image" and media.question_number == question.order:
                 face_image_path = f"/images/q{question.order}_face.png"
                 break
         
@@ -355,7 +588,7 @@ async def export_submission(submission_id: int, db: Session = Depends(get_db)):
         })
     
     metadata = {
-        "submission_id": str(submission_id),
+        "submission_id": str(submission.id),
         "survey_id": str(submission.survey_id),
         "started_at": submission.started_at.isoformat() + "Z",
         "completed_at": submission.completed_at.isoformat() + "Z" if submission.completed_at else None,
@@ -368,51 +601,48 @@ async def export_submission(submission_id: int, db: Session = Depends(get_db)):
         "overall_score": submission.overall_score
     }
     
-    # Create ZIP file - use ZIP_STORED (no compression) for faster generation
-    # Compression saves space but takes time, ZIP_STORED is instant
-    zip_buffer = BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_STORED) as zip_file:
-        # Add metadata.json
-        zip_file.writestr("metadata.json", json.dumps(metadata, indent=2))
-        
-        # Pre-organize files for better performance
-        video_files = [m for m in media_files if m.type == "video"]
-        image_files = [m for m in media_files if m.type == "image"]
-        
-        # Add full session video only (assignment requirement - no question-specific videos)
-        full_video = None
-        for media in video_files:
-            if os.path.exists(media.path) and os.path.getsize(media.path) > 0:
-                if "full" in media.path.lower():
-                    full_video = media.path
-                    break
-        
-        if full_video:
-            try:
-                zip_file.write(full_video, "videos/full_session.mp4")
-            except Exception as e:
-                print(f"Error adding full video to ZIP: {e}")
-        
-        # Add face images
-        for media in image_files:
-            if os.path.exists(media.path) and os.path.getsize(media.path) > 0:
-                # Determine question number from path
-                question_num = None
-                for answer in answers:
-                    q = questions[answer.question_id]
-                    if f"_q{q.order}_" in media.path:
-                        question_num = q.order
-                        break
-                if question_num:
-                    try:
-                        zip_file.write(media.path, f"images/q{question_num}_face.png")
-                    except Exception as e:
-                        print(f"Error adding image {media.path} to ZIP: {e}")
-    
-    zip_buffer.seek(0)
+    entries = [ZipEntry(f"{prefix}metadata.json", data=json.dumps(metadata, indent=2).encode("utf-8"))]
+    
+    # Add full session video only (assignment requirement - no question-specific videos)
+    for media in media_files:
+        if media.type == "video" and media.question_number is None:
+            entries.append(media_entry(f"{prefix}videos/full_session.mp4", media.path))
+            break
+    
+    # Add face images of answered questions
+    answered = {questions[answer.question_id].order for answer in answers}
+    for media in media_files:
+        if media.type == "image" and media.question_number in answered:
+            entries.append(media_entry(f"{prefix}images/q{media.question_number}_face.png", media.path))
+    
+    return entries
+
+
+async def metered_export(chunks: AsyncIterator[bytes], kind: str) -> AsyncIterator[bytes]:
+    """Pass an export stream through, recording its duration and size once it ends."""
+    started = time.perf_counter()
+    size = 0
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            yield chunk
+    finally:
+        EXPORT_DURATION.labels(kind).observe(time.perf_counter() - started)
+        EXPORT_SIZE.labels(kind).observe(size)
+
+
+@router.get("/submissions/{submission_id}/export")
+async def export_submission(submission_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Export submission as ZIP file."""
+    submission = await load_submission(db, submission_id, with_media=True)
+    questions = {answer.question_id: answer.question for answer in submission.answers}
+    
+    # Files are read from disk in chunks while the ZIP is streamed, so memory
+    # stays flat and the first byte goes out at once
+    entries = build_export_entries(submission, submission.answers, questions, submission.media_files)
     
     return StreamingResponse(
-        zip_buffer,
+        metered_export(stream_zip(entries), "submission"),
         media_type="application/zip",
         headers={
             "Content-Disposition": f"attachment; filename=submission_{submission_id}_export.zip"
@@ -420,77 +650,208 @@ async def export_submission(submission_id: int, db: Session = Depends(get_db)):
     )
 
 
-@router.get("/submissions/{submission_id}/media/{media_id}")
+def filter_export_submissions(
+    stmt,
+    completed_only: bool,
+    started_from: Optional[datetime],
+    started_to: Optional[datetime],
+    completed_from: Optional[datetime],
+    completed_to: Optional[datetime]
+):
+    """Apply the survey export filters to a statement over SurveySubmission."""
+    if completed_only:
+        stmt = stmt.where(SurveySubmission.completed_at.isnot(None))
+    if started_from:
+        stmt = stmt.where(SurveySubmission.started_at >= started_from)
+    if started_to:
+        stmt = stmt.where(SurveySubmission.started_at < started_to)
+    if completed_from:
+        stmt = stmt.where(SurveySubmission.completed_at >= completed_from)
+    if completed_to:
+        stmt = stmt.where(SurveySubmission.completed_at < completed_to)
+    return stmt
+
+
+@router.get("/surveys/{survey_id}/export")
+async def export_survey(
+    survey_id: int,
+    completed_only: bool = False,
+    started_from: Optional[datetime] = None,
+    started_to: Optional[datetime] = None,
+    completed_from: Optional[datetime] = None,
+    completed_to: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Export all submissions of a survey as a single streamed ZIP file.
+
+    The archive contains ``answers.csv`` (one row per answer) followed by
+    ``submissions/<id>/`` folders with each submission's metadata.json, full
+    session video and face images. Date ranges are half-open ``[from, to)``
+    so consecutive incremental exports don't overlap.
+    """
+    survey = await db.get(Survey, survey_id)
+    if not survey or survey.deleted_at:
+        raise HTTPException(status_code=404, detail="Survey not found")
+    
+    questions = {q.id: q for q in await db.scalars(
+        select(SurveyQuestion).where(SurveyQuestion.survey_id == survey_id)
+    )}
+    
+    def submissions_stmt(stmt):
+        stmt = stmt.where(SurveySubmission.survey_id == survey_id, SurveySubmission.deleted_at.is_(None))
+        stmt = filter_export_submissions(
+            stmt, completed_only, started_from, started_to, completed_from, completed_to
+        )
+        return stmt.execution_options(yield_per=EXPORT_BATCH_SIZE)
+    
+    async def answer_rows():
+        stmt = submissions_stmt(
+            select(SurveySubmission, SurveyAnswer)
+            .join(SurveyAnswer, SurveyAnswer.submission_id == SurveySubmission.id)
+            .join(SurveyQuestion, SurveyQuestion.id == SurveyAnswer.question_id)
+            .order_by(SurveySubmission.id, SurveyQuestion.order)
+        )
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(ANSWER_CSV_COLUMNS)
+        async for rows in (await db.stream(stmt)).partitions():
+            for submission, answer in rows:
+                question = questions[answer.question_id]
+                writer.writerow([
+                    submission.id,
+                    submission.started_at.isoformat() if submission.started_at else "",
+                    submission.completed_at.isoformat() if submission.completed_at else "",
+                    submission.device,
+                    submission.browser,
+                    submission.os,
+                    submission.location,
+                    submission.overall_score,
+                    question.order,
+                    question.question_text,
+                    answer.answer,
+                    answer.face_detected,
+                    answer.face_score
+                ])
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue().encode("utf-8")
+    
+    async def entries():
+        yield ZipEntry("answers.csv", chunks=answer_rows())
+        
+        stmt = submissions_stmt(select(SurveySubmission).order_by(SurveySubmission.id))
+        async for batch in (await db.stream_scalars(stmt)).partitions():
+            ids = [submission.id for submission in batch]
+            answers_by_submission: Dict[int, List[SurveyAnswer]] = {}
+            for answer in await db.scalars(select(SurveyAnswer).where(SurveyAnswer.submission_id.in_(ids))):
+                answers_by_submission.setdefault(answer.submission_id, []).append(answer)
+            media_by_submission: Dict[int, List[MediaFile]] = {}
+            for media in await db.scalars(select(MediaFile).where(MediaFile.submission_id.in_(ids))):
+                media_by_submission.setdefault(media.submission_id, []).append(media)
+            
+            for submission in batch:
+                for entry in build_export_entries(
+                    submission,
+                    answers_by_submission.get(submission.id, []),
+                    questions,
+                    media_by_submission.get(submission.id, []),
+                    prefix=f"submissions/{submission.id}/"
+                ):
+                    yield entry
+    
+    return StreamingResponse(
+        metered_export(stream_zip(entries(), executor=_export_executor, prefetch=EXPORT_READ_WORKERS), "survey"),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f"attachment; filename=survey_{survey_id}_export.zip"
+        }
+    )
+
+
+async def media_response(request: Request, key: str, filename: Optional[str] = None):
+    """Serve a stored media file: from disk, or by redirecting to a presigned URL."""
+    storage = get_storage()
+    media_type = guess_media_type(key)
+    url = await storage.presign_download(key, media_type, filename)
+    if url:
+        # The URL expires, so the redirect may only be reused for part of its lifetime
+        return RedirectResponse(
+            url,
+            status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+            headers={"Cache-Control": f"private, max-age={STORAGE_URL_EXPIRES // 2}"}
+        )
+    
+    try:
+        return await file_response(
+            request,
+            storage.local_path(key),
+            media_type=media_type,
+            immutable=is_immutable_media_path(key),
+            filename=filename
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Media file not found")
+
+
+@router.api_route("/submissions/{submission_id}/media/{media_id}", methods=["GET", "HEAD"])
 async def get_media_file(
     submission_id: int,
     media_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Serve a media file (image or video)."""
+    """Serve a media file (image or video), with byte-range support."""
     # Check if submission exists
-    submission = db.query(SurveySubmission).filter(SurveySubmission.id == submission_id).first()
+    submission = await get_live_submission(db, submission_id)
     if not submission:
         raise HTTPException(status_code=404, detail="Submission not found")
     
     # Get media file
-    media_file = db.query(MediaFile).filter(
+    media_file = await db.scalar(select(MediaFile).where(
         MediaFile.id == media_id,
         MediaFile.submission_id == submission_id
-    ).first()
+    ))
     
     if not media_file:
         raise HTTPException(status_code=404, detail="Media file not found")
     
-    if not os.path.exists(media_file.path):
-        raise HTTPException(status_code=404, detail="Media file not found on disk")
-    
-    # Determine media type
-    media_type = "image/png" if media_file.type == "image" else "video/mp4"
-    
-    return FileResponse(
-        media_file.path,
-        media_type=media_type,
-        filename=os.path.basename(media_file.path)
-    )
+    return await media_response(request, media_file.path, os.path.basename(media_file.path))
 
 
-@router.get("/media/{path:path}")
-async def serve_media_file(path: str):
-    """Serve media files by path."""
-    from app.utils.media import get_media_root
-    
-    media_root = get_media_root()
-    
-    # Handle both relative paths (images/...) and full paths
-    # Path comes as "images/submission_XX_qX_face_...png" from face_image_path
-    if os.path.isabs(path) and path.startswith(media_root):
-        # Full absolute path provided
-        file_path = path
-    else:
-        # Relative path provided (e.g., "images/submission_XX_qX_face_...png")
-        # Normalize path separators
-        path = path.replace("\\", "/").lstrip("/")
-        file_path = os.path.join(media_root, path)
-    
-    # Security check: ensure file is within media root
-    abs_media_root = os.path.abspath(media_root)
-    abs_file_path = os.path.abspath(file_path)
-    if not abs_file_path.startswith(abs_media_root):
+@router.api_route("/media/{path:path}", methods=["GET", "HEAD"])
+async def serve_media_file(
+    path: str,
+    request: Request,
+    w: Optional[int] = Query(None, description="Resize images to this width (see THUMBNAIL_WIDTHS)"),
+    fmt: Optional[str] = Query(None, description="Re-encode images as webp, jpeg or png")
+):
+    """Serve media files by path, with byte-range support.
+    
+    Images can be requested as a resized/re-encoded variant with ``w`` and
+    ``fmt``, e.g. ``/api/media/images/<name>?w=160&fmt=webp``. With a storage
+    backend that presigns downloads, originals are a redirect to the storage
+    service; variants are always served from the local cache.
+    """
+    # Path comes as "images/submission_XX_qX_face_...png" from face_image_path;
+    # the backend rejects anything outside the store (and in-progress uploads)
+    try:
+        key = get_storage().key_from_url_path(path)
+    except ValueError:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    if not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail=f"File not found: {file_path}")
-    
-    # Determine media type from extension
-    if file_path.endswith(('.png', '.jpg', '.jpeg', '.gif')):
-        media_type = "image/png" if file_path.endswith('.png') else "image/jpeg"
-    elif file_path.endswith(('.mp4', '.webm')):
-        media_type = "video/mp4"
-    else:
-        media_type = "application/octet-stream"
-    
-    return FileResponse(
-        file_path,
-        media_type=media_type,
-        filename=os.path.basename(file_path)
-    )
+    if w is not None or fmt is not None:
+        if not guess_media_type(key).startswith("image/"):
+            raise HTTPException(status_code=400, detail="Resizing is only available for images")
+        try:
+            variant_path, media_type = await get_image_variant(key, w, fmt or "webp")
+        except InvalidVariantError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Media file not found")
+        except OSError:
+            raise HTTPException(status_code=415, detail="File is not a readable image")
+        # A variant changes only when its source does, so it is cached like the source
+        return await file_response(request, variant_path, media_type=media_type, immutable=is_immutable_media_path(key))
+    
+    return await media_response(request, key, os.path.basename(key))
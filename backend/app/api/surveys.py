@@ -1,52 +1,135 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import Optional, Tuple
+from app.database import get_async_db
+from app.utils.profiling import TimedRoute
 from app.models.survey import Survey, SurveyQuestion
-from app.schemas.survey import SurveyCreate, SurveyResponse, QuestionCreate, QuestionResponse, SurveyPublish
+from app.schemas.survey import (
+    SurveyCreate, SurveyResponse, SurveyListResponse, QuestionCreate, QuestionResponse, SurveyPublish
+)
+from app.schemas.deletion import DeletionResponse
+from app.jobs import start_deletion
+from app.utils.pagination import InvalidCursorError, encode_cursor, decode_cursor, keyset_after, sortable_timestamp
+from app.utils.cache import load_cache_backend
+from app.utils.http import make_etag, etag_matches
+import os
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
+# Survey listing page sizes
+SURVEY_PAGE_SIZE = int(os.getenv("SURVEY_PAGE_SIZE", "50"))
+SURVEY_PAGE_MAX_SIZE = int(os.getenv("SURVEY_PAGE_MAX_SIZE", "200"))
 
-@router.get("/surveys", response_model=List[SurveyResponse])
-async def list_surveys(db: Session = Depends(get_db)):
-    """List all surveys with their questions."""
-    surveys = db.query(Survey).order_by(Survey.created_at.desc()).all()
+# Serialized survey definitions are cached per worker (or in a shared backend,
+# see load_cache_backend). Writes invalidate the entry in this worker; the TTL
+# bounds how long other workers can serve a stale copy.
+SURVEY_CACHE_BACKEND = os.getenv("SURVEY_CACHE_BACKEND", "memory")
+SURVEY_CACHE_SIZE = int(os.getenv("SURVEY_CACHE_SIZE", "1000"))
+SURVEY_CACHE_TTL = float(os.getenv("SURVEY_CACHE_TTL", "60"))
+# How long browsers and CDNs may reuse a published survey without revalidating
+SURVEY_CACHE_MAX_AGE = int(os.getenv("SURVEY_CACHE_MAX_AGE", "60"))
+
+survey_cache = load_cache_backend(SURVEY_CACHE_BACKEND, maxsize=SURVEY_CACHE_SIZE, ttl=SURVEY_CACHE_TTL)
+
+
+def survey_cache_key(survey_id: int) -> str:
+    return f"survey:{survey_id}"
+
+
+def pack_survey_entry(is_active: bool, body: bytes) -> bytes:
+    """Cache entry for a serialized survey: a header line with what each hit needs, then the body.
+
+    The header holds the published flag and the ETag, so serving a hit
+    neither parses nor hashes the body.
+    """
+    return (b"1" if is_active else b"0") + make_etag(body).encode() + b"\n" + body
+
+
+def unpack_survey_entry(entry: bytes) -> Tuple[bool, str, bytes]:
+    """``(is_active, etag, body)`` of a cache entry."""
+    header, body = entry.split(b"\n", 1)
+    return header[:1] == b"1", header[1:].decode(), body
+
+
+async def invalidate_survey(survey_id: int) -> None:
+    """Drop a cached survey definition after it has been changed."""
+    await survey_cache.delete(survey_cache_key(survey_id))
+
+
+async def get_survey_with_questions(db: AsyncSession, survey_id: int) -> Survey:
+    """Load a survey with its questions (ordered), or raise 404."""
+    survey = await db.scalar(
+        select(Survey)
+        .options(selectinload(Survey.questions))
+        .where(Survey.id == survey_id, Survey.deleted_at.is_(None))
+    )
+    if not survey:
+        raise HTTPException(status_code=404, detail="Survey not found")
+    return survey
+
+
+@router.get("/surveys", response_model=SurveyListResponse)
+async def list_surveys(
+    limit: int = Query(SURVEY_PAGE_SIZE, ge=1, le=SURVEY_PAGE_MAX_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """List surveys with their questions, newest first, one page at a time.
+
+    Questions for the whole page are loaded with a single extra query.
+    """
+    stmt = (
+        select(Survey)
+        .options(selectinload(Survey.questions))
+        .where(Survey.deleted_at.is_(None))
+        .order_by(sortable_timestamp(db.bind.dialect.name, Survey.created_at).desc(), Survey.id.desc())
+    )
+    if cursor:
+        try:
+            after_created_at, after_id = decode_cursor(cursor)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        stmt = stmt.where(keyset_after(
+            db.bind.dialect.name, Survey.created_at, Survey.id, after_created_at, after_id
+        ))
     
-    # Load questions for each survey
-    for survey in surveys:
-        questions = db.query(SurveyQuestion).filter(
-            SurveyQuestion.survey_id == survey.id
-        ).order_by(SurveyQuestion.order).all()
-        survey.questions = questions
+    # Fetch one extra row to know whether another page follows
+    surveys = (await db.scalars(stmt.limit(limit + 1))).all()
+    next_cursor = None
+    if len(surveys) > limit:
+        surveys = surveys[:limit]
+        next_cursor = encode_cursor(surveys[-1].created_at, surveys[-1].id)
     
-    return surveys
+    return SurveyListResponse(surveys=surveys, next_cursor=next_cursor)
 
 
 @router.post("/surveys", response_model=SurveyResponse, status_code=status.HTTP_201_CREATED)
-async def create_survey(survey_data: SurveyCreate, db: Session = Depends(get_db)):
+async def create_survey(survey_data: SurveyCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new survey."""
     survey = Survey(title=survey_data.title, is_active=False)
     db.add(survey)
-    db.commit()
-    db.refresh(survey)
-    return survey
+    await db.commit()
+    return await get_survey_with_questions(db, survey.id)
 
 
 @router.post("/surveys/{survey_id}/questions", response_model=QuestionResponse, status_code=status.HTTP_201_CREATED)
 async def add_question(
     survey_id: int,
     question_data: QuestionCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Add a question to a survey."""
     # Check if survey exists
-    survey = db.query(Survey).filter(Survey.id == survey_id).first()
-    if not survey:
+    survey = await db.get(Survey, survey_id)
+    if not survey or survey.deleted_at:
         raise HTTPException(status_code=404, detail="Survey not found")
     
     # Check if survey already has 5 questions
-    existing_questions = db.query(SurveyQuestion).filter(SurveyQuestion.survey_id == survey_id).count()
+    existing_questions = await db.scalar(
+        select(func.count()).select_from(SurveyQuestion).where(SurveyQuestion.survey_id == survey_id)
+    )
     if existing_questions >= 5:
         raise HTTPException(
             status_code=400,
@@ -54,10 +137,12 @@ async def add_question(
         )
     
     # Check if order already exists
-    existing_order = db.query(SurveyQuestion).filter(
-        SurveyQuestion.survey_id == survey_id,
-        SurveyQuestion.order == question_data.order
-    ).first()
+    existing_order = await db.scalar(
+        select(SurveyQuestion).where(
+            SurveyQuestion.survey_id == survey_id,
+            SurveyQuestion.order == question_data.order
+        )
+    )
     if existing_order:
         raise HTTPException(
             status_code=400,
@@ -70,40 +155,48 @@ async def add_question(
         order=question_data.order
     )
     db.add(question)
-    db.commit()
-    db.refresh(question)
+    await db.commit()
+    await invalidate_survey(survey_id)
     return question
 
 
 @router.get("/surveys/{survey_id}", response_model=SurveyResponse)
-async def get_survey(survey_id: int, db: Session = Depends(get_db)):
-    """Get survey details with questions."""
-    survey = db.query(Survey).filter(Survey.id == survey_id).first()
-    if not survey:
-        raise HTTPException(status_code=404, detail="Survey not found")
-    
-    # Load questions
-    questions = db.query(SurveyQuestion).filter(
-        SurveyQuestion.survey_id == survey_id
-    ).order_by(SurveyQuestion.order).all()
+async def get_survey(survey_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Get survey details with questions.
+
+    Served from the survey cache when possible. Responses carry an ETag, and a
+    matching ``If-None-Match`` gets a 304. Published surveys may be cached by
+    clients for ``SURVEY_CACHE_MAX_AGE`` seconds; drafts must be revalidated.
+    """
+    key = survey_cache_key(survey_id)
+    entry = await survey_cache.get(key)
+    if entry is None:
+        survey = await get_survey_with_questions(db, survey_id)
+        body = SurveyResponse.model_validate(survey).model_dump_json().encode()
+        entry = pack_survey_entry(survey.is_active, body)
+        await survey_cache.set(key, entry)
     
-    survey.questions = questions
-    return survey
+    is_active, etag, body = unpack_survey_entry(entry)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={SURVEY_CACHE_MAX_AGE}" if is_active else "no-cache"
+    }
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @router.post("/surveys/{survey_id}/publish", response_model=SurveyResponse)
 async def publish_survey(
     survey_id: int,
     publish_data: SurveyPublish,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Publish or unpublish a survey."""
-    survey = db.query(Survey).filter(Survey.id == survey_id).first()
-    if not survey:
-        raise HTTPException(status_code=404, detail="Survey not found")
+    survey = await get_survey_with_questions(db, survey_id)
     
     # Check if survey has exactly 5 questions
-    question_count = db.query(SurveyQuestion).filter(SurveyQuestion.survey_id == survey_id).count()
+    question_count = len(survey.questions)
     if question_count != 5:
         raise HTTPException(
             status_code=400,
@@ -111,44 +204,25 @@ async def publish_survey(
         )
     
     survey.is_active = publish_data.is_active
-    db.commit()
-    db.refresh(survey)
+    await db.commit()
+    await invalidate_survey(survey_id)
     return survey
 
 
-@router.delete("/surveys/{survey_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_survey(survey_id: int, db: Session = Depends(get_db)):
-    """Delete a survey and all associated data (questions, submissions, answers, media files)."""
-    from app.models.submission import SurveySubmission, MediaFile
-    import os
+@router.delete("/surveys/{survey_id}", response_model=DeletionResponse, status_code=status.HTTP_202_ACCEPTED)
+async def delete_survey(survey_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Delete a survey and all associated data (questions, submissions, answers, media files).
     
-    survey = db.query(Survey).filter(Survey.id == survey_id).first()
-    if not survey:
+    The survey is hidden immediately; its rows and files are removed in the
+    background. Progress is at ``GET /api/deletions/{id}``.
+    """
+    survey = await db.get(Survey, survey_id)
+    if not survey or survey.deleted_at:
         raise HTTPException(status_code=404, detail="Survey not found")
     
-    # Get all submissions for this survey
-    submissions = db.query(SurveySubmission).filter(
-        SurveySubmission.survey_id == survey_id
-    ).all()
-    
-    # Delete media files from filesystem
-    for submission in submissions:
-        media_files = db.query(MediaFile).filter(
-            MediaFile.submission_id == submission.id
-        ).all()
-        for media_file in media_files:
-            if os.path.exists(media_file.path):
-                try:
-                    os.remove(media_file.path)
-                except Exception as e:
-                    print(f"Error deleting media file {media_file.path}: {e}")
-    
-    # Delete survey (cascade will delete questions, submissions will be deleted via foreign key)
-    # But we need to handle submissions manually since there's no cascade
-    for submission in submissions:
-        db.delete(submission)
-    
-    db.delete(survey)
-    db.commit()
+    deletion = await start_deletion(db, "survey", survey_id)
+    await db.commit()
+    await invalidate_survey(survey_id)
+    await db.refresh(deletion)
     
-    return None
+    return deletion
@@ -0,0 +1,309 @@
+from contextlib import AsyncExitStack
+
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Query
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
+from app.utils.profiling import TimedRoute
+from app.models.submission import SurveySubmission, MediaFile
+from app.models.survey import Survey
+from app.models.upload import UploadSession
+from app.schemas.submission import MediaResponse
+from app.schemas.upload import (
+    UploadSessionCreate, UploadSessionResponse, DirectUploadCreate, DirectUploadResponse
+)
+from app.api.submissions import attach_face_image, get_live_submission
+from app.jobs import enqueue_media_inspection
+from app.storage import finalize_upload_file, get_storage
+from app.utils.media import (
+    MEDIA_EXTENSIONS, MediaTooLargeError, UploadBusyError, UploadInterruptedError, StoredMedia,
+    get_max_media_size, get_upload_session_path, locked_upload_part, remove_file_quietly, write_upload_chunk
+)
+
+router = APIRouter(route_class=TimedRoute)
+
+
+def offset_mismatch(current_offset: int) -> HTTPException:
+    return HTTPException(status_code=409, detail=f"Offset mismatch. Current offset is {current_offset}")
+
+
+async def advance_upload_offset(db: AsyncSession, upload_id: str, old_offset: int, new_offset: int) -> bool:
+    """Move an active session's offset forward, unless it is no longer at ``old_offset``."""
+    result = await db.execute(
+        update(UploadSession)
+        .where(UploadSession.id == upload_id, UploadSession.offset == old_offset, UploadSession.status == "active")
+        .values(offset=new_offset)
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+
+async def get_active_upload(db: AsyncSession, upload_id: str, lock: bool = False) -> UploadSession:
+    """Load an upload session, optionally locking its row for the write.
+
+    Sessions of submissions that are being deleted are not found.
+    """
+    stmt = (
+        select(UploadSession)
+        .join(SurveySubmission, SurveySubmission.id == UploadSession.submission_id)
+        .join(Survey, Survey.id == SurveySubmission.survey_id)
+        .where(
+            UploadSession.id == upload_id,
+            SurveySubmission.deleted_at.is_(None),
+            Survey.deleted_at.is_(None)
+        )
+    )
+    if lock:
+        stmt = stmt.with_for_update(of=UploadSession)
+    upload = await db.scalar(stmt)
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return upload
+
+
+@router.post("/submissions/{submission_id}/uploads", response_model=UploadSessionResponse, status_code=status.HTTP_201_CREATED)
+async def create_upload_session(
+    submission_id: int,
+    upload_data: UploadSessionCreate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create a resumable upload session for a media file."""
+    submission = await get_live_submission(db, submission_id)
+    if not submission:
+        raise HTTPException(status_code=404, detail="Submission not found")
+
+    max_size = get_max_media_size(upload_data.type)
+    if upload_data.total_size is not None and upload_data.total_size > max_size:
+        raise HTTPException(
+            status_code=413,
+            detail=str(MediaTooLargeError(upload_data.type, max_size))
+        )
+
+    upload = UploadSession(
+        submission_id=submission_id,
+        type=upload_data.type,
+        question_number=upload_data.question_number,
+        total_size=upload_data.total_size,
+        offset=0,
+        status="active"
+    )
+    db.add(upload)
+    await db.commit()
+    await db.refresh(upload)
+    return upload
+
+
+@router.post("/submissions/{submission_id}/uploads/presign", response_model=DirectUploadResponse, status_code=status.HTTP_201_CREATED)
+async def create_direct_upload(
+    submission_id: int,
+    upload_data: DirectUploadCreate,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Start an upload that the client sends straight to storage.
+
+    Returns the request to send the file with; afterwards call
+    ``POST /uploads/{upload_id}/confirm``. Storage backends without presigned
+    URLs (local storage) get a PUT to this API's chunk endpoint instead.
+    """
+    submission = await get_live_submission(db, submission_id)
+    if not submission:
+        raise HTTPException(status_code=404, detail="Submission not found")
+
+    max_size = get_max_media_size(upload_data.type)
+    if upload_data.size > max_size:
+        raise HTTPException(status_code=413, detail=str(MediaTooLargeError(upload_data.type, max_size)))
+    if not upload_data.content_type.startswith(f"{upload_data.type}/"):
+        raise HTTPException(status_code=400, detail=f"Invalid {upload_data.type} file type")
+
+    upload = UploadSession(
+        submission_id=submission_id,
+        type=upload_data.type,
+        question_number=upload_data.question_number,
+        total_size=upload_data.size,
+        offset=0,
+        status="active"
+    )
+    db.add(upload)
+    await db.flush()
+
+    storage = get_storage()
+    key = storage.staging_key(upload.type, f"upload_{upload.id}{MEDIA_EXTENSIONS[upload.type]}")
+    presigned = await storage.presign_upload(key, upload_data.content_type, upload_data.size)
+    if presigned:
+        upload.storage_key = key
+    await db.commit()
+
+    if presigned is None:
+        return DirectUploadResponse(
+            upload_id=upload.id,
+            url=f"{request.url_for('upload_chunk', upload_id=upload.id)}?offset=0",
+            method="PUT",
+            headers={"Content-Type": upload_data.content_type}
+        )
+    return DirectUploadResponse(
+        upload_id=upload.id,
+        url=presigned.url,
+        method=presigned.method,
+        headers=presigned.headers,
+        expires_at=presigned.expires_at
+    )
+
+
+@router.get("/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def get_upload_session(upload_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Get an upload session, including the offset to resume from."""
+    return await get_active_upload(db, upload_id)
+
+
+@router.put("/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Append the request body to an upload session at ``offset``.
+
+    ``offset`` must equal the session's current offset; on mismatch a 409 is
+    returned and the client should resume from the offset reported by
+    ``GET /uploads/{upload_id}``. A chunk sent while another one for the same
+    session is still being written also gets a 409.
+
+    No transaction is open while the body streams in, so slow clients don't
+    hold database connections: the partial file's lock keeps writers apart,
+    and the offset only moves by a conditional UPDATE at the end.
+    """
+    upload = await get_active_upload(db, upload_id)
+    if upload.status != "active":
+        raise HTTPException(status_code=409, detail="Upload already finalized")
+    if upload.storage_key:
+        raise HTTPException(status_code=409, detail="This upload goes directly to storage")
+    if offset != upload.offset:
+        raise offset_mismatch(upload.offset)
+    media_type, total_size = upload.type, upload.total_size
+    # Ends the transaction (and expires ``upload``)
+    await db.rollback()
+
+    part_path = get_upload_session_path(upload_id)
+    try:
+        async with locked_upload_part(part_path):
+            # Another chunk may have been written since the offset was checked
+            current_offset = await db.scalar(select(UploadSession.offset).where(UploadSession.id == upload_id))
+            await db.rollback()
+            if current_offset != offset:
+                raise offset_mismatch(current_offset)
+
+            try:
+                new_offset = await write_upload_chunk(part_path, offset, request.stream(), media_type)
+            except MediaTooLargeError as e:
+                raise HTTPException(status_code=413, detail=str(e))
+            except UploadInterruptedError as e:
+                # Record what made it to disk so the client can resume from there
+                await advance_upload_offset(db, upload_id, offset, e.offset)
+                raise HTTPException(status_code=400, detail=str(e))
+
+            if total_size is not None and new_offset > total_size:
+                raise HTTPException(status_code=400, detail="Upload exceeds declared total size")
+            if not await advance_upload_offset(db, upload_id, offset, new_offset):
+                await db.refresh(upload)
+                raise offset_mismatch(upload.offset)
+    except UploadBusyError:
+        raise HTTPException(status_code=409, detail="Another chunk of this upload is still being written")
+
+    await db.refresh(upload)
+    return upload
+
+
+@router.post("/uploads/{upload_id}/confirm", response_model=MediaResponse, status_code=status.HTTP_201_CREATED)
+@router.post("/uploads/{upload_id}/finalize", response_model=MediaResponse, status_code=status.HTTP_201_CREATED)
+async def finalize_upload(upload_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Finish an upload session and turn it into a MediaFile.
+
+    For direct uploads (``/confirm``) this only checks the object in storage
+    and records it; the bytes never pass through the API.
+    """
+    upload = await get_active_upload(db, upload_id, lock=True)
+    if upload.status == "completed":
+        # Finalizing twice (e.g. a retried request) returns the same file
+        media_file = await db.get(MediaFile, upload.media_file_id) if upload.media_file_id else None
+        if media_file is None:
+            raise HTTPException(status_code=404, detail="Media file not found")
+        return media_file
+
+    direct = upload.storage_key is not None
+    async with AsyncExitStack() as stack:
+        if not direct:
+            try:
+                # Not while a chunk is still being written to the partial file
+                await stack.enter_async_context(locked_upload_part(get_upload_session_path(upload.id)))
+            except UploadBusyError:
+                raise HTTPException(status_code=409, detail="A chunk of this upload is still being written")
+        return await store_finished_upload(db, upload, direct)
+
+
+async def store_finished_upload(db: AsyncSession, upload: UploadSession, direct: bool) -> MediaFile:
+    """Check a finished upload's size and record it as a MediaFile."""
+    storage = get_storage()
+    if direct:
+        size = await storage.size(upload.storage_key)
+        if size is None:
+            raise HTTPException(status_code=400, detail="File has not been uploaded to storage yet")
+        if size != upload.total_size:
+            await storage.delete(upload.storage_key)
+            raise HTTPException(
+                status_code=400,
+                detail=f"Uploaded {size} bytes but {upload.total_size} were declared"
+            )
+    else:
+        if upload.total_size is not None and upload.offset != upload.total_size:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Upload incomplete. Received {upload.offset} of {upload.total_size} bytes"
+            )
+        if upload.offset == 0:
+            raise HTTPException(status_code=400, detail="Upload is empty")
+
+    submission = await db.get(SurveySubmission, upload.submission_id)
+    part_path = get_upload_session_path(upload.id)
+    if direct:
+        stored = StoredMedia(path=upload.storage_key, size=size)
+    else:
+        stored = await finalize_upload_file(
+            part_path,
+            submission.id,
+            upload.type,
+            upload.question_number
+        )
+
+    media_file = MediaFile(
+        submission_id=submission.id,
+        type=upload.type,
+        path=stored.path,
+        question_number=upload.question_number,
+        size_bytes=stored.size,
+        checksum=stored.checksum
+    )
+    db.add(media_file)
+
+    if upload.type == "image" and upload.question_number:
+        await attach_face_image(db, submission, upload.question_number, stored.path)
+
+    try:
+        await db.flush()
+        upload.media_file_id = media_file.id
+        upload.status = "completed"
+        enqueue_media_inspection(db, media_file.id)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        # The upload itself (the partial file, or the object of a direct
+        # upload) is kept so that finalizing can be retried
+        if not direct:
+            await storage.delete(stored.path)
+        raise
+    if not direct:
+        await remove_file_quietly(part_path)
+    await db.refresh(media_file)
+
+    return media_file
@@ -0,0 +1,199 @@
+"""Maintenance commands.
+
+Usage (from backend/):
+    python -m app.cli verify-faces [--batch-size N] [--workers N]
+    python -m app.cli migrate-media [--batch-size N] [--workers N]
+    python -m app.cli gc-media [--delete] [--grace SECONDS]
+    python -m app.cli rebuild-analytics [--survey ID]
+    python -m app.cli build-geoip RANGES.csv OUTPUT
+"""
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import select
+
+from app.database import AsyncSessionLocal
+from app.jobs.faces import verify_pending_faces
+from app.jobs.media import move_media_file
+from app.jobs.reconcile import MEDIA_GC_GRACE, new_reconcile_state, reconcile_step, ReconcileReport
+from app.models.submission import MediaFile
+from app.models.survey import Survey
+from app.utils.analytics import rebuild_survey_analytics
+from app.utils.geoip import build_geoip_database
+from app.utils.face_verification import FACE_VERIFY_BATCH_SIZE, FACE_VERIFY_WORKERS, create_face_pool
+from app.storage import get_storage, store_media_file
+from app.utils.media import compute_file_checksum, is_object_path, lock_media_objects, remove_file_quietly
+
+
+async def verify_faces(args: argparse.Namespace) -> None:
+    """Backfill server-side face verification for all unverified answers."""
+    pool = create_face_pool(args.workers)
+    total = 0
+    started = time.perf_counter()
+    while True:
+        async with AsyncSessionLocal() as db:
+            verified = await verify_pending_faces(
+                db, batch_size=args.batch_size, executor=pool, workers=args.workers
+            )
+        if not verified:
+            break
+        total += verified
+        elapsed = time.perf_counter() - started
+        print(f"Verified {total} images ({total / elapsed:.1f}/s)")
+    pool.shutdown()
+    print(f"Done: {total} images verified")
+
+
+async def migrate_media(args: argparse.Namespace) -> None:
+    """Move media files from the flat directories into the content-addressed store.
+
+    Works through media_files in id order, one batch per transaction: files
+    are hashed on a thread pool, put into the store of the configured storage
+    backend (so this also uploads local media to S3), the rows (and face
+    image URLs) are rewritten, and the old files are removed once the batch
+    is committed. Safe to interrupt and re-run.
+    """
+    storage = get_storage()
+    executor = ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="migrate-media")
+    loop = asyncio.get_running_loop()
+    after_id = 0
+    moved = missing = 0
+    started = time.perf_counter()
+    while True:
+        async with AsyncSessionLocal() as db:
+            batch = (await db.scalars(
+                select(MediaFile)
+                .where(MediaFile.id > after_id)
+                .order_by(MediaFile.id)
+                .limit(args.batch_size)
+            )).all()
+            if not batch:
+                break
+            after_id = batch[-1].id
+            pending = [
+                media_file for media_file in batch
+                if not is_object_path(media_file.path) and os.path.exists(media_file.path)
+            ]
+            missing += sum(1 for media_file in batch if not is_object_path(media_file.path)) - len(pending)
+
+            checksums = await asyncio.gather(*(
+                loop.run_in_executor(executor, compute_file_checksum, media_file.path)
+                for media_file in pending
+            ))
+            await lock_media_objects(db, [
+                storage.object_key(checksum, media_file.type)
+                for media_file, checksum in zip(pending, checksums)
+            ])
+            old_paths = []
+            for media_file, checksum in zip(pending, checksums):
+                old_paths.append(media_file.path)
+                media_file.size_bytes = os.path.getsize(media_file.path)
+                object_key = await store_media_file(
+                    db, media_file.path, checksum, media_file.type, keep_source=True
+                )
+                media_file.checksum = checksum
+                await move_media_file(db, media_file, object_key)
+            await db.commit()
+
+        for path in old_paths:
+            await remove_file_quietly(path)
+        moved += len(old_paths)
+        elapsed = time.perf_counter() - started
+        print(f"Moved {moved} files ({moved / elapsed:.1f}/s), {missing} missing on disk")
+    executor.shutdown()
+    print(f"Done: {moved} files moved, {missing} missing on disk")
+
+
+async def gc_media(args: argparse.Namespace) -> None:
+    """Reconcile stored media with the database, and delete orphans with ``--delete``.
+
+    Streams the store in batches against the indexed media paths, then
+    checks that media rows and face image URLs point at existing files.
+    """
+    state = new_reconcile_state(args.delete, args.grace)
+    phase = None
+    while True:
+        if state["phase"] != phase:
+            phase = state["phase"]
+            print(f"Checking {phase.replace('_', ' ')}...")
+        if not await reconcile_step(state):
+            break
+    for line in ReconcileReport(**state["report"]).summary():
+        print(line)
+    if not args.delete:
+        print("Dry run: pass --delete to remove orphaned files")
+
+
+async def rebuild_analytics(args: argparse.Namespace) -> None:
+    """Recompute the answer analytics rollups from the stored answers.
+
+    Each survey is rebuilt in its own transaction. Use it after restoring
+    data, or if the rollups are suspected to have drifted.
+    """
+    async with AsyncSessionLocal() as db:
+        if args.survey is not None:
+            survey_ids = [args.survey]
+        else:
+            survey_ids = list(await db.scalars(
+                select(Survey.id).where(Survey.deleted_at.is_(None)).order_by(Survey.id)
+            ))
+    started = time.perf_counter()
+    for survey_id in survey_ids:
+        async with AsyncSessionLocal() as db:
+            await rebuild_survey_analytics(db, survey_id)
+            await db.commit()
+        print(f"Rebuilt survey {survey_id}")
+    print(f"Done: {len(survey_ids)} surveys rebuilt in {time.perf_counter() - started:.1f}s")
+
+
+async def build_geoip(args: argparse.Namespace) -> None:
+    """Compile a CSV of country ranges into the database file read by ``GEOIP_DATABASE``.
+
+    The output is replaced atomically; running workers load it within
+    ``GEOIP_RELOAD_INTERVAL`` seconds.
+    """
+    started = time.perf_counter()
+    v4_count, v6_count = build_geoip_database(args.ranges, args.output)
+    print(f"Wrote {args.output}: {v4_count} IPv4 and {v6_count} IPv6 ranges in {time.perf_counter() - started:.1f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Video Survey Platform maintenance commands.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    verify = commands.add_parser("verify-faces", help="run server-side face verification on unverified answers")
+    verify.add_argument("--batch-size", type=int, default=FACE_VERIFY_BATCH_SIZE)
+    verify.add_argument("--workers", type=int, default=FACE_VERIFY_WORKERS)
+    verify.set_defaults(handler=verify_faces)
+
+    migrate = commands.add_parser("migrate-media", help="move existing media files into the content-addressed store")
+    migrate.add_argument("--batch-size", type=int, default=500)
+    migrate.add_argument("--workers", type=int, default=8, help="threads hashing files")
+    migrate.set_defaults(handler=migrate_media)
+
+    gc = commands.add_parser("gc-media", help="report (or delete) orphaned media files and rows missing their file")
+    gc.add_argument("--delete", action="store_true", help="delete orphaned files (default: report only)")
+    gc.add_argument(
+        "--grace", type=float, default=MEDIA_GC_GRACE,
+        help="seconds an unreferenced file is left alone, so uploads in progress are kept"
+    )
+    gc.set_defaults(handler=gc_media)
+
+    rebuild = commands.add_parser("rebuild-analytics", help="recompute survey answer analytics from the stored answers")
+    rebuild.add_argument("--survey", type=int, help="only this survey (default: all)")
+    rebuild.set_defaults(handler=rebuild_analytics)
+
+    geoip = commands.add_parser("build-geoip", help="compile a CSV of IP ranges into the offline GeoIP database")
+    geoip.add_argument("ranges", help="CSV of start,end,country_code[,country_name] (DB-IP / IP2Location lite)")
+    geoip.add_argument("output", help="database file to write, e.g. the GEOIP_DATABASE path")
+    geoip.set_defaults(handler=build_geoip)
+
+    args = parser.parse_args()
+    asyncio.run(args.handler(args))
+
+
+if __name__ == "__main__":
+    main()
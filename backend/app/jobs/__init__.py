@@ -0,0 +1,12 @@
+from app.jobs.queue import enqueue, job_handler, HANDLERS
+from app.jobs.media import enqueue_media_inspection, enqueue_file_deletion, discard_files
+from app.jobs.faces import enqueue_face_verification
+from app.jobs.deletion import start_deletion
+from app.jobs.reconcile import schedule_media_gc
+from app.jobs.rollup import schedule_submission_rollup
+
+__all__ = [
+    "enqueue", "job_handler", "HANDLERS",
+    "enqueue_media_inspection", "enqueue_file_deletion", "discard_files",
+    "enqueue_face_verification", "start_deletion", "schedule_media_gc", "schedule_submission_rollup"
+]
@@ -0,0 +1,117 @@
+"""Deletion of tombstoned surveys and submissions, in batches."""
+import os
+from typing import Any, Dict, List
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import AsyncSessionLocal
+from app.jobs.media import complete_deletion_if_done, enqueue_file_deletion
+from app.jobs.queue import enqueue, job_handler, utcnow
+from app.models.deletion import Deletion
+from app.models.submission import MediaFile, SurveyAnswer, SurveySubmission
+from app.models.survey import Survey, SurveyQuestion
+from app.models.upload import UploadSession
+from app.utils.analytics import delete_survey_analytics, subtract_submissions
+from app.utils.media import get_upload_session_path
+
+
+DELETION_RUN = "deletion.run"
+
+# Submissions removed per job, each batch in its own short transaction
+DELETION_BATCH_SIZE = int(os.getenv("DELETION_BATCH_SIZE", "200"))
+
+
+async def start_deletion(db: AsyncSession, target: str, target_id: int) -> Deletion:
+    """Tombstone a survey or submission and queue the removal of its rows and files.
+
+    Once the caller commits, the target is hidden from every read; its rows
+    are removed by ``deletion.run`` jobs, one batch of submissions at a time.
+    """
+    now = utcnow()
+    if target == "survey":
+        await db.execute(update(Survey).where(Survey.id == target_id).values(deleted_at=now))
+        submissions_total = await db.scalar(
+            select(func.count()).select_from(SurveySubmission).where(SurveySubmission.survey_id == target_id)
+        )
+    else:
+        await db.execute(update(SurveySubmission).where(SurveySubmission.id == target_id).values(deleted_at=now))
+        submissions_total = 1
+
+    deletion = Deletion(
+        target=target,
+        target_id=target_id,
+        status="deleting_rows",
+        submissions_total=submissions_total,
+        submissions_deleted=0,
+        files_total=0,
+        files_deleted=0
+    )
+    db.add(deletion)
+    await db.flush()
+    enqueue(db, DELETION_RUN, {"deletion_id": deletion.id})
+    return deletion
+
+
+async def delete_submission_rows(db: AsyncSession, submission_ids: List[int], deletion_id: int) -> int:
+    """Delete submissions and their dependent rows with one statement per table.
+
+    Their files are queued for removal, and their answers taken out of the
+    survey analytics, in the same transaction. Returns the number of files
+    queued.
+    """
+    keys = list(await db.scalars(select(MediaFile.path).where(MediaFile.submission_id.in_(submission_ids))))
+    paths = []
+    uploads = await db.execute(
+        select(UploadSession.id, UploadSession.storage_key)
+        .where(UploadSession.submission_id.in_(submission_ids), UploadSession.status == "active")
+    )
+    for upload_id, storage_key in uploads:
+        if storage_key:
+            keys.append(storage_key)
+        else:
+            paths.append(get_upload_session_path(upload_id))
+    # Submissions share content-addressed objects; each is checked once
+    keys = list(dict.fromkeys(keys))
+    enqueue_file_deletion(db, keys, paths, deletion_id=deletion_id)
+
+    await subtract_submissions(db, submission_ids)
+    # Children first; upload sessions reference media files
+    for model in (SurveyAnswer, UploadSession, MediaFile):
+        await db.execute(delete(model).where(model.submission_id.in_(submission_ids)))
+    await db.execute(delete(SurveySubmission).where(SurveySubmission.id.in_(submission_ids)))
+    return len(keys) + len(paths)
+
+
+@job_handler(DELETION_RUN)
+async def run_deletion(payload: Dict[str, Any]) -> None:
+    """Remove one batch of the target's submissions, then queue the next.
+
+    When no submissions are left, the survey and its questions go last.
+    """
+    async with AsyncSessionLocal() as db:
+        # Locked so progress updates from media.delete jobs are not lost
+        deletion = await db.get(Deletion, payload["deletion_id"], with_for_update=True)
+        if deletion is None or deletion.status != "deleting_rows":
+            return
+        if deletion.target == "survey":
+            owned = SurveySubmission.survey_id == deletion.target_id
+        else:
+            owned = SurveySubmission.id == deletion.target_id
+        submission_ids = list(await db.scalars(
+            select(SurveySubmission.id).where(owned).order_by(SurveySubmission.id).limit(DELETION_BATCH_SIZE)
+        ))
+
+        if submission_ids:
+            deletion.files_total += await delete_submission_rows(db, submission_ids, deletion.id)
+            deletion.submissions_deleted += len(submission_ids)
+            enqueue(db, DELETION_RUN, payload)
+        else:
+            if deletion.target == "survey":
+                await delete_survey_analytics(db, deletion.target_id)
+                await db.execute(delete(SurveyQuestion).where(SurveyQuestion.survey_id == deletion.target_id))
+                await db.execute(delete(Survey).where(Survey.id == deletion.target_id))
+            deletion.status = "deleting_files"
+            await db.flush()
+            await complete_deletion_if_done(db, deletion.id)
+        await db.commit()
@@ -0,0 +1,113 @@
+"""Face verification job: re-checks uploaded face images on the server."""
+import os
+from concurrent.futures import Executor
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import bindparam, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import AsyncSessionLocal
+from app.jobs.queue import enqueue, job_handler, utcnow
+from app.models.submission import SurveyAnswer
+from app.utils.face_verification import FACE_VERIFY_BATCH_SIZE, FACE_VERIFY_WORKERS, verify_images
+from app.storage import get_storage
+
+
+FACE_VERIFY = "face.verify"
+# A claimed batch whose run died is verified again after this long
+FACE_VERIFY_CLAIM_TIMEOUT = float(os.getenv("FACE_VERIFY_CLAIM_TIMEOUT", "600"))  # seconds
+
+
+def enqueue_face_verification(db: AsyncSession) -> None:
+    """Queue a verification pass over all unverified face images.
+
+    Each job checks whatever is pending when it runs, so images from many
+    submissions are verified together, and jobs queued while one runs find
+    little or nothing left to do.
+    """
+    enqueue(db, FACE_VERIFY, {})
+
+
+async def verify_pending_faces(
+    db: AsyncSession,
+    batch_size: int = FACE_VERIFY_BATCH_SIZE,
+    executor: Optional[Executor] = None,
+    workers: int = FACE_VERIFY_WORKERS
+) -> int:
+    """Verify one batch of unverified face images and store the results.
+
+    The batch is claimed in a short transaction, so concurrent runs pick
+    disjoint batches, and detection runs with no row locks held: respondents
+    replacing an image or answer in the batch are not blocked by it. A
+    result is only stored if the answer still has the image that was
+    checked. Returns the batch size.
+    """
+    now = utcnow()
+    rows = (await db.execute(
+        select(SurveyAnswer.id, SurveyAnswer.face_image_path)
+        .where(
+            SurveyAnswer.face_image_path.isnot(None),
+            SurveyAnswer.server_face_detected.is_(None),
+            or_(
+                SurveyAnswer.face_verify_claimed_at.is_(None),
+                SurveyAnswer.face_verify_claimed_at < now - timedelta(seconds=FACE_VERIFY_CLAIM_TIMEOUT)
+            )
+        )
+        .order_by(SurveyAnswer.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )).all()
+    if rows:
+        await db.execute(
+            update(SurveyAnswer)
+            .where(SurveyAnswer.id.in_([row.id for row in rows]))
+            .values(face_verify_claimed_at=now)
+        )
+    await db.commit()
+    if not rows:
+        return 0
+
+    storage = get_storage()
+    keys = [storage.key_from_url(row.face_image_path) for row in rows]
+    # Remote backends download the batch to temp files for the detector;
+    # a missing image is unreadable, i.e. no face
+    try:
+        async with storage.local_files(keys, missing_ok=True) as paths:
+            results = await verify_images(paths, executor=executor, workers=workers)
+    except Exception:
+        # Release the batch so the job's retry can claim it again
+        await db.execute(
+            update(SurveyAnswer)
+            .where(SurveyAnswer.id.in_([row.id for row in rows]), SurveyAnswer.face_verify_claimed_at == now)
+            .values(face_verify_claimed_at=None)
+        )
+        await db.commit()
+        raise
+
+    answers = SurveyAnswer.__table__
+    await db.execute(
+        update(answers)
+        .where(answers.c.id == bindparam("answer_id"), answers.c.face_image_path == bindparam("checked_path"))
+        .values(
+            server_face_detected=bindparam("detected"),
+            server_face_score=bindparam("score"),
+            face_verify_claimed_at=None
+        ),
+        [
+            {"answer_id": row.id, "checked_path": row.face_image_path, "detected": detected, "score": score}
+            for row, (detected, score) in zip(rows, results)
+        ]
+    )
+    await db.commit()
+    return len(rows)
+
+
+@job_handler(FACE_VERIFY)
+async def verify_faces(payload: Dict[str, Any]) -> None:
+    async with AsyncSessionLocal() as db:
+        verified = await verify_pending_faces(db)
+        if verified == FACE_VERIFY_BATCH_SIZE:
+            # More may be pending; continue in a new job rather than holding this one
+            enqueue_face_verification(db)
+            await db.commit()
@@ -0,0 +1,136 @@
+"""Media jobs: post-upload inspection and file deletion."""
+from typing import Any, Dict, List, Optional, Sequence
+
+import aiofiles.os
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import AsyncSessionLocal
+from app.jobs.queue import enqueue, job_handler, utcnow
+from app.models.deletion import Deletion
+from app.models.submission import MediaFile, SurveyAnswer
+from app.storage import get_storage, promote_media_object
+from app.utils.media import is_object_path, lock_media_objects, referenced_media_paths
+
+
+MEDIA_INSPECT = "media.inspect"
+MEDIA_DELETE = "media.delete"
+
+# Paths per deletion job, so a large survey is removed in retryable pieces
+DELETE_BATCH_SIZE = 500
+
+
+def enqueue_media_inspection(db: AsyncSession, media_file_id: int) -> None:
+    """Queue checksum and size extraction for a stored media file."""
+    enqueue(db, MEDIA_INSPECT, {"media_file_id": media_file_id})
+
+
+def enqueue_file_deletion(
+    db: AsyncSession,
+    keys: Sequence[str],
+    paths: Sequence[str] = (),
+    deletion_id: Optional[int] = None
+) -> None:
+    """Queue removal of files, once the caller's transaction commits.
+
+    ``keys`` are media files in storage (``MediaFile.path`` values); they are
+    only removed if no MediaFile references them by the time the job runs,
+    since content-addressed objects are shared. ``paths`` are local files,
+    such as partial uploads. With ``deletion_id`` the jobs count the files
+    they remove into that Deletion's progress.
+    """
+    keys, paths = list(keys), list(paths)
+    extra = {"deletion_id": deletion_id} if deletion_id else {}
+    for start in range(0, len(keys), DELETE_BATCH_SIZE):
+        enqueue(db, MEDIA_DELETE, {"keys": keys[start:start + DELETE_BATCH_SIZE], **extra})
+    for start in range(0, len(paths), DELETE_BATCH_SIZE):
+        enqueue(db, MEDIA_DELETE, {"paths": paths[start:start + DELETE_BATCH_SIZE], **extra})
+
+
+async def complete_deletion_if_done(db: AsyncSession, deletion_id: int) -> None:
+    """Mark a deletion completed once its rows are gone and every queued file is handled."""
+    await db.execute(
+        update(Deletion)
+        .where(
+            Deletion.id == deletion_id,
+            Deletion.status == "deleting_files",
+            Deletion.files_deleted >= Deletion.files_total
+        )
+        .values(status="completed", finished_at=utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def discard_files(keys: List[str]) -> None:
+    """Queue deletion of media files whose referencing transaction was rolled back."""
+    async with AsyncSessionLocal() as db:
+        enqueue_file_deletion(db, keys)
+        await db.commit()
+
+
+async def move_media_file(db: AsyncSession, media_file: MediaFile, key: str) -> None:
+    """Point a media file, and the answer showing it as a face image, at a new key."""
+    storage = get_storage()
+    old_url = storage.media_url(media_file.path)
+    media_file.path = key
+    await db.execute(
+        update(SurveyAnswer)
+        .where(
+            SurveyAnswer.submission_id == media_file.submission_id,
+            SurveyAnswer.face_image_path == old_url
+        )
+        # A verification run that has the old URL discards its result; let the next one retry
+        .values(face_image_path=storage.media_url(key), face_verify_claimed_at=None)
+    )
+
+
+@job_handler(MEDIA_INSPECT)
+async def inspect_media_file(payload: Dict[str, Any]) -> None:
+    async with AsyncSessionLocal() as db:
+        media_file = await db.get(MediaFile, payload["media_file_id"])
+        if media_file is None or is_object_path(media_file.path):
+            return  # deleted before the job ran, or already stored by content
+        storage = get_storage()
+        staging_key = media_file.path
+        checksum = await storage.sha256(staging_key)
+        size = await storage.size(staging_key)
+        # Copied rather than moved, so the staging file stays valid until the new key is committed
+        object_key = await promote_media_object(db, staging_key, checksum, media_file.type)
+        media_file.checksum = checksum
+        media_file.size_bytes = size
+        await move_media_file(db, media_file, object_key)
+        await db.commit()
+    await storage.delete(staging_key)
+
+
+@job_handler(MEDIA_DELETE)
+async def delete_files(payload: Dict[str, Any]) -> None:
+    storage = get_storage()
+    keys = payload.get("keys", [])
+    paths = payload.get("paths", [])
+    # Local paths queued before storage keys existed may still name shared objects
+    shared = keys + [path for path in paths if is_object_path(path)]
+    async with AsyncSessionLocal() as db:
+        # Held until commit, so no upload can start referencing an object being removed
+        await lock_media_objects(db, shared)
+        referenced = await referenced_media_paths(db, shared)
+        for key in keys:
+            if key not in referenced:
+                await storage.delete(key)  # a missing key is fine, e.g. on a retry
+        for path in paths:
+            if path in referenced:
+                continue  # still shared with another media file
+            try:
+                await aiofiles.os.remove(path)
+            except FileNotFoundError:
+                pass  # already gone, e.g. on a retry
+        deletion_id = payload.get("deletion_id")
+        if deletion_id:
+            await db.execute(
+                update(Deletion)
+                .where(Deletion.id == deletion_id)
+                .values(files_deleted=Deletion.files_deleted + len(keys) + len(paths))
+                .execution_options(synchronize_session=False)
+            )
+            await complete_deletion_if_done(db, deletion_id)
+        await db.commit()
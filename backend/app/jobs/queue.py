@@ -0,0 +1,141 @@
+"""Durable job queue on top of the ``jobs`` table.
+
+Jobs are enqueued in the caller's transaction, so they are committed (or
+rolled back) together with the change that produced them. Workers claim
+due jobs with ``SELECT ... FOR UPDATE SKIP LOCKED`` and hold them for a
+visibility timeout; a job whose worker dies becomes claimable again once
+the timeout passes. Failed jobs are retried with exponential backoff until
+``max_attempts`` is reached.
+"""
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import and_, delete, or_, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.job import Job
+
+
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_VISIBILITY_TIMEOUT = float(os.getenv("JOB_VISIBILITY_TIMEOUT", "300"))  # seconds
+JOB_RETRY_BASE_DELAY = float(os.getenv("JOB_RETRY_BASE_DELAY", "10"))  # seconds
+JOB_RETRY_MAX_DELAY = float(os.getenv("JOB_RETRY_MAX_DELAY", "3600"))  # seconds
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+HANDLERS: Dict[str, JobHandler] = {}
+
+
+def job_handler(kind: str) -> Callable[[JobHandler], JobHandler]:
+    """Register a coroutine function as the handler for ``kind`` jobs."""
+    def register(func: JobHandler) -> JobHandler:
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def enqueue(
+    db: AsyncSession,
+    kind: str,
+    payload: Dict[str, Any],
+    delay: float = 0,
+    max_attempts: Optional[int] = None
+) -> Job:
+    """Add a job to the session; it is queued when the caller commits."""
+    job = Job(
+        kind=kind,
+        payload=payload,
+        status="queued",
+        attempts=0,
+        max_attempts=max_attempts or JOB_MAX_ATTEMPTS,
+        run_at=utcnow() + timedelta(seconds=delay)
+    )
+    db.add(job)
+    return job
+
+
+async def schedule_job(db: AsyncSession, kind: str, delay: float) -> None:
+    """Queue a ``kind`` job ``delay`` seconds from now, unless one is already queued or running.
+
+    For periodic jobs that re-enqueue themselves: workers call this at
+    startup so the cycle starts (or restarts, if a job was lost) exactly once.
+    Commits the session.
+    """
+    if db.bind.dialect.name == "postgresql":
+        # Workers starting together must not each queue one
+        await db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:kind))"), {"kind": kind})
+    pending = await db.scalar(
+        select(Job.id).where(Job.kind == kind, Job.status.in_(["queued", "running"])).limit(1)
+    )
+    if pending is None:
+        enqueue(db, kind, {}, delay=delay)
+    await db.commit()
+
+
+def retry_delay(attempts: int) -> float:
+    """Backoff before the next attempt: exponential, capped, with jitter."""
+    delay = min(JOB_RETRY_BASE_DELAY * 2 ** (attempts - 1), JOB_RETRY_MAX_DELAY)
+    return random.uniform(delay / 2, delay)
+
+
+async def claim_jobs(db: AsyncSession, limit: int) -> List[Job]:
+    """Claim up to ``limit`` due jobs and commit the claim.
+
+    Due jobs are queued jobs whose ``run_at`` has passed, plus running jobs
+    whose visibility timeout expired. Rows locked by another worker's claim
+    are skipped rather than waited for.
+    """
+    now = utcnow()
+    due = (
+        select(Job.id)
+        .where(or_(
+            and_(Job.status == "queued", Job.run_at <= now),
+            and_(Job.status == "running", Job.locked_until < now)
+        ))
+        .order_by(Job.run_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    jobs = (await db.scalars(
+        update(Job)
+        .where(Job.id.in_(due.scalar_subquery()))
+        .values(
+            status="running",
+            attempts=Job.attempts + 1,
+            locked_until=now + timedelta(seconds=JOB_VISIBILITY_TIMEOUT)
+        )
+        .returning(Job)
+        .execution_options(synchronize_session=False)
+    )).all()
+    await db.commit()
+    return list(jobs)
+
+
+async def complete_job(db: AsyncSession, job: Job) -> None:
+    """Remove a finished job, unless another worker has reclaimed it since."""
+    await db.execute(
+        delete(Job).where(Job.id == job.id, Job.attempts == job.attempts)
+    )
+    await db.commit()
+
+
+async def fail_job(db: AsyncSession, job: Job, error: str, retry: bool = True) -> None:
+    """Record a failed attempt and schedule a retry, or give up for good."""
+    values = {"last_error": error[:4000], "locked_until": None}
+    if retry and job.attempts < job.max_attempts:
+        values.update(status="queued", run_at=utcnow() + timedelta(seconds=retry_delay(job.attempts)))
+    else:
+        values.update(status="failed", finished_at=utcnow())
+    await db.execute(
+        update(Job)
+        .where(Job.id == job.id, Job.attempts == job.attempts)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
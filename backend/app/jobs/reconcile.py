@@ -0,0 +1,278 @@
+"""Reconciliation of stored media files against the database.
+
+A pass streams a scan of the storage backend in batches and looks each
+batch up in the indexed ``media_files.path`` column (and the upload
+sessions), so memory stays flat however large the store grows. Files that
+nothing references are orphans: left by a failed commit, a job that died
+half way or a deletion that never finished. Orphans older than the grace
+period are reported and, when deleting (``--delete``, or
+``MEDIA_GC_DELETE`` for scheduled passes), removed under the same lock as
+``media.delete``. Rows pointing at missing files are reported, not changed.
+
+A pass runs in steps of one batch each, so it can be spread over jobs:
+``media.gc`` runs a step, then queues the next one, and after the last
+step schedules the next pass ``MEDIA_GC_INTERVAL`` seconds later.
+"""
+import asyncio
+import os
+import re
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Set
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import AsyncSessionLocal
+from app.jobs.queue import enqueue, job_handler, schedule_job
+from app.models.submission import MediaFile, SurveyAnswer
+from app.models.upload import UploadSession
+from app.storage import get_storage
+from app.utils.media import get_media_tmp_dir, lock_media_objects, referenced_media_paths
+
+
+MEDIA_GC = "media.gc"
+
+MEDIA_GC_INTERVAL = float(os.getenv("MEDIA_GC_INTERVAL", "86400"))  # seconds between scheduled passes, 0 = off
+MEDIA_GC_GRACE = float(os.getenv("MEDIA_GC_GRACE", "86400"))  # seconds before an unreferenced file is an orphan
+MEDIA_GC_DELETE = os.getenv("MEDIA_GC_DELETE", "false").lower() == "true"  # scheduled passes delete orphans, not just report
+MEDIA_GC_BATCH_SIZE = int(os.getenv("MEDIA_GC_BATCH_SIZE", "1000"))
+
+# Ids of dangling rows kept in a report
+DANGLING_SAMPLE_SIZE = 20
+
+# Name of a resumable upload's partial file (see get_upload_session_path)
+_UPLOAD_PART_NAME = re.compile(r"^upload_([0-9a-f]{32})\.part$")
+
+# Passes go through the store, then media_files rows, then face image URLs
+PHASES = ("files", "media_rows", "face_images")
+
+
+@dataclass
+class ReconcileReport:
+    files: int = 0
+    bytes: int = 0
+    referenced_files: int = 0
+    referenced_bytes: int = 0
+    recent_files: int = 0  # unreferenced, but still within the grace period
+    recent_bytes: int = 0
+    orphan_files: int = 0
+    orphan_bytes: int = 0
+    deleted_files: int = 0
+    deleted_bytes: int = 0
+    media_rows: int = 0
+    dangling_media_rows: int = 0
+    face_images: int = 0
+    dangling_face_images: int = 0
+    dangling_media_ids: List[int] = field(default_factory=list)
+    dangling_answer_ids: List[int] = field(default_factory=list)
+
+    def summary(self) -> List[str]:
+        return [
+            f"Stored: {self.files} files, {format_bytes(self.bytes)}",
+            f"Referenced: {self.referenced_files} files, {format_bytes(self.referenced_bytes)}",
+            f"Unreferenced within grace period: {self.recent_files} files, {format_bytes(self.recent_bytes)}",
+            f"Orphaned: {self.orphan_files} files, {format_bytes(self.orphan_bytes)} "
+            f"(deleted {self.deleted_files} files, {format_bytes(self.deleted_bytes)})",
+            f"Media rows: {self.media_rows} checked, {self.dangling_media_rows} missing their file"
+            + (f" (ids {self.dangling_media_ids})" if self.dangling_media_ids else ""),
+            f"Face images: {self.face_images} checked, {self.dangling_face_images} missing"
+            + (f" (answer ids {self.dangling_answer_ids})" if self.dangling_answer_ids else ""),
+        ]
+
+
+def format_bytes(size: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def new_reconcile_state(delete: bool, grace: float) -> Dict[str, Any]:
+    """State of a pass that has not started; JSON-serializable, so it can be a job payload.
+
+    The grace period is measured from now, so a long pass doesn't move it.
+    """
+    return {
+        "delete": delete,
+        "cutoff": time.time() - grace,
+        "phase": PHASES[0],
+        "after": None,
+        "report": asdict(ReconcileReport())
+    }
+
+
+def key_aliases(keys: List[str]) -> Dict[str, str]:
+    """Every spelling the database may hold for ``keys``, mapped to the key it spells."""
+    storage = get_storage()
+    return {alias: key for key in keys for alias in storage.key_aliases(key)}
+
+
+async def known_media_keys(db: AsyncSession, keys: List[str]) -> Set[str]:
+    """The subset of ``keys`` that a media file or an unfinished upload refers to.
+
+    Stored paths are compared by what they point at rather than as strings,
+    so rows written with ``MEDIA_ROOT`` spelled differently still count.
+    """
+    aliases = key_aliases(keys)
+    known = {aliases[path] for path in await referenced_media_paths(db, list(aliases))}
+    known.update(aliases[key] for key in await db.scalars(
+        select(UploadSession.storage_key)
+        .where(UploadSession.storage_key.in_(list(aliases)), UploadSession.status == "active")
+    ))
+    # Partial files of resumable uploads are named after their session
+    storage = get_storage()
+    tmp_dir = storage.canonical_key(get_media_tmp_dir())
+    parts = {}
+    for key in keys:
+        match = _UPLOAD_PART_NAME.match(os.path.basename(key))
+        if match and os.path.dirname(storage.canonical_key(key)) == tmp_dir:
+            parts[match.group(1)] = key
+    if parts:
+        known.update(parts[upload_id] for upload_id in await db.scalars(
+            select(UploadSession.id).where(UploadSession.id.in_(parts), UploadSession.status == "active")
+        ))
+    return known
+
+
+async def reconcile_files(state: Dict[str, Any], report: ReconcileReport) -> bool:
+    """Check the next batch of stored files; True once the scan is complete."""
+    storage = get_storage()
+    batch = []
+    scan = storage.scan(state["after"])
+    try:
+        async for item in scan:
+            batch.append(item)
+            if len(batch) == MEDIA_GC_BATCH_SIZE:
+                break
+    finally:
+        await scan.aclose()
+    if not batch:
+        return True
+    state["after"] = batch[-1].key
+
+    async with AsyncSessionLocal() as db:
+        known = await known_media_keys(db, [item.key for item in batch])
+        orphans = []
+        for item in batch:
+            report.files += 1
+            report.bytes += item.size
+            if item.key in known:
+                report.referenced_files += 1
+                report.referenced_bytes += item.size
+            elif item.modified_at > state["cutoff"]:
+                # Possibly an upload whose row is not committed yet
+                report.recent_files += 1
+                report.recent_bytes += item.size
+            else:
+                report.orphan_files += 1
+                report.orphan_bytes += item.size
+                orphans.append(item)
+
+        if state["delete"] and orphans:
+            # Checked again under the lock, so an upload that has just
+            # started referencing one of these objects keeps it
+            await lock_media_objects(db, list(key_aliases([item.key for item in orphans])))
+            known = await known_media_keys(db, [item.key for item in orphans])
+            for item in orphans:
+                if item.key not in known:
+                    await storage.delete(item.key)
+                    report.deleted_files += 1
+                    report.deleted_bytes += item.size
+        await db.commit()
+    return len(batch) < MEDIA_GC_BATCH_SIZE
+
+
+async def check_media_rows(state: Dict[str, Any], report: ReconcileReport) -> bool:
+    """Check that the next batch of media_files rows have their file; True when done."""
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(MediaFile.id, MediaFile.path)
+            .where(MediaFile.id > (state["after"] or 0))
+            .order_by(MediaFile.id)
+            .limit(MEDIA_GC_BATCH_SIZE)
+        )).all()
+    if not rows:
+        return True
+    state["after"] = rows[-1].id
+
+    storage = get_storage()
+    found = await asyncio.gather(*(storage.exists(row.path) for row in rows))
+    for row, exists in zip(rows, found):
+        report.media_rows += 1
+        if not exists:
+            report.dangling_media_rows += 1
+            if len(report.dangling_media_ids) < DANGLING_SAMPLE_SIZE:
+                report.dangling_media_ids.append(row.id)
+    return len(rows) < MEDIA_GC_BATCH_SIZE
+
+
+async def check_face_images(state: Dict[str, Any], report: ReconcileReport) -> bool:
+    """Check that the next batch of answers' face image URLs resolve to a file; True when done."""
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(SurveyAnswer.id, SurveyAnswer.face_image_path)
+            .where(SurveyAnswer.id > (state["after"] or 0), SurveyAnswer.face_image_path.isnot(None))
+            .order_by(SurveyAnswer.id)
+            .limit(MEDIA_GC_BATCH_SIZE)
+        )).all()
+    if not rows:
+        return True
+    state["after"] = rows[-1].id
+
+    storage = get_storage()
+
+    async def resolves(url: str) -> bool:
+        try:
+            return await storage.exists(storage.key_from_url(url))
+        except ValueError:
+            return False
+
+    found = await asyncio.gather(*(resolves(row.face_image_path) for row in rows))
+    for row, exists in zip(rows, found):
+        report.face_images += 1
+        if not exists:
+            report.dangling_face_images += 1
+            if len(report.dangling_answer_ids) < DANGLING_SAMPLE_SIZE:
+                report.dangling_answer_ids.append(row.id)
+    return len(rows) < MEDIA_GC_BATCH_SIZE
+
+
+async def reconcile_step(state: Dict[str, Any]) -> bool:
+    """Run one batch of a pass, updating ``state`` in place; False once the pass is complete."""
+    report = ReconcileReport(**state["report"])
+    phase = state["phase"]
+    if phase == "files":
+        done = await reconcile_files(state, report)
+    elif phase == "media_rows":
+        done = await check_media_rows(state, report)
+    else:
+        done = await check_face_images(state, report)
+    state["report"] = asdict(report)
+    if done:
+        index = PHASES.index(phase) + 1
+        state["phase"] = PHASES[index] if index < len(PHASES) else None
+        state["after"] = None
+    return state["phase"] is not None
+
+
+async def schedule_media_gc(db: AsyncSession) -> None:
+    """Queue the next scheduled pass, unless one is already queued or running."""
+    if MEDIA_GC_INTERVAL > 0:
+        await schedule_job(db, MEDIA_GC, MEDIA_GC_INTERVAL)
+
+
+@job_handler(MEDIA_GC)
+async def collect_media_garbage(payload: Dict[str, Any]) -> None:
+    """One step of a scheduled pass; queues the next step, or the next pass when done."""
+    state = payload if payload.get("phase") else new_reconcile_state(MEDIA_GC_DELETE, MEDIA_GC_GRACE)
+    more = await reconcile_step(state)
+    async with AsyncSessionLocal() as db:
+        if more:
+            enqueue(db, MEDIA_GC, state)
+        else:
+            print("Media reconciliation finished. " + "; ".join(ReconcileReport(**state["report"]).summary()))
+            if MEDIA_GC_INTERVAL > 0:
+                enqueue(db, MEDIA_GC, {}, delay=MEDIA_GC_INTERVAL)
+        await db.commit()
@@ -0,0 +1,193 @@
+"""Hourly and daily submission rollups, folded in from new rows by a periodic job.
+
+The ``analytics.rollup`` job reads two streams of events off
+``survey_submissions``: starts in ``(started_at, id)`` order and
+completions in ``(completed_at, id)`` order. Each stream has a watermark
+(``RollupWatermark``), so a run only reads rows past it, through the
+indexes on those columns, and adds them to the rollup rows of their
+buckets. Watermarks and rollups are updated in one transaction, so every
+event is counted exactly once; the watermark rows are locked for it, so
+runs never overlap.
+
+Rows are only read once they are ``ROLLUP_LAG`` seconds old. That leaves
+time for transactions still in flight to commit, and for the location to be
+filled in (see ``enrich_submission_location``). Dimensions are taken as
+they are when a row is read; later changes, and deleted submissions, are
+not taken back out (deleting a survey removes its rollups).
+"""
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import AsyncSessionLocal
+from app.jobs.queue import enqueue, job_handler, schedule_job, utcnow
+from app.models.analytics import DailySubmissionRollup, HourlySubmissionRollup, RollupWatermark
+from app.models.submission import SurveySubmission
+from app.utils.analytics import duration_bucket
+from app.utils.pagination import keyset_after, sortable_timestamp
+
+
+SUBMISSION_ROLLUP = "analytics.rollup"
+
+ROLLUP_INTERVAL = float(os.getenv("ROLLUP_INTERVAL", "60"))  # seconds between runs, 0 = off
+ROLLUP_LAG = float(os.getenv("ROLLUP_LAG", "120"))  # seconds before a row is read
+ROLLUP_BATCH_SIZE = int(os.getenv("ROLLUP_BATCH_SIZE", "5000"))  # rows per stream per run
+
+# Rollup table of each interval
+ROLLUPS = {"hour": HourlySubmissionRollup, "day": DailySubmissionRollup}
+
+DIMENSIONS = ("device", "browser", "os", "location")
+UNKNOWN = "Unknown"
+
+# Streams of events and the column ordering each
+STREAMS = {"starts": SurveySubmission.started_at, "completions": SurveySubmission.completed_at}
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def as_utc(timestamp: datetime) -> datetime:
+    """Aware UTC datetime; naive values (SQLite, ``datetime.utcnow``) are taken as UTC."""
+    if timestamp.tzinfo is None:
+        return timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.astimezone(timezone.utc)
+
+
+def bucket_start(timestamp: datetime, interval: str) -> datetime:
+    start = as_utc(timestamp).replace(minute=0, second=0, microsecond=0)
+    if interval == "day":
+        start = start.replace(hour=0)
+    return start
+
+
+def _new_totals() -> Dict[str, Any]:
+    return {"starts": 0, "completions": 0, "scored": 0, "overall_score_sum": 0.0, "duration_histogram": defaultdict(int)}
+
+
+async def read_stream(db: AsyncSession, name: str, cutoff: datetime) -> Tuple[RollupWatermark, List]:
+    """The next batch of a stream's events older than ``cutoff``, and its locked watermark."""
+    watermark = await db.get(RollupWatermark, name, with_for_update=True)
+    if watermark is None:
+        watermark = RollupWatermark(name=name, position_at=_EPOCH, position_id=0)
+        db.add(watermark)
+    column = STREAMS[name]
+    # Ordered and cut off the way keyset_after compares
+    position = sortable_timestamp(db.bind.dialect.name, column)
+    bound = sortable_timestamp(db.bind.dialect.name, cutoff)
+    rows = (await db.execute(
+        select(
+            SurveySubmission.id,
+            SurveySubmission.survey_id,
+            SurveySubmission.started_at,
+            SurveySubmission.completed_at,
+            SurveySubmission.overall_score,
+            *(getattr(SurveySubmission, dimension) for dimension in DIMENSIONS)
+        )
+        .where(
+            column.isnot(None),
+            position < bound,
+            keyset_after(
+                db.bind.dialect.name, column, SurveySubmission.id,
+                watermark.position_at, watermark.position_id, newest_first=False
+            )
+        )
+        .order_by(position, SurveySubmission.id)
+        .limit(ROLLUP_BATCH_SIZE)
+    )).all()
+    if len(rows) == ROLLUP_BATCH_SIZE:
+        last = rows[-1]
+        watermark.position_at = getattr(last, column.key)
+        watermark.position_id = last.id
+    else:
+        # Everything before the cutoff has been read
+        watermark.position_at = cutoff
+        watermark.position_id = 0
+    return watermark, rows
+
+
+def add_events(totals: Dict[Tuple, Dict[str, Any]], interval: str, name: str, rows: List) -> None:
+    """Add a batch of events to per-bucket totals keyed like the rollup rows."""
+    for row in rows:
+        dimensions = tuple(getattr(row, dimension) or UNKNOWN for dimension in DIMENSIONS)
+        if name == "starts":
+            entry = totals[(row.survey_id, bucket_start(row.started_at, interval), *dimensions)]
+            entry["starts"] += 1
+            continue
+        entry = totals[(row.survey_id, bucket_start(row.completed_at, interval), *dimensions)]
+        entry["completions"] += 1
+        seconds = (as_utc(row.completed_at) - as_utc(row.started_at)).total_seconds()
+        entry["duration_histogram"][duration_bucket(max(seconds, 0))] += 1
+        if row.overall_score is not None:
+            entry["scored"] += 1
+            entry["overall_score_sum"] += row.overall_score
+
+
+async def apply_totals(db: AsyncSession, rollup, totals: Dict[Tuple, Dict[str, Any]]) -> None:
+    """Add totals to their rollup rows, creating the rows that don't exist yet."""
+    if not totals:
+        return
+    existing = {}
+    buckets = {key[:2] for key in totals}
+    for row in await db.scalars(select(rollup).where(tuple_(rollup.survey_id, rollup.bucket_start).in_(buckets))):
+        existing[(row.survey_id, as_utc(row.bucket_start), *(getattr(row, dimension) for dimension in DIMENSIONS))] = row
+    for key, entry in totals.items():
+        row = existing.get(key)
+        if row is None:
+            row = rollup(
+                survey_id=key[0], bucket_start=key[1], **dict(zip(DIMENSIONS, key[2:])),
+                starts=0, completions=0, scored=0, overall_score_sum=0.0, duration_histogram={}
+            )
+            db.add(row)
+        row.starts += entry["starts"]
+        row.completions += entry["completions"]
+        row.scored += entry["scored"]
+        row.overall_score_sum += entry["overall_score_sum"]
+        histogram = dict(row.duration_histogram)
+        for bucket, count in entry["duration_histogram"].items():
+            histogram[str(bucket)] = histogram.get(str(bucket), 0) + count
+        row.duration_histogram = histogram  # reassigned, so the JSON change is written
+
+
+async def rollup_step(db: AsyncSession) -> bool:
+    """Fold the next batch of each stream into the rollups; True if more rows are waiting."""
+    cutoff = utcnow() - timedelta(seconds=ROLLUP_LAG)
+    totals = {interval: defaultdict(_new_totals) for interval in ROLLUPS}
+    more = False
+    for name in STREAMS:
+        _, rows = await read_stream(db, name, cutoff)
+        more = more or len(rows) == ROLLUP_BATCH_SIZE
+        for interval in ROLLUPS:
+            add_events(totals[interval], interval, name, rows)
+    for interval, rollup in ROLLUPS.items():
+        await apply_totals(db, rollup, totals[interval])
+    await db.commit()
+    return more
+
+
+async def rollup_watermark(db: AsyncSession) -> datetime:
+    """Time up to which both streams have been counted."""
+    positions = await db.scalars(select(RollupWatermark.position_at).where(RollupWatermark.name.in_(STREAMS)))
+    positions = [as_utc(position) for position in positions]
+    return min(positions) if len(positions) == len(STREAMS) else _EPOCH
+
+
+async def schedule_submission_rollup(db: AsyncSession) -> None:
+    """Queue a rollup run now, unless one is already queued or running."""
+    if ROLLUP_INTERVAL > 0:
+        await schedule_job(db, SUBMISSION_ROLLUP, 0)
+
+
+@job_handler(SUBMISSION_ROLLUP)
+async def roll_up_submissions(payload: Dict[str, Any]) -> None:
+    """Fold in one batch; runs again at once while catching up, else in ``ROLLUP_INTERVAL``."""
+    async with AsyncSessionLocal() as db:
+        more = await rollup_step(db)
+    async with AsyncSessionLocal() as db:
+        if more:
+            enqueue(db, SUBMISSION_ROLLUP, {})
+        elif ROLLUP_INTERVAL > 0:
+            enqueue(db, SUBMISSION_ROLLUP, {}, delay=ROLLUP_INTERVAL)
+        await db.commit()
@@ -0,0 +1,84 @@
+"""Background job worker.
+
+Runs as its own process, next to the API workers:
+
+    python -m app.jobs.worker
+    python -m app.jobs.worker --concurrency 8 --poll-interval 0.5
+    python -m app.jobs.worker --once   # drain due jobs and exit
+
+Any number of workers can run at once; each claims a batch of due jobs,
+runs them concurrently and polls again.
+"""
+import argparse
+import asyncio
+import os
+import signal
+import traceback
+
+from app.database import AsyncSessionLocal
+from app.jobs import HANDLERS, schedule_media_gc, schedule_submission_rollup
+from app.jobs.queue import JOB_VISIBILITY_TIMEOUT, claim_jobs, complete_job, fail_job
+from app.models.job import Job
+
+
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "4"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))  # seconds
+
+
+async def run_job(job: Job) -> None:
+    handler = HANDLERS.get(job.kind)
+    async with AsyncSessionLocal() as db:
+        if handler is None:
+            await fail_job(db, job, f"No handler registered for job kind {job.kind!r}", retry=False)
+            return
+        if job.attempts > job.max_attempts:
+            # Reclaimed after its last attempt timed out
+            await fail_job(db, job, "Visibility timeout expired on the final attempt", retry=False)
+            return
+        try:
+            # Finish within the visibility timeout so no other worker picks it up meanwhile
+            await asyncio.wait_for(handler(job.payload), timeout=JOB_VISIBILITY_TIMEOUT)
+        except Exception:
+            print(f"Job {job.id} ({job.kind}) failed on attempt {job.attempts}")
+            await fail_job(db, job, traceback.format_exc())
+        else:
+            await complete_job(db, job)
+
+
+async def run_worker(concurrency: int, poll_interval: float, once: bool = False) -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    print(f"Job worker started (concurrency={concurrency}, kinds={sorted(HANDLERS)})")
+    async with AsyncSessionLocal() as db:
+        await schedule_media_gc(db)
+        await schedule_submission_rollup(db)
+    while not stop.is_set():
+        async with AsyncSessionLocal() as db:
+            jobs = await claim_jobs(db, concurrency)
+        if jobs:
+            # Claimed jobs run to completion even if a stop is requested meanwhile
+            await asyncio.gather(*(run_job(job) for job in jobs))
+            continue
+        if once:
+            break
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=poll_interval)
+        except asyncio.TimeoutError:
+            pass
+    print("Job worker stopped")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the background job worker.")
+    parser.add_argument("--concurrency", type=int, default=JOB_WORKER_CONCURRENCY)
+    parser.add_argument("--poll-interval", type=float, default=JOB_POLL_INTERVAL)
+    parser.add_argument("--once", action="store_true", help="process due jobs, then exit")
+    args = parser.parse_args()
+    asyncio.run(run_worker(args.concurrency, args.poll_interval, args.once))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,15 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from app.api import surveys, submissions
-from app.database import engine, Base
+from fastapi.responses import JSONResponse, Response
+from app.api import surveys, submissions, uploads, deletions, analytics
+from app.database import async_engine, engine, Base
+from app.utils.media import ensure_media_directories
+from app.utils.profiling import ProfilingMiddleware, TimedRoute
+from app.utils.metrics import (
+    CONTENT_TYPE, DB_POOL_CHECKED_OUT, DB_POOL_OVERFLOW, METRICS_DIR, MetricsMiddleware,
+    flush_snapshots_periodically, generate_latest
+)
+import asyncio
 import os
 
 # Create database tables
@@ -13,6 +20,7 @@ app = FastAPI(
     description="Privacy-first video survey platform with face detection",
     version="1.0.0"
 )
+app.router.route_class = TimedRoute
 
 # CORS configuration
 # Allow origins from environment variable or default to localhost
@@ -28,10 +36,20 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(ProfilingMiddleware)
+# Outermost, so latency covers the other middleware too
+app.add_middleware(MetricsMiddleware)
+
+# Pool gauges are read when metrics are collected
+DB_POOL_CHECKED_OUT.set_function(lambda: async_engine.pool.checkedout())
+DB_POOL_OVERFLOW.set_function(lambda: max(async_engine.pool.overflow(), 0))
 
 # Include routers
 app.include_router(surveys.router, prefix="/api", tags=["surveys"])
 app.include_router(submissions.router, prefix="/api", tags=["submissions"])
+app.include_router(uploads.router, prefix="/api", tags=["uploads"])
+app.include_router(deletions.router, prefix="/api", tags=["deletions"])
+app.include_router(analytics.router, prefix="/api", tags=["analytics"])
 
 @app.get("/")
 async def root():
@@ -41,6 +59,21 @@ async def root():
 async def health():
     return {"status": "healthy"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Metrics in the Prometheus text format (of all workers, with ``METRICS_DIR``)."""
+    body = await asyncio.to_thread(generate_latest) if METRICS_DIR else generate_latest()
+    return Response(body, media_type=CONTENT_TYPE)
+
+@app.on_event("startup")
+async def create_media_directories():
+    await asyncio.to_thread(ensure_media_directories)
+
+@app.on_event("startup")
+async def start_metrics_flush():
+    if METRICS_DIR:
+        app.state.metrics_flush = asyncio.create_task(flush_snapshots_periodically())
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     return JSONResponse(
@@ -1,4 +1,13 @@
 from app.models.survey import Survey, SurveyQuestion
 from app.models.submission import SurveySubmission, SurveyAnswer, MediaFile
+from app.models.upload import UploadSession
+from app.models.job import Job
+from app.models.deletion import Deletion
+from app.models.analytics import (
+    QuestionAnswerStats, SurveyStats, HourlySubmissionRollup, DailySubmissionRollup, RollupWatermark
+)
 
-__all__ = ["Survey", "SurveyQuestion", "SurveySubmission", "SurveyAnswer", "MediaFile"]
+__all__ = [
+    "Survey", "SurveyQuestion", "SurveySubmission", "SurveyAnswer", "MediaFile", "UploadSession", "Job", "Deletion",
+    "QuestionAnswerStats", "SurveyStats", "HourlySubmissionRollup", "DailySubmissionRollup", "RollupWatermark"
+]
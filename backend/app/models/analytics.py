@@ -0,0 +1,99 @@
+from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, JSON, UniqueConstraint
+from sqlalchemy.orm import declared_attr
+from app.database import Base
+
+
+class QuestionAnswerStats(Base):
+    """Running totals of a question's answers, split by face score bucket.
+
+    Each answer counts towards exactly one row: the bucket of its face score
+    (``floor(face_score)``, 0-100), or ``NO_SCORE_BUCKET`` if it has none.
+    Writers add the change they make to these rows in the same transaction
+    (see ``app.utils.analytics``), so reading a question's statistics costs
+    at most 102 rows however many answers it has. The buckets double as a
+    histogram, which is where score percentiles come from.
+    """
+    __tablename__ = "question_answer_stats"
+
+    question_id = Column(Integer, ForeignKey("survey_questions.id"), primary_key=True)
+    score_bucket = Column(Integer, primary_key=True)
+    survey_id = Column(Integer, ForeignKey("surveys.id"), nullable=False, index=True)
+    answers = Column(Integer, nullable=False, default=0)
+    yes_answers = Column(Integer, nullable=False, default=0)
+    face_detected = Column(Integer, nullable=False, default=0)
+    face_score_sum = Column(Float, nullable=False, default=0)
+
+
+class SurveyStats(Base):
+    """Running totals of a survey's submissions, maintained like ``QuestionAnswerStats``.
+
+    Every start and completion of a survey updates its totals, so they are
+    spread over ``SURVEY_STATS_SHARDS`` rows (``shard``) that writers pick at
+    random and readers sum; concurrent respondents rarely wait on each other.
+    """
+    __tablename__ = "survey_stats"
+
+    survey_id = Column(Integer, ForeignKey("surveys.id"), primary_key=True)
+    shard = Column(Integer, primary_key=True, default=0)
+    started = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    scored = Column(Integer, nullable=False, default=0)  # completed with an overall score
+    overall_score_sum = Column(Float, nullable=False, default=0)
+
+
+class SubmissionRollup:
+    """Submission counts for one survey, time bucket and combination of device, browser, OS and location.
+
+    Starts are counted in the bucket of ``started_at``, completions in the
+    bucket of ``completed_at``. Written only by the ``analytics.rollup`` job,
+    which folds in submissions past its watermarks (see ``RollupWatermark``).
+    Completion times are kept as a histogram (see
+    ``app.utils.analytics.duration_bucket``) so buckets can be merged and
+    still give a median.
+    """
+    id = Column(Integer, primary_key=True)
+    bucket_start = Column(DateTime(timezone=True), nullable=False)  # UTC
+    device = Column(String, nullable=False)  # "Unknown" when not recorded
+    browser = Column(String, nullable=False)
+    os = Column(String, nullable=False)
+    location = Column(String, nullable=False)
+    starts = Column(Integer, nullable=False, default=0)
+    completions = Column(Integer, nullable=False, default=0)
+    scored = Column(Integer, nullable=False, default=0)  # completions with an overall score
+    overall_score_sum = Column(Float, nullable=False, default=0)
+    duration_histogram = Column(JSON, nullable=False, default=dict)  # {duration bucket: completions}
+
+    @declared_attr
+    def survey_id(cls):
+        return Column(Integer, ForeignKey("surveys.id"), nullable=False)
+
+    @declared_attr
+    def __table_args__(cls):
+        # Also serves time range reads of a survey
+        return (
+            UniqueConstraint(
+                "survey_id", "bucket_start", "device", "browser", "os", "location",
+                name=f"uq_{cls.__tablename__}_key"
+            ),
+        )
+
+
+class HourlySubmissionRollup(SubmissionRollup, Base):
+    __tablename__ = "submission_rollups_hourly"
+
+
+class DailySubmissionRollup(SubmissionRollup, Base):
+    __tablename__ = "submission_rollups_daily"
+
+
+class RollupWatermark(Base):
+    """How far the ``analytics.rollup`` job has read a stream of submission events.
+
+    Events are read in ``(timestamp, id)`` order; everything up to and
+    including this position has been counted.
+    """
+    __tablename__ = "rollup_watermarks"
+
+    name = Column(String, primary_key=True)  # "starts" or "completions"
+    position_at = Column(DateTime(timezone=True), nullable=False)
+    position_id = Column(Integer, nullable=False)
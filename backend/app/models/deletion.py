@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class Deletion(Base):
+    """Progress of deleting a survey or submission in the background.
+
+    The target is tombstoned (``deleted_at``) when the deletion is created;
+    its rows are then removed in batches by ``deletion.run`` jobs and its
+    files by ``media.delete`` jobs. This row outlives the target so the
+    progress can still be read once everything is gone.
+    """
+    __tablename__ = "deletions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    target = Column(String, nullable=False)  # "survey" or "submission"
+    target_id = Column(Integer, nullable=False)
+    status = Column(String, nullable=False, default="deleting_rows")  # then "deleting_files", then "completed"
+    submissions_total = Column(Integer, nullable=False, default=0)
+    submissions_deleted = Column(Integer, nullable=False, default=0)
+    files_total = Column(Integer, nullable=False, default=0)  # files queued for removal so far
+    files_deleted = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Float
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, DateTime, ForeignKey, Float, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from app.database import Base
 
 
@@ -17,14 +17,33 @@ class SurveySubmission(Base):
     started_at = Column(DateTime(timezone=True), server_default=func.now())
     completed_at = Column(DateTime(timezone=True), nullable=True)
     overall_score = Column(Float, nullable=True)
+    # Tombstone: set when deletion starts; the rows are removed by a background job
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Serves the keyset-paginated listing: newest first within a survey
+        Index("ix_survey_submissions_survey_started", "survey_id", started_at.desc(), id.desc()),
+        # Serve the rollup job reading new starts and completions in order
+        Index("ix_survey_submissions_started_id", started_at, id),
+        Index("ix_survey_submissions_completed_id", completed_at, id),
+    )
 
     survey = relationship("Survey", back_populates="submissions")
     answers = relationship("SurveyAnswer", back_populates="submission", cascade="all, delete-orphan")
     media_files = relationship("MediaFile", back_populates="submission", cascade="all, delete-orphan")
+    upload_sessions = relationship("UploadSession", back_populates="submission", cascade="all, delete-orphan")
 
 
 class SurveyAnswer(Base):
     __tablename__ = "survey_answers"
+    __table_args__ = (
+        UniqueConstraint("submission_id", "question_id", name="uq_survey_answers_submission_question"),
+        Index(
+            "ix_survey_answers_face_unverified",
+            "id",
+            postgresql_where=text("face_image_path IS NOT NULL AND server_face_detected IS NULL")
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     submission_id = Column(Integer, ForeignKey("survey_submissions.id"), nullable=False)
@@ -33,6 +52,11 @@ class SurveyAnswer(Base):
     face_detected = Column(Boolean, default=False)
     face_score = Column(Float, nullable=True)  # 0-100
     face_image_path = Column(String, nullable=True)
+    # Server-side re-check of the face image; NULL until verified
+    server_face_detected = Column(Boolean, nullable=True)
+    server_face_score = Column(Float, nullable=True)  # 0-100
+    # Set while a face.verify run is checking the image; expires after FACE_VERIFY_CLAIM_TIMEOUT
+    face_verify_claimed_at = Column(DateTime(timezone=True), nullable=True)
 
     submission = relationship("SurveySubmission", back_populates="answers")
     question = relationship("SurveyQuestion", back_populates="answers")
@@ -42,9 +66,14 @@ class MediaFile(Base):
     __tablename__ = "media_files"
 
     id = Column(Integer, primary_key=True, index=True)
-    submission_id = Column(Integer, ForeignKey("survey_submissions.id"), nullable=False)
+    submission_id = Column(Integer, ForeignKey("survey_submissions.id"), nullable=False, index=True)
     type = Column(String, nullable=False)  # "video" or "image"
-    path = Column(String, nullable=False)
+    # Content-addressed files are shared by every row with the same path,
+    # and removed once no row references them
+    path = Column(String, nullable=False, index=True)
+    question_number = Column(Integer, nullable=True)  # NULL for the full session video
+    size_bytes = Column(BigInteger, nullable=True)
+    checksum = Column(String(64), nullable=True)  # hex SHA-256
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     submission = relationship("SurveySubmission", back_populates="media_files")
@@ -11,9 +11,18 @@ class Survey(Base):
     title = Column(String, nullable=False)
     is_active = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Tombstone: set when deletion starts; the rows are removed by a background job
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
 
-    questions = relationship("SurveyQuestion", back_populates="survey", cascade="all, delete-orphan")
-    submissions = relationship("SurveySubmission", back_populates="survey")
+    questions = relationship(
+        "SurveyQuestion",
+        back_populates="survey",
+        cascade="all, delete-orphan",
+        order_by="SurveyQuestion.order"
+    )
+    # Submissions and answers are always deleted explicitly before their parent,
+    # so don't load them just to null out their foreign keys
+    submissions = relationship("SurveySubmission", back_populates="survey", passive_deletes=True)
 
 
 class SurveyQuestion(Base):
@@ -25,4 +34,4 @@ class SurveyQuestion(Base):
     order = Column(Integer, nullable=False)  # 1-5
 
     survey = relationship("Survey", back_populates="questions")
-    answers = relationship("SurveyAnswer", back_populates="question")
+    answers = relationship("SurveyAnswer", back_populates="question", passive_deletes=True)
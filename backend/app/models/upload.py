@@ -0,0 +1,25 @@
+import uuid
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class UploadSession(Base):
+    __tablename__ = "upload_sessions"
+
+    id = Column(String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    submission_id = Column(Integer, ForeignKey("survey_submissions.id"), nullable=False, index=True)
+    type = Column(String, nullable=False)  # "video" or "image"
+    question_number = Column(Integer, nullable=True)
+    offset = Column(BigInteger, nullable=False, default=0)  # bytes received so far
+    total_size = Column(BigInteger, nullable=True)  # declared size, if known up front
+    status = Column(String, nullable=False, default="active")  # "active" or "completed"
+    # Set for direct uploads: the client PUTs the file to this key in storage
+    storage_key = Column(String, nullable=True, index=True)
+    media_file_id = Column(Integer, ForeignKey("media_files.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    submission = relationship("SurveySubmission", back_populates="upload_sessions")
+    media_file = relationship("MediaFile")
@@ -1,17 +1,27 @@
-from app.schemas.survey import SurveyCreate, SurveyResponse, QuestionCreate, QuestionResponse, SurveyPublish
+from app.schemas.survey import (
+    SurveyCreate, SurveyResponse, SurveyListResponse, QuestionCreate, QuestionResponse, SurveyPublish
+)
 from app.schemas.submission import (
     SubmissionStart, SubmissionStartResponse,
     AnswerSubmit, AnswerResponse,
+    AnswerBatchSubmit, AnswerBatchResponse,
     MediaUpload, MediaResponse,
     SubmissionComplete, SubmissionResponse,
     ExportResponse
 )
+from app.schemas.upload import (
+    UploadSessionCreate, UploadSessionResponse, DirectUploadCreate, DirectUploadResponse
+)
+from app.schemas.deletion import DeletionResponse
 
 __all__ = [
-    "SurveyCreate", "SurveyResponse", "QuestionCreate", "QuestionResponse", "SurveyPublish",
+    "SurveyCreate", "SurveyResponse", "SurveyListResponse", "QuestionCreate", "QuestionResponse", "SurveyPublish",
     "SubmissionStart", "SubmissionStartResponse",
     "AnswerSubmit", "AnswerResponse",
+    "AnswerBatchSubmit", "AnswerBatchResponse",
     "MediaUpload", "MediaResponse",
     "SubmissionComplete", "SubmissionResponse",
-    "ExportResponse"
+    "ExportResponse",
+    "UploadSessionCreate", "UploadSessionResponse", "DirectUploadCreate", "DirectUploadResponse",
+    "DeletionResponse"
 ]
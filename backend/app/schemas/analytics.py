@@ -0,0 +1,43 @@
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+from datetime import datetime
+
+
+class QuestionAnalytics(BaseModel):
+    question_id: int
+    question_order: int
+    question_text: str
+    answers: int
+    yes_answers: int
+    no_answers: int
+    face_detected: int
+    face_detected_ratio: Optional[float]  # of all answers
+    face_scores: int  # answers with a face score
+    face_score_mean: Optional[float]
+    face_score_percentiles: Dict[str, float]  # "p50": ..., to one point
+
+
+class SurveyAnalyticsResponse(BaseModel):
+    survey_id: int
+    started: int
+    completed: int
+    completion_rate: Optional[float]
+    overall_score_mean: Optional[float]
+    questions: List[QuestionAnalytics]
+
+
+class TimeSeriesPoint(BaseModel):
+    bucket_start: datetime
+    group: Optional[str] = None  # value of the group_by dimension
+    starts: int
+    completions: int
+    median_completion_seconds: Optional[float]
+    overall_score_mean: Optional[float]
+
+
+class TimeSeriesResponse(BaseModel):
+    survey_id: int
+    interval: str
+    group_by: Optional[str]
+    complete_until: datetime  # submissions before this are counted
+    points: List[TimeSeriesPoint]
@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+
+
+class DeletionResponse(BaseModel):
+    id: int
+    target: str
+    target_id: int
+    status: str
+    submissions_total: int
+    submissions_deleted: int
+    files_total: int
+    files_deleted: int
+    created_at: datetime
+    finished_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
@@ -20,6 +20,10 @@ class AnswerSubmit(BaseModel):
     face_score: Optional[float] = Field(None, ge=0, le=100)
 
 
+class AnswerBatchSubmit(BaseModel):
+    answers: List[AnswerSubmit] = Field(..., min_length=1, max_length=5)
+
+
 class AnswerResponse(BaseModel):
     id: int
     submission_id: int
@@ -32,6 +36,10 @@ class AnswerResponse(BaseModel):
         from_attributes = True
 
 
+class AnswerBatchResponse(BaseModel):
+    answers: List[AnswerResponse]
+
+
 class MediaUpload(BaseModel):
     type: str = Field(..., pattern="^(video|image)$")
     question_number: Optional[int] = Field(None, ge=1, le=5)
@@ -42,6 +50,9 @@ class MediaResponse(BaseModel):
     submission_id: int
     type: str
     path: str
+    question_number: Optional[int] = None
+    size_bytes: Optional[int] = None
+    checksum: Optional[str] = None
     created_at: datetime
 
     class Config:
@@ -82,6 +93,8 @@ class AnswerWithQuestion(BaseModel):
     face_detected: bool
     face_score: Optional[float]
     face_image_path: Optional[str]
+    server_face_detected: Optional[bool] = None
+    server_face_score: Optional[float] = None
 
     class Config:
         from_attributes = True
@@ -106,3 +119,6 @@ class SubmissionDetailResponse(BaseModel):
 
 class SubmissionListResponse(BaseModel):
     submissions: List[SubmissionResponse]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+    total_is_estimate: bool = False
@@ -35,3 +35,8 @@ class SurveyResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class SurveyListResponse(BaseModel):
+    surveys: List[SurveyResponse]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,40 @@
+from pydantic import BaseModel, Field
+from typing import Dict, Optional
+from datetime import datetime
+
+
+class UploadSessionCreate(BaseModel):
+    type: str = Field(..., pattern="^(video|image)$")
+    question_number: Optional[int] = Field(None, ge=1, le=5)
+    total_size: Optional[int] = Field(None, ge=0)
+
+
+class UploadSessionResponse(BaseModel):
+    id: str
+    submission_id: int
+    type: str
+    question_number: Optional[int]
+    offset: int
+    total_size: Optional[int]
+    status: str
+    media_file_id: Optional[int]
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class DirectUploadCreate(BaseModel):
+    type: str = Field(..., pattern="^(video|image)$")
+    question_number: Optional[int] = Field(None, ge=1, le=5)
+    size: int = Field(..., gt=0)
+    content_type: str
+
+
+class DirectUploadResponse(BaseModel):
+    """Where to send the file; then call ``POST /uploads/{upload_id}/confirm``."""
+    upload_id: str
+    url: str
+    method: str
+    headers: Dict[str, str]
+    expires_at: Optional[datetime] = None
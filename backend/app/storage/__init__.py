@@ -0,0 +1,112 @@
+"""Media storage backends and the content-addressed object store on top of them."""
+import importlib
+import os
+from typing import Optional
+
+import aiofiles.os
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.storage.base import MEDIA_URL_PREFIX, STORAGE_URL_EXPIRES, PresignedRequest, StorageBackend, StoredObject
+from app.storage.local import LocalStorage
+from app.utils.media import StoredMedia, get_media_file_name, lock_media_objects, remove_file_quietly
+from app.utils.profiling import timed
+
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+
+_storage: Optional[StorageBackend] = None
+
+
+def load_storage_backend(spec: str) -> StorageBackend:
+    """Build a storage backend from a setting value.
+
+    ``spec`` is ``"local"``, ``"s3"`` or the import path of a
+    ``StorageBackend`` subclass (``"package.module:ClassName"``), which is
+    constructed without arguments.
+    """
+    if spec == "local":
+        return LocalStorage()
+    if spec == "s3":
+        from app.storage.s3 import S3Storage
+        return S3Storage()
+    module_name, _, class_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+def get_storage() -> StorageBackend:
+    """The storage backend selected by ``STORAGE_BACKEND`` (one per process)."""
+    global _storage
+    if _storage is None:
+        _storage = load_storage_backend(STORAGE_BACKEND)
+    return _storage
+
+
+async def store_media_file(
+    db: AsyncSession,
+    local_path: str,
+    checksum: str,
+    media_type: str,
+    keep_source: bool = False
+) -> str:
+    """Put a local file into the content-addressed store and return its key.
+
+    If an object with the same bytes exists, the file is dropped and the
+    existing object reused, so identical uploads are stored once. The object
+    is locked for the rest of ``db``'s transaction (see
+    ``lock_media_objects``); the caller must commit a MediaFile referencing
+    it. With ``keep_source`` the local file is left in place.
+    """
+    storage = get_storage()
+    key = storage.object_key(checksum, media_type)
+    await lock_media_objects(db, [key])
+    if await storage.exists(key):
+        if not keep_source:
+            await remove_file_quietly(local_path)
+    else:
+        with timed("io"):
+            await storage.put_file(local_path, key, keep_source=keep_source)
+    return key
+
+
+async def promote_media_object(db: AsyncSession, staging_key: str, checksum: str, media_type: str) -> str:
+    """Copy a stored file into the content-addressed store and return its key.
+
+    Like ``store_media_file``, but for a file already in storage (a finalized
+    upload). The staging copy is kept; delete it once the new key is committed.
+    """
+    storage = get_storage()
+    key = storage.object_key(checksum, media_type)
+    await lock_media_objects(db, [key])
+    if not await storage.exists(key):
+        await storage.copy(staging_key, key)
+    return key
+
+
+async def finalize_upload_file(
+    part_path: str,
+    submission_id: int,
+    media_type: str,
+    question_number: Optional[int] = None
+) -> StoredMedia:
+    """Store a completed resumable upload under a staging key.
+
+    The checksum is left to the ``media.inspect`` background job, so that
+    finalizing a large video doesn't read it back on the request path. That
+    job then moves the file into the content-addressed store.
+
+    The partial file is left in place (local storage hard-links it), so a
+    finalize whose transaction fails can be retried; the caller removes it
+    once the MediaFile is committed.
+    """
+    size = (await aiofiles.os.stat(part_path)).st_size
+    storage = get_storage()
+    key = storage.staging_key(media_type, get_media_file_name(submission_id, media_type, question_number))
+    await storage.put_file(part_path, key, keep_source=True)
+    return StoredMedia(path=key, size=size)
+
+
+__all__ = [
+    "MEDIA_URL_PREFIX", "STORAGE_URL_EXPIRES", "PresignedRequest", "StorageBackend", "StoredObject", "LocalStorage",
+    "load_storage_backend", "get_storage", "store_media_file", "promote_media_object",
+    "finalize_upload_file"
+]
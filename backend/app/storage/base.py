@@ -0,0 +1,150 @@
+"""Storage backend interface for media files."""
+from abc import ABC, abstractmethod
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+import hashlib
+import os
+from typing import AsyncContextManager, AsyncIterator, Dict, List, Optional
+
+
+MEDIA_URL_PREFIX = "/api/media/"
+STORAGE_URL_EXPIRES = int(os.getenv("STORAGE_URL_EXPIRES", "900"))  # lifetime of presigned URLs, seconds
+
+
+@dataclass
+class StoredObject:
+    """A file found by ``StorageBackend.scan``."""
+    key: str
+    size: int
+    modified_at: float  # Unix timestamp
+
+
+@dataclass
+class PresignedRequest:
+    """A request the client can send straight to the storage service."""
+    url: str
+    method: str
+    expires_at: datetime
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+class StorageBackend(ABC):
+    """Where media files are kept.
+
+    Files are addressed by key; keys are what ``MediaFile.path`` stores. The
+    local filesystem backend is the default; another backend (e.g. S3) is
+    selected with the ``STORAGE_BACKEND`` setting.
+
+    Backends that can hand out presigned URLs let clients upload and download
+    directly, so media bytes don't pass through the API workers. The others
+    return None from ``presign_upload``/``presign_download`` and the API
+    carries the bytes itself.
+    """
+
+    @abstractmethod
+    def object_key(self, checksum: str, media_type: str) -> str:
+        """Key of the content-addressed object for a SHA-256."""
+
+    @abstractmethod
+    def staging_key(self, media_type: str, name: str) -> str:
+        """Key for a file that is not content addressed yet (named ``name``)."""
+
+    @abstractmethod
+    def url_path(self, key: str) -> str:
+        """Path part of the ``/api/media/...`` URL that serves ``key``."""
+
+    def media_url(self, key: str) -> str:
+        """URL that serves ``key`` (what ``SurveyAnswer.face_image_path`` stores)."""
+        return MEDIA_URL_PREFIX + self.url_path(key)
+
+    @abstractmethod
+    def key_from_url_path(self, url_path: str) -> str:
+        """Key for the path part of a ``/api/media/...`` URL.
+
+        Raises ValueError for paths outside the store.
+        """
+
+    def key_from_url(self, url: str) -> str:
+        """Inverse of ``media_url``."""
+        if url.startswith(MEDIA_URL_PREFIX):
+            url = url[len(MEDIA_URL_PREFIX):]
+        return self.key_from_url_path(url)
+
+    def canonical_key(self, key: str) -> str:
+        """The spelling of ``key`` that scans and newly stored files use."""
+        return key
+
+    def key_aliases(self, key: str) -> List[str]:
+        """Spellings of ``key`` that ``MediaFile.path`` may hold, ``key`` itself included."""
+        return list(dict.fromkeys([key, self.canonical_key(key)]))
+
+    @abstractmethod
+    def version(self, key: str) -> str:
+        """A string that changes whenever the content under ``key`` does."""
+
+    def local_path(self, key: str) -> Optional[str]:
+        """The file on local disk holding ``key``, if the backend has one."""
+        return None
+
+    @abstractmethod
+    async def size(self, key: str) -> Optional[int]:
+        """Size in bytes, or None if nothing is stored under ``key``."""
+
+    async def exists(self, key: str) -> bool:
+        return await self.size(key) is not None
+
+    @abstractmethod
+    async def put_file(self, local_path: str, key: str, keep_source: bool = False) -> None:
+        """Store a local file under ``key``; the file is moved unless ``keep_source``."""
+
+    @abstractmethod
+    async def copy(self, source_key: str, key: str) -> None:
+        """Store the content under ``source_key`` under ``key`` as well."""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Remove ``key``; deleting a missing key is not an error."""
+
+    @abstractmethod
+    def read(self, key: str) -> AsyncIterator[bytes]:
+        """The content under ``key``, in chunks. Raises FileNotFoundError if missing."""
+
+    async def sha256(self, key: str) -> str:
+        hasher = hashlib.sha256()
+        async for chunk in self.read(key):
+            hasher.update(chunk)
+        return hasher.hexdigest()
+
+    @abstractmethod
+    def scan(self, after: Optional[str] = None) -> AsyncIterator[StoredObject]:
+        """Every stored file, in a stable order, streamed rather than listed up front.
+
+        With ``after`` (a key from an earlier scan) the scan resumes after it.
+        """
+
+    @abstractmethod
+    def local_file(self, key: str) -> AsyncContextManager[str]:
+        """A local file with the content of ``key`` for the duration of the block."""
+
+    @asynccontextmanager
+    async def local_files(self, keys: List[str], missing_ok: bool = False) -> AsyncIterator[List[str]]:
+        """``local_file`` for several keys; with ``missing_ok`` missing keys get an empty file."""
+        async with AsyncExitStack() as stack:
+            paths = []
+            for key in keys:
+                try:
+                    paths.append(await stack.enter_async_context(self.local_file(key)))
+                except FileNotFoundError:
+                    if not missing_ok:
+                        raise
+                    paths.append(os.devnull)
+            yield paths
+
+    async def presign_upload(self, key: str, content_type: str, size: int) -> Optional[PresignedRequest]:
+        """A URL the client can upload ``key`` to directly, or None if unsupported."""
+        return None
+
+    async def presign_download(self, key: str, content_type: str, filename: Optional[str] = None) -> Optional[str]:
+        """A URL the client can download ``key`` from directly, or None if unsupported."""
+        return None
@@ -0,0 +1,173 @@
+"""Local filesystem storage under ``MEDIA_ROOT``."""
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+
+import aiofiles
+import aiofiles.os
+
+from app.storage.base import MEDIA_URL_PREFIX, StorageBackend, StoredObject
+from app.utils.media import (
+    UPLOAD_CHUNK_SIZE, compute_file_checksum, get_media_root, get_media_tmp_dir, get_media_url, get_object_path
+)
+
+
+# Directories under MEDIA_ROOT holding media, in scan order (the thumbnail cache is not media)
+SCAN_DIRECTORIES = ("images", "objects", "tmp", "videos")
+SCAN_BATCH_SIZE = 1000
+
+
+def _walk_sorted(path: str, parts: Tuple[str, ...], after: Optional[Tuple[str, ...]]) -> Iterator[StoredObject]:
+    """Files under ``path`` in path-component order, skipping those up to ``after``."""
+    try:
+        entries = sorted(os.scandir(path), key=lambda entry: entry.name)
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        entry_parts = parts + (entry.name,)
+        if entry.is_dir(follow_symlinks=False):
+            # Skip whole subtrees that sort before the resume point
+            if after is not None and entry_parts < after[:len(entry_parts)]:
+                continue
+            yield from _walk_sorted(entry.path, entry_parts, after)
+        elif entry.is_file(follow_symlinks=False):
+            if after is not None and entry_parts <= after:
+                continue
+            stat = entry.stat(follow_symlinks=False)
+            yield StoredObject(key=entry.path, size=stat.st_size, modified_at=stat.st_mtime)
+
+
+def _next_batch(files: Iterator[StoredObject]) -> List[StoredObject]:
+    return [item for _, item in zip(range(SCAN_BATCH_SIZE), files)]
+
+
+class LocalStorage(StorageBackend):
+    """Media files on the local filesystem; keys are file paths.
+
+    Uploads and downloads go through the API (``file_response`` serves
+    ranges and validators), so nothing is presigned.
+    """
+
+    def object_key(self, checksum: str, media_type: str) -> str:
+        return get_object_path(checksum, media_type)
+
+    def staging_key(self, media_type: str, name: str) -> str:
+        directory = "videos" if media_type == "video" else "images"
+        return f"{get_media_root()}/{directory}/{name}"
+
+    def url_path(self, key: str) -> str:
+        return get_media_url(key)[len(MEDIA_URL_PREFIX):]
+
+    def key_from_url_path(self, url_path: str) -> str:
+        media_root = get_media_root()
+        # Handle both relative paths (images/...) and full paths
+        if os.path.isabs(url_path) and url_path.startswith(media_root):
+            file_path = url_path
+        else:
+            file_path = os.path.join(media_root, url_path.replace("\\", "/").lstrip("/"))
+
+        # Must be within the media root, and not an in-progress upload
+        abs_file_path = os.path.abspath(file_path)
+        if not abs_file_path.startswith(os.path.abspath(media_root) + os.sep):
+            raise ValueError("Path is outside the media root")
+        if abs_file_path.startswith(os.path.abspath(get_media_tmp_dir()) + os.sep):
+            raise ValueError("In-progress uploads are not served")
+        return file_path
+
+    def _relative_key(self, key: str) -> Optional[str]:
+        """``key`` relative to the media root, or None if outside it.
+
+        Symlinks are resolved only when the plain absolute paths don't match,
+        so a symlinked subdirectory doesn't take its files out of the root.
+        """
+        media_root = get_media_root()
+        for resolve in (os.path.abspath, os.path.realpath):
+            relative = os.path.relpath(resolve(key), resolve(media_root))
+            if relative != os.curdir and relative.split(os.sep)[0] != os.pardir:
+                return relative.replace(os.sep, "/")
+        return None
+
+    def canonical_key(self, key: str) -> str:
+        relative = self._relative_key(key)
+        return key if relative is None else f"{get_media_root()}/{relative}"
+
+    def key_aliases(self, key: str) -> List[str]:
+        # Rows may have been written with MEDIA_ROOT spelled differently
+        # (relative or absolute, through a symlink or not)
+        relative = self._relative_key(key)
+        if relative is None:
+            return [key]
+        media_root = get_media_root()
+        roots = dict.fromkeys([
+            media_root, os.path.normpath(media_root), os.path.abspath(media_root), os.path.realpath(media_root)
+        ])
+        return list(dict.fromkeys([key] + [f"{root}/{relative}" for root in roots]))
+
+    def version(self, key: str) -> str:
+        stat = os.stat(key)
+        return f"{os.path.abspath(key)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+    def local_path(self, key: str) -> Optional[str]:
+        return key
+
+    async def size(self, key: str) -> Optional[int]:
+        try:
+            return (await aiofiles.os.stat(key)).st_size
+        except FileNotFoundError:
+            return None
+
+    async def put_file(self, local_path: str, key: str, keep_source: bool = False) -> None:
+        await aiofiles.os.makedirs(os.path.dirname(key), exist_ok=True)
+        if keep_source:
+            await self.copy(local_path, key)
+        else:
+            await aiofiles.os.replace(local_path, key)
+
+    async def copy(self, source_key: str, key: str) -> None:
+        await aiofiles.os.makedirs(os.path.dirname(key), exist_ok=True)
+        # A hard link shares the bytes instead of copying them
+        try:
+            await aiofiles.os.link(source_key, key)
+        except FileExistsError:
+            pass
+
+    async def delete(self, key: str) -> None:
+        try:
+            await aiofiles.os.remove(key)
+        except FileNotFoundError:
+            pass
+
+    async def read(self, key: str) -> AsyncIterator[bytes]:
+        async with aiofiles.open(key, "rb") as f:
+            while True:
+                chunk = await f.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+    async def sha256(self, key: str) -> str:
+        return await asyncio.to_thread(compute_file_checksum, key)
+
+    async def scan(self, after: Optional[str] = None) -> AsyncIterator[StoredObject]:
+        media_root = get_media_root()
+        after_parts = None
+        if after is not None:
+            after_parts = tuple(os.path.relpath(after, media_root).split(os.sep))
+        for directory in SCAN_DIRECTORIES:
+            if after_parts is not None and (directory,) < after_parts[:1]:
+                continue
+            files = _walk_sorted(f"{media_root}/{directory}", (directory,), after_parts)
+            # Directory listings are read on a thread, a batch at a time
+            while True:
+                batch = await asyncio.to_thread(_next_batch, files)
+                if not batch:
+                    break
+                for item in batch:
+                    yield item
+
+    @asynccontextmanager
+    async def local_file(self, key: str) -> AsyncIterator[str]:
+        if not os.path.exists(key):
+            raise FileNotFoundError(key)
+        yield key
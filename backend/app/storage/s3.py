@@ -0,0 +1,205 @@
+"""S3-compatible object storage (AWS S3, MinIO, ...).
+
+boto3 is an optional dependency (see requirements-s3.txt). Credentials come
+from the usual AWS sources (``AWS_ACCESS_KEY_ID``/``AWS_SECRET_ACCESS_KEY``,
+instance roles, ...).
+
+Every key under this backend is written once (content-addressed objects and
+uniquely named uploads), so a key identifies its content.
+"""
+import asyncio
+import os
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Optional
+
+try:
+    import boto3
+    from botocore.config import Config
+    from botocore.exceptions import ClientError
+except ImportError:  # optional dependency
+    boto3 = None
+
+from app.storage.base import STORAGE_URL_EXPIRES, PresignedRequest, StorageBackend, StoredObject
+from app.utils.http import IMMUTABLE_CACHE_CONTROL
+from app.utils.media import (
+    MEDIA_EXTENSIONS, UPLOAD_CHUNK_SIZE, get_media_tmp_dir, guess_media_type, remove_file_quietly
+)
+
+
+S3_BUCKET = os.getenv("S3_BUCKET", "")
+S3_PREFIX = os.getenv("S3_PREFIX", "media/")
+S3_REGION = os.getenv("S3_REGION") or None
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None
+# Endpoint that browsers use, when it differs from the one the API uses
+# (e.g. http://minio:9000 inside docker-compose, http://localhost:9000 outside)
+S3_PUBLIC_ENDPOINT_URL = os.getenv("S3_PUBLIC_ENDPOINT_URL") or S3_ENDPOINT_URL
+
+
+class S3StorageUnavailable(RuntimeError):
+    """Raised when the S3 backend is selected without boto3 installed."""
+
+    def __init__(self):
+        super().__init__("The S3 storage backend requires boto3 (pip install -r requirements-s3.txt)")
+
+
+def _is_not_found(error: "ClientError") -> bool:
+    return error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+
+class S3Storage(StorageBackend):
+    """Media objects in an S3 bucket; keys are object keys (including ``prefix``).
+
+    Clients upload with presigned PUTs and are redirected to presigned GETs,
+    which also handle byte ranges, so the API never carries media bytes on
+    those paths.
+    """
+
+    def __init__(
+        self,
+        bucket: str = S3_BUCKET,
+        prefix: str = S3_PREFIX,
+        endpoint_url: Optional[str] = S3_ENDPOINT_URL,
+        public_endpoint_url: Optional[str] = S3_PUBLIC_ENDPOINT_URL,
+        region: Optional[str] = S3_REGION,
+        url_expires: int = STORAGE_URL_EXPIRES
+    ):
+        if boto3 is None:
+            raise S3StorageUnavailable()
+        if not bucket:
+            raise ValueError("S3_BUCKET must be set for the S3 storage backend")
+        self.bucket = bucket
+        self.prefix = prefix
+        self.url_expires = url_expires
+        config = Config(signature_version="s3v4", s3={"addressing_style": "path"} if endpoint_url else {})
+        self.client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region, config=config)
+        # Presigned URLs are signed for the host the browser will connect to
+        self.presign_client = self.client
+        if public_endpoint_url != endpoint_url:
+            self.presign_client = boto3.client(
+                "s3", endpoint_url=public_endpoint_url, region_name=region, config=config
+            )
+
+    def object_key(self, checksum: str, media_type: str) -> str:
+        return f"{self.prefix}objects/{checksum[:2]}/{checksum[2:4]}/{checksum}{MEDIA_EXTENSIONS[media_type]}"
+
+    def staging_key(self, media_type: str, name: str) -> str:
+        return f"{self.prefix}uploads/{name}"
+
+    def url_path(self, key: str) -> str:
+        return key
+
+    def key_from_url_path(self, url_path: str) -> str:
+        key = url_path.replace("\\", "/").lstrip("/")
+        if not key.startswith(self.prefix) or ".." in key.split("/"):
+            raise ValueError("Path is outside the media store")
+        return key
+
+    def version(self, key: str) -> str:
+        return key
+
+    def _object_args(self, key: str) -> dict:
+        # Served as-is by presigned GETs; keys are never rewritten, so they cache forever
+        return {"ContentType": guess_media_type(key), "CacheControl": IMMUTABLE_CACHE_CONTROL}
+
+    async def size(self, key: str) -> Optional[int]:
+        try:
+            head = await asyncio.to_thread(self.client.head_object, Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if _is_not_found(e):
+                return None
+            raise
+        return head["ContentLength"]
+
+    async def put_file(self, local_path: str, key: str, keep_source: bool = False) -> None:
+        # upload_file switches to a multipart upload for large files
+        await asyncio.to_thread(
+            self.client.upload_file, local_path, self.bucket, key, ExtraArgs=self._object_args(key)
+        )
+        if not keep_source:
+            await remove_file_quietly(local_path)
+
+    async def copy(self, source_key: str, key: str) -> None:
+        await asyncio.to_thread(
+            self.client.copy,
+            {"Bucket": self.bucket, "Key": source_key},
+            self.bucket,
+            key,
+            ExtraArgs={"MetadataDirective": "REPLACE", **self._object_args(key)}
+        )
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self.client.delete_object, Bucket=self.bucket, Key=key)
+
+    async def read(self, key: str) -> AsyncIterator[bytes]:
+        try:
+            response = await asyncio.to_thread(self.client.get_object, Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if _is_not_found(e):
+                raise FileNotFoundError(key) from e
+            raise
+        body = response["Body"]
+        try:
+            while True:
+                chunk = await asyncio.to_thread(body.read, UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            body.close()
+
+    async def scan(self, after: Optional[str] = None) -> AsyncIterator[StoredObject]:
+        # Keys are listed in UTF-8 binary order, 1000 per page
+        pages = iter(self.client.get_paginator("list_objects_v2").paginate(
+            Bucket=self.bucket, Prefix=self.prefix, StartAfter=after or ""
+        ))
+        while True:
+            page = await asyncio.to_thread(next, pages, None)
+            if page is None:
+                break
+            for item in page.get("Contents", []):
+                yield StoredObject(key=item["Key"], size=item["Size"], modified_at=item["LastModified"].timestamp())
+
+    @asynccontextmanager
+    async def local_file(self, key: str) -> AsyncIterator[str]:
+        os.makedirs(get_media_tmp_dir(), exist_ok=True)
+        path = f"{get_media_tmp_dir()}/{uuid.uuid4().hex}{os.path.splitext(key)[1]}"
+        try:
+            try:
+                await asyncio.to_thread(self.client.download_file, self.bucket, key, path)
+            except ClientError as e:
+                if _is_not_found(e):
+                    raise FileNotFoundError(key) from e
+                raise
+            yield path
+        finally:
+            await remove_file_quietly(path)
+
+    def _expires_at(self) -> datetime:
+        return datetime.now(timezone.utc) + timedelta(seconds=self.url_expires)
+
+    async def presign_upload(self, key: str, content_type: str, size: int) -> Optional[PresignedRequest]:
+        url = await asyncio.to_thread(
+            self.presign_client.generate_presigned_url,
+            "put_object",
+            Params={"Bucket": self.bucket, "Key": key, "ContentType": content_type, "ContentLength": size},
+            ExpiresIn=self.url_expires
+        )
+        return PresignedRequest(
+            url=url,
+            method="PUT",
+            headers={"Content-Type": content_type},
+            expires_at=self._expires_at()
+        )
+
+    async def presign_download(self, key: str, content_type: str, filename: Optional[str] = None) -> Optional[str]:
+        params = {"Bucket": self.bucket, "Key": key, "ResponseContentType": content_type}
+        if filename:
+            params["ResponseContentDisposition"] = f'inline; filename="{filename}"'
+        return await asyncio.to_thread(
+            self.presign_client.generate_presigned_url,
+            "get_object",
+            Params=params,
+            ExpiresIn=self.url_expires
+        )
@@ -1,4 +1,4 @@
-from app.utils.metadata import extract_metadata, get_location_from_ip
-from app.utils.media import save_media_file, get_media_path
+from app.utils.metadata import extract_metadata, get_location_from_ip, get_location_from_ip_async
+from app.utils.media import get_media_path
 
-__all__ = ["extract_metadata", "get_location_from_ip", "save_media_file", "get_media_path"]
+__all__ = ["extract_metadata", "get_location_from_ip", "get_location_from_ip_async", "get_media_path"]
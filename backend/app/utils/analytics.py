@@ -0,0 +1,284 @@
+"""Per-survey answer analytics, kept up to date incrementally.
+
+Every write that changes what the statistics count also adds its change to
+the rollup tables (``QuestionAnswerStats``, ``SurveyStats``) in the same
+transaction, as an upsert that increments the stored totals. Reading the
+statistics then costs the same for ten responses as for ten million.
+``rebuild_survey_analytics`` recomputes a survey's rollups from its rows.
+"""
+import math
+import os
+import random
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import case, cast, delete, func, literal, select, Integer
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import dialect_insert
+from app.models.analytics import DailySubmissionRollup, HourlySubmissionRollup, QuestionAnswerStats, SurveyStats
+from app.models.submission import SurveyAnswer, SurveySubmission
+from app.models.survey import SurveyQuestion
+
+
+# Rows each survey's submission totals are spread over (see SurveyStats)
+SURVEY_STATS_SHARDS = int(os.getenv("SURVEY_STATS_SHARDS", "16"))
+
+# Bucket of answers without a face score
+NO_SCORE_BUCKET = -1
+MAX_SCORE_BUCKET = 100
+
+FACE_SCORE_PERCENTILES = (25, 50, 75, 90)
+
+# Ratio between the bounds of consecutive completion time buckets
+DURATION_BUCKET_GROWTH = 1.1
+
+_ANSWER_TOTALS = ("answers", "yes_answers", "face_detected", "face_score_sum")
+_SURVEY_TOTALS = ("started", "completed", "scored", "overall_score_sum")
+
+
+def score_bucket(face_score: Optional[float]) -> int:
+    if face_score is None:
+        return NO_SCORE_BUCKET
+    return min(int(face_score), MAX_SCORE_BUCKET)
+
+
+def score_bucket_expr(face_score):
+    """``score_bucket`` as SQL (scores are never negative, so the cast floors them)."""
+    return case(
+        (face_score.is_(None), NO_SCORE_BUCKET),
+        (face_score >= MAX_SCORE_BUCKET, MAX_SCORE_BUCKET),
+        else_=cast(face_score, Integer)
+    )
+
+
+def _answer_totals(answer, sign: int) -> Dict[str, float]:
+    return {
+        "answers": sign,
+        "yes_answers": sign if answer["answer"] == "Yes" else 0,
+        "face_detected": sign if answer["face_detected"] else 0,
+        "face_score_sum": sign * answer["face_score"] if answer["face_score"] is not None else 0
+    }
+
+
+async def _add_answer_totals(db: AsyncSession, rows: List[dict]) -> None:
+    """Add per-bucket deltas to the stored totals with a single upsert."""
+    if not rows:
+        return
+    insert = dialect_insert(db)
+    stmt = insert(QuestionAnswerStats).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[QuestionAnswerStats.question_id, QuestionAnswerStats.score_bucket],
+        set_={name: getattr(QuestionAnswerStats, name) + getattr(stmt.excluded, name) for name in _ANSWER_TOTALS}
+    )
+    await db.execute(stmt)
+
+
+async def _add_survey_totals(db: AsyncSession, survey_id: int, **totals: float) -> None:
+    insert = dialect_insert(db)
+    values = {name: 0 for name in _SURVEY_TOTALS}
+    values.update(totals)
+    stmt = insert(SurveyStats).values(survey_id=survey_id, shard=random.randrange(SURVEY_STATS_SHARDS), **values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SurveyStats.survey_id, SurveyStats.shard],
+        set_={name: getattr(SurveyStats, name) + getattr(stmt.excluded, name) for name in totals}
+    )
+    await db.execute(stmt)
+
+
+async def record_answers(db: AsyncSession, survey_id: int, previous: Iterable, written: Iterable) -> None:
+    """Count written answers, replacing what the answers they overwrote contributed.
+
+    ``previous`` and ``written`` are answer rows (mappings with
+    ``question_id``, ``answer``, ``face_detected`` and ``face_score``). The
+    caller must hold a lock on the submission, so that no other writer
+    replaces the same answers between reading ``previous`` and committing.
+    """
+    deltas = defaultdict(lambda: dict.fromkeys(_ANSWER_TOTALS, 0))
+    for rows, sign in ((previous, -1), (written, 1)):
+        for answer in rows:
+            totals = deltas[(answer["question_id"], score_bucket(answer["face_score"]))]
+            for name, value in _answer_totals(answer, sign).items():
+                totals[name] += value
+    await _add_answer_totals(db, [
+        {"question_id": question_id, "score_bucket": bucket, "survey_id": survey_id, **totals}
+        for (question_id, bucket), totals in deltas.items()
+        if any(totals.values())  # an answer re-submitted unchanged
+    ])
+
+
+async def record_submission_started(db: AsyncSession, survey_id: int) -> None:
+    await _add_survey_totals(db, survey_id, started=1)
+
+
+async def record_submission_completed(db: AsyncSession, survey_id: int, overall_score: Optional[float]) -> None:
+    if overall_score is None:
+        await _add_survey_totals(db, survey_id, completed=1)
+    else:
+        await _add_survey_totals(db, survey_id, completed=1, scored=1, overall_score_sum=overall_score)
+
+
+def _aggregate_answers(sign: int):
+    """Per-bucket totals of answers, as (question, bucket, survey, *totals) rows."""
+    bucket = score_bucket_expr(SurveyAnswer.face_score)
+    return (
+        select(
+            SurveyAnswer.question_id,
+            bucket,
+            SurveyQuestion.survey_id,
+            sign * func.count(),
+            sign * func.sum(case((SurveyAnswer.answer == "Yes", 1), else_=0)),
+            sign * func.sum(case((SurveyAnswer.face_detected.is_(True), 1), else_=0)),
+            sign * func.coalesce(func.sum(SurveyAnswer.face_score), 0.0)
+        )
+        .join(SurveyQuestion, SurveyQuestion.id == SurveyAnswer.question_id)
+        .group_by(SurveyAnswer.question_id, bucket, SurveyQuestion.survey_id)
+    )
+
+
+def _aggregate_submissions(sign: int):
+    """Per-survey totals of submissions, as (survey, shard 0, *totals) rows."""
+    completed = SurveySubmission.completed_at.isnot(None)
+    scored = completed & SurveySubmission.overall_score.isnot(None)
+    return (
+        select(
+            SurveySubmission.survey_id,
+            literal(0),  # shard
+            sign * func.count(),
+            sign * func.sum(case((completed, 1), else_=0)),
+            sign * func.sum(case((scored, 1), else_=0)),
+            sign * func.coalesce(func.sum(case((scored, SurveySubmission.overall_score), else_=0.0)), 0.0)
+        )
+        .group_by(SurveySubmission.survey_id)
+    )
+
+
+async def subtract_submissions(db: AsyncSession, submission_ids: List[int]) -> None:
+    """Take submissions that are about to be deleted out of the totals."""
+    insert = dialect_insert(db)
+    answers = _aggregate_answers(-1).where(SurveyAnswer.submission_id.in_(submission_ids))
+    stmt = insert(QuestionAnswerStats).from_select(
+        ["question_id", "score_bucket", "survey_id", *_ANSWER_TOTALS], answers
+    )
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[QuestionAnswerStats.question_id, QuestionAnswerStats.score_bucket],
+        set_={name: getattr(QuestionAnswerStats, name) + getattr(stmt.excluded, name) for name in _ANSWER_TOTALS}
+    ))
+    submissions = _aggregate_submissions(-1).where(SurveySubmission.id.in_(submission_ids))
+    stmt = insert(SurveyStats).from_select(["survey_id", "shard", *_SURVEY_TOTALS], submissions)
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[SurveyStats.survey_id, SurveyStats.shard],
+        set_={name: getattr(SurveyStats, name) + getattr(stmt.excluded, name) for name in _SURVEY_TOTALS}
+    ))
+
+
+async def _delete_survey_stats(db: AsyncSession, survey_id: int) -> None:
+    await db.execute(delete(QuestionAnswerStats).where(QuestionAnswerStats.survey_id == survey_id))
+    await db.execute(delete(SurveyStats).where(SurveyStats.survey_id == survey_id))
+
+
+async def delete_survey_analytics(db: AsyncSession, survey_id: int) -> None:
+    """Remove all of a survey's rollups, ahead of the survey itself."""
+    await _delete_survey_stats(db, survey_id)
+    for rollup in (HourlySubmissionRollup, DailySubmissionRollup):
+        await db.execute(delete(rollup).where(rollup.survey_id == survey_id))
+
+
+async def rebuild_survey_analytics(db: AsyncSession, survey_id: int) -> None:
+    """Recompute a survey's rollups from its submissions and answers.
+
+    Runs as one transaction (the caller commits). Answers written while it
+    runs wait for it on the rollup rows, except those landing in a bucket
+    the survey had no row for yet; rebuild again if the survey was busy.
+    """
+    await _delete_survey_stats(db, survey_id)
+    insert = dialect_insert(db)
+    # Overwrites a row another writer inserted in the meantime, instead of failing
+    answers = _aggregate_answers(1).where(SurveyQuestion.survey_id == survey_id)
+    stmt = insert(QuestionAnswerStats).from_select(
+        ["question_id", "score_bucket", "survey_id", *_ANSWER_TOTALS], answers
+    )
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[QuestionAnswerStats.question_id, QuestionAnswerStats.score_bucket],
+        set_={name: getattr(stmt.excluded, name) for name in _ANSWER_TOTALS}
+    ))
+    submissions = _aggregate_submissions(1).where(SurveySubmission.survey_id == survey_id)
+    stmt = insert(SurveyStats).from_select(["survey_id", "shard", *_SURVEY_TOTALS], submissions)
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[SurveyStats.survey_id, SurveyStats.shard],
+        set_={name: getattr(stmt.excluded, name) for name in _SURVEY_TOTALS}
+    ))
+
+
+def histogram_percentile(histogram: Dict[int, int], percentile: float) -> Optional[int]:
+    """Bucket holding the nearest-rank percentile of a histogram ({bucket: count})."""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    rank = max(1, math.ceil(percentile / 100 * total))
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        if seen >= rank:
+            return bucket
+    return None
+
+
+def score_percentiles(histogram: Dict[int, int], percentiles: Iterable[int] = FACE_SCORE_PERCENTILES) -> Dict[str, float]:
+    """Percentiles of a face score histogram, to one point."""
+    if not histogram:
+        return {}
+    return {f"p{percentile}": float(histogram_percentile(histogram, percentile)) for percentile in percentiles}
+
+
+def duration_bucket(seconds: float) -> int:
+    """Histogram bucket of a duration: bucket ``i`` holds ``[G**i, G**(i+1))`` seconds.
+
+    With ``G = DURATION_BUCKET_GROWTH`` a median read from the histogram is
+    within half a bucket (under 5%) of the true one, and a day of completion
+    times fits in about 120 buckets.
+    """
+    if seconds < DURATION_BUCKET_GROWTH:
+        return 0
+    return int(math.log(seconds, DURATION_BUCKET_GROWTH))
+
+
+def duration_bucket_value(bucket: int) -> float:
+    """Representative duration of a bucket (its geometric middle)."""
+    if bucket == 0:
+        return DURATION_BUCKET_GROWTH / 2
+    return DURATION_BUCKET_GROWTH ** (bucket + 0.5)
+
+
+def merge_histograms(histograms: Iterable[Dict]) -> Dict[int, int]:
+    """Sum histograms; keys may be strings, as they come back from a JSON column."""
+    merged = defaultdict(int)
+    for histogram in histograms:
+        for bucket, count in histogram.items():
+            merged[int(bucket)] += count
+    return dict(merged)
+
+
+async def load_survey_totals(db: AsyncSession, survey_id: int) -> Dict[str, float]:
+    """A survey's submission totals, summed over its shards."""
+    row = (await db.execute(
+        select(*(func.coalesce(func.sum(getattr(SurveyStats, name)), 0) for name in _SURVEY_TOTALS))
+        .where(SurveyStats.survey_id == survey_id)
+    )).one()
+    return dict(zip(_SURVEY_TOTALS, row))
+
+
+async def load_question_stats(db: AsyncSession, survey_id: int) -> Dict[int, dict]:
+    """Each question's totals and score histogram, keyed by question id."""
+    rows = await db.execute(
+        select(QuestionAnswerStats).where(QuestionAnswerStats.survey_id == survey_id)
+    )
+    stats = defaultdict(lambda: {**dict.fromkeys(_ANSWER_TOTALS, 0), "histogram": {}})
+    for (row,) in rows:
+        totals = stats[row.question_id]
+        for name in _ANSWER_TOTALS:
+            totals[name] += getattr(row, name)
+        if row.score_bucket != NO_SCORE_BUCKET and row.answers:
+            totals["histogram"][row.score_bucket] = row.answers
+    return stats
+
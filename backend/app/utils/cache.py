@@ -0,0 +1,249 @@
+from abc import ABC, abstractmethod
+import asyncio
+import importlib
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Size-bounded LRU cache whose entries expire after a per-entry TTL.
+
+    ``None`` is a valid cached value, so callers can cache negative results
+    and distinguish them from a miss with ``lookup``.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        """Return ``(found, value)`` for a key, evicting it if expired."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return False, None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.misses += 1
+                return False, None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        found, value = self.lookup(key)
+        return value if found else default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class DiskLRUCache:
+    """Size-capped directory of files that evicts the least recently used.
+
+    Keys are file names. Recency is tracked in memory and mirrored to each
+    file's access time (mtime is left alone, it feeds ETags), so the order
+    survives restarts. Every process keeps its own
+    index over the shared directory: files written by another process are
+    picked up on first access, and files it evicted read as misses, so the cap
+    holds per process rather than exactly.
+    """
+
+    # Seconds after which a temp file can't belong to a write still in progress
+    STALE_TMP_AGE = 3600
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # key -> size
+        self._size = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def _load(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        files = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_file():
+                continue
+            stat = entry.stat()
+            if entry.name.endswith(".tmp"):
+                # Left behind by an interrupted write. Other workers share the
+                # directory, so only ones too old to still be in progress
+                if stat.st_mtime < time.time() - self.STALE_TMP_AGE:
+                    try:
+                        os.remove(entry.path)
+                    except FileNotFoundError:
+                        pass
+                continue
+            files.append((stat.st_atime, entry.name, stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._size += size
+        self._loaded = True
+
+    def _evict(self) -> None:
+        # Never evict the most recent entry, even if it alone exceeds the cap
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._size -= size
+            try:
+                os.remove(self.path(key))
+            except FileNotFoundError:
+                pass
+
+    def get(self, key: str) -> Optional[str]:
+        """Path of the cached file for ``key``, or None on a miss."""
+        path = self.path(key)
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            try:
+                stat = os.stat(path)
+                os.utime(path, ns=(time.time_ns(), stat.st_mtime_ns))
+            except FileNotFoundError:
+                if key in self._entries:
+                    self._size -= self._entries.pop(key)
+                return None
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            else:
+                self._entries[key] = stat.st_size
+                self._size += stat.st_size
+                self._evict()
+            return path
+
+    def put(self, key: str, data: bytes) -> str:
+        """Store ``data`` under ``key`` (atomically) and return its path."""
+        path = self.path(key)
+        with self._lock:
+            if not self._loaded:
+                self._load()
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._size += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self._evict()
+        return path
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into a single execution.
+
+    Callers that arrive while a call for their key is in progress wait for
+    its result instead of starting their own. A caller that is cancelled does
+    not cancel the shared call.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, "asyncio.Future[Any]"] = {}
+
+    def _finished(self, key: Hashable, future: "asyncio.Future[Any]") -> None:
+        self._calls.pop(key, None)
+        if not future.cancelled():
+            future.exception()  # mark as retrieved if every caller went away
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(func())
+            self._calls[key] = future
+            future.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(future)
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+class CacheBackend(ABC):
+    """Async key/value store for serialized values.
+
+    The in-process ``MemoryCacheBackend`` is the default; a backend shared
+    between workers (e.g. Redis) can be plugged in by subclassing this and
+    pointing the relevant ``*_CACHE_BACKEND`` setting at it.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        """The value stored under ``key``, or None if missing or expired."""
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        """Store ``value`` under ``key``, expiring after ``ttl`` seconds if given."""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Remove ``key``; missing keys are ignored."""
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Per-process backend on top of ``TTLCache``."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self.cache.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self.cache.set(key, value, ttl=ttl)
+
+    async def delete(self, key: str) -> None:
+        self.cache.delete(key)
+
+
+def load_cache_backend(spec: str, maxsize: int, ttl: float) -> CacheBackend:
+    """Build a cache backend from a setting value.
+
+    ``spec`` is ``"memory"`` or the import path of a ``CacheBackend``
+    subclass (``"package.module:ClassName"``), which is constructed with
+    ``maxsize`` and ``ttl``.
+    """
+    if spec == "memory":
+        return MemoryCacheBackend(maxsize=maxsize, ttl=ttl)
+    module_name, _, class_name = spec.partition(":")
+    backend_class = getattr(importlib.import_module(module_name), class_name)
+    return backend_class(maxsize=maxsize, ttl=ttl)
@@ -0,0 +1,118 @@
+"""Server-side face detection for stored face images.
+
+Uses OpenCV's bundled Haar cascade, which is CPU-only and needs no model
+download. OpenCV is an optional dependency (see requirements-face.txt); when
+it is not installed, ``face_verification_available()`` is False and
+verification is skipped.
+
+Detection is CPU bound, so images are checked in batches on a process pool
+with one process per core.
+"""
+import asyncio
+import math
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+try:
+    import cv2
+except ImportError:  # optional dependency
+    cv2 = None
+
+
+FACE_VERIFY_WORKERS = int(os.getenv("FACE_VERIFY_WORKERS", "0")) or os.cpu_count() or 1
+FACE_VERIFY_BATCH_SIZE = int(os.getenv("FACE_VERIFY_BATCH_SIZE", "256"))
+FACE_MIN_SIZE = int(os.getenv("FACE_MIN_SIZE", "40"))  # pixels
+
+FaceResult = Tuple[bool, Optional[float]]  # (detected, score 0-100)
+
+_detector = None
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+class FaceVerificationUnavailable(RuntimeError):
+    """Raised when face verification is used without OpenCV installed."""
+
+    def __init__(self):
+        super().__init__("Face verification requires OpenCV (pip install -r requirements-face.txt)")
+
+
+def face_verification_available() -> bool:
+    return cv2 is not None
+
+
+def _get_detector():
+    global _detector
+    if _detector is None:
+        _detector = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+    return _detector
+
+
+def _init_worker() -> None:
+    # Parallelism comes from the process pool; keep OpenCV to one thread per process
+    cv2.setNumThreads(1)
+
+
+def detect_face(path: str) -> FaceResult:
+    """Detect a face in an image file.
+
+    The score is the cascade's confidence for the strongest detection, mapped
+    onto 0-100. It is not on the same scale as the browser's MediaPipe score.
+    Unreadable images count as no face with no score.
+    """
+    image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        return False, None
+    image = cv2.equalizeHist(image)
+    faces, _, weights = _get_detector().detectMultiScale3(
+        image,
+        scaleFactor=1.1,
+        minNeighbors=5,
+        minSize=(FACE_MIN_SIZE, FACE_MIN_SIZE),
+        outputRejectLevels=True
+    )
+    if len(faces) == 0:
+        return False, 0.0
+    weight = float(max(weights))
+    return True, round(100 / (1 + math.exp(-weight)), 1)
+
+
+def detect_faces(paths: Sequence[str]) -> List[FaceResult]:
+    """Detect faces in a batch of images (runs inside a pool process)."""
+    return [detect_face(path) for path in paths]
+
+
+def create_face_pool(workers: int = FACE_VERIFY_WORKERS) -> ProcessPoolExecutor:
+    """A process pool for ``verify_images`` with ``workers`` processes."""
+    if not face_verification_available():
+        raise FaceVerificationUnavailable()
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+
+
+def get_face_pool() -> ProcessPoolExecutor:
+    """Process pool shared by all verification runs in this process."""
+    global _pool
+    if _pool is None:
+        _pool = create_face_pool()
+    return _pool
+
+
+def split_batches(paths: Sequence[str], workers: int) -> List[Sequence[str]]:
+    """Split paths into one contiguous slice per worker, to keep IPC overhead low."""
+    size = max(1, math.ceil(len(paths) / workers))
+    return [paths[i:i + size] for i in range(0, len(paths), size)]
+
+
+async def verify_images(
+    paths: Sequence[str],
+    executor: Optional[Executor] = None,
+    workers: int = FACE_VERIFY_WORKERS
+) -> List[FaceResult]:
+    """Detect faces in ``paths`` across a process pool; results are in input order."""
+    loop = asyncio.get_running_loop()
+    executor = executor or get_face_pool()
+    batches = await asyncio.gather(*(
+        loop.run_in_executor(executor, detect_faces, batch)
+        for batch in split_batches(paths, workers)
+    ))
+    return [result for batch in batches for result in batch]
@@ -0,0 +1,289 @@
+"""Offline country lookup from a memory-mapped table of IP ranges.
+
+A CSV of ranges (``start,end,country_code[,country_name]``, as in the
+DB-IP and IP2Location "lite" country files; addresses as text or integers)
+is compiled with ``python -m app.cli build-geoip`` into a flat file:
+
+    header   magic, byte order check, range counts, size of the names
+    names    country names, one per line
+    IPv4     sorted starts (uint32), ends (uint32), name indexes (uint16)
+    IPv6     sorted starts (16 bytes, big endian), ends, name indexes
+
+The file is mapped read-only, so every worker process shares one copy in
+the page cache and opening it costs nothing. A lookup is a binary search of
+the starts, without parsing or allocating beyond the address itself.
+
+``GeoIPResolver`` re-opens the file when it is replaced (``build-geoip``
+writes a temporary file and renames it over the old one), so workers pick up
+a new database without restarting.
+"""
+import array
+import bisect
+import csv
+import ipaddress
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+from typing import Iterable, List, Optional, Tuple, Union
+
+
+IPAddress = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+
+_MAGIC = b"GEOIPRNG"
+_BYTE_ORDER_CHECK = 0x01020304
+# magic, byte order check, IPv4 ranges, IPv6 ranges, bytes of names (native order)
+_HEADER = struct.Struct("=8sIIII")
+_ALIGN = 8
+
+# Country values meaning "not assigned" in the common range files
+_UNASSIGNED = {"", "-", "ZZ"}
+
+
+def parse_ip(value: str) -> Optional[IPAddress]:
+    """Parse an address; IPv4 mapped into IPv6 comes back as IPv4. None if invalid."""
+    try:
+        address = ipaddress.ip_address(value.strip())
+    except ValueError:
+        return None
+    if address.version == 6 and address.ipv4_mapped is not None:
+        return address.ipv4_mapped
+    return address
+
+
+def is_reserved_address(address: IPAddress) -> bool:
+    """Whether an address is not globally routable, so it has no location.
+
+    Loopback, private (10/8, 172.16/12, 192.168/16, fc00::/7), link-local,
+    shared (100.64/10), documentation, multicast, unspecified and reserved
+    ranges, as classified by ``ipaddress``.
+    """
+    return not address.is_global or address.is_multicast
+
+
+def _padding(offset: int) -> int:
+    return -offset % _ALIGN
+
+
+class _PackedKeys:
+    """Sequence view of fixed-width big-endian keys in a buffer, for ``bisect``."""
+
+    def __init__(self, buffer: mmap.mmap, offset: int, count: int, width: int):
+        self._buffer = buffer
+        self._offset = offset
+        self._count = count
+        self._width = width
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> bytes:
+        start = self._offset + index * self._width
+        return self._buffer[start:start + self._width]
+
+
+class GeoIPDatabase:
+    """A compiled range file, mapped into memory."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < _HEADER.size:
+            raise ValueError(f"{path} is not a compiled GeoIP database")
+        magic, check, v4_count, v6_count, names_size = _HEADER.unpack_from(self._mmap, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a compiled GeoIP database")
+        if check != _BYTE_ORDER_CHECK:
+            raise ValueError(f"{path} was built on a machine of the other byte order")
+
+        offset = _HEADER.size
+        self.countries = bytes(self._mmap[offset:offset + names_size]).decode().split("\n")
+        offset += names_size
+        offset += _padding(offset)
+
+        view = memoryview(self._mmap)
+        self._v4_starts = view[offset:offset + 4 * v4_count].cast("I")
+        offset += 4 * v4_count
+        self._v4_ends = view[offset:offset + 4 * v4_count].cast("I")
+        offset += 4 * v4_count
+        self._v4_names = view[offset:offset + 2 * v4_count].cast("H")
+        offset += 2 * v4_count
+        offset += _padding(offset)
+
+        self._v6_starts = _PackedKeys(self._mmap, offset, v6_count, 16)
+        offset += 16 * v6_count
+        self._v6_ends = _PackedKeys(self._mmap, offset, v6_count, 16)
+        offset += 16 * v6_count
+        self._v6_names = view[offset:offset + 2 * v6_count].cast("H")
+        offset += 2 * v6_count
+        if offset > len(self._mmap):
+            raise ValueError(f"{path} is truncated")
+
+    def __len__(self) -> int:
+        return len(self._v4_starts) + len(self._v6_starts)
+
+    def lookup(self, address: IPAddress) -> Optional[str]:
+        """Country of an address, or None if no range holds it."""
+        if address.version == 4:
+            key = int(address)
+            i = bisect.bisect_right(self._v4_starts, key) - 1
+            if i >= 0 and key <= self._v4_ends[i]:
+                return self.countries[self._v4_names[i]]
+            return None
+        key = address.packed
+        i = bisect.bisect_right(self._v6_starts, key) - 1
+        if i >= 0 and key <= self._v6_ends[i]:
+            return self.countries[self._v6_names[i]]
+        return None
+
+
+def _parse_range_address(value: str) -> IPAddress:
+    value = value.strip()
+    if value.isdigit():
+        number = int(value)
+        address = ipaddress.IPv4Address(number) if number <= 0xFFFFFFFF else ipaddress.IPv6Address(number)
+        if address.version == 6 and address.ipv4_mapped is not None:
+            return address.ipv4_mapped
+        return address
+    address = parse_ip(value)
+    if address is None:
+        raise ValueError(f"invalid address {value!r}")
+    return address
+
+
+def read_ranges(lines: Iterable[str]) -> List[Tuple[IPAddress, IPAddress, str]]:
+    """Parse CSV rows of ``start,end,code[,name]``; a header row is skipped.
+
+    The name is used when present, else the code. Unassigned ranges
+    (``-``, ``ZZ``) are dropped.
+    """
+    ranges = []
+    for line_number, row in enumerate(csv.reader(lines), start=1):
+        if not row or row[0].startswith("#"):
+            continue
+        if len(row) < 3:
+            raise ValueError(f"line {line_number}: expected start,end,country")
+        try:
+            start, end = _parse_range_address(row[0]), _parse_range_address(row[1])
+        except ValueError:
+            if line_number == 1:
+                continue  # header
+            raise ValueError(f"line {line_number}: invalid address") from None
+        if start.version != end.version or start > end:
+            raise ValueError(f"line {line_number}: invalid range {start} - {end}")
+        country = (row[3] if len(row) > 3 and row[3].strip() not in _UNASSIGNED else row[2]).strip()
+        if country in _UNASSIGNED:
+            continue
+        ranges.append((start, end, country))
+    return ranges
+
+
+def _sorted_ranges(ranges: List[Tuple[IPAddress, IPAddress, str]]) -> List[Tuple[IPAddress, IPAddress, str]]:
+    """Sort ranges, merging adjacent ones of the same country; overlaps are an error."""
+    merged = []
+    for start, end, country in sorted(ranges, key=lambda entry: entry[0]):
+        if merged:
+            last_start, last_end, last_country = merged[-1]
+            if start <= last_end:
+                raise ValueError(f"overlapping ranges {last_start} - {last_end} and {start} - {end}")
+            if country == last_country and int(start) == int(last_end) + 1:
+                merged[-1] = (last_start, end, country)
+                continue
+        merged.append((start, end, country))
+    return merged
+
+
+def build_geoip_database(csv_path: str, output_path: str) -> Tuple[int, int]:
+    """Compile a CSV of ranges into a database file; returns the IPv4 and IPv6 range counts.
+
+    The file is written next to ``output_path`` and renamed over it, so
+    running resolvers switch to it atomically.
+    """
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        ranges = read_ranges(f)
+    v4 = _sorted_ranges([entry for entry in ranges if entry[0].version == 4])
+    v6 = _sorted_ranges([entry for entry in ranges if entry[0].version == 6])
+
+    countries = sorted({country for _, _, country in v4 + v6})
+    if len(countries) > 0xFFFF:
+        raise ValueError("too many distinct countries")
+    index = {country: i for i, country in enumerate(countries)}
+    names = "\n".join(countries).encode()
+
+    directory = os.path.dirname(os.path.abspath(output_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".geoip-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, _BYTE_ORDER_CHECK, len(v4), len(v6), len(names)))
+            f.write(names)
+            f.write(b"\0" * _padding(f.tell()))
+            f.write(array.array("I", (int(start) for start, _, _ in v4)).tobytes())
+            f.write(array.array("I", (int(end) for _, end, _ in v4)).tobytes())
+            f.write(array.array("H", (index[country] for _, _, country in v4)).tobytes())
+            f.write(b"\0" * _padding(f.tell()))
+            f.write(b"".join(start.packed for start, _, _ in v6))
+            f.write(b"".join(end.packed for _, end, _ in v6))
+            f.write(array.array("H", (index[country] for _, _, country in v6)).tobytes())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(v4), len(v6)
+
+
+class GeoIPResolver:
+    """Looks addresses up in a database file, re-opening it when the file is replaced.
+
+    The file is checked at most every ``reload_interval`` seconds (one
+    ``stat``). A file that fails to open is reported and the previous one
+    kept. Lookups are safe from any thread.
+    """
+
+    def __init__(self, path: str, reload_interval: float = 60.0):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._database: Optional[GeoIPDatabase] = None
+        self._signature = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return
+        with self._lock:
+            if now - self._checked_at < self.reload_interval:
+                return
+            self._checked_at = now
+            signature = self._file_signature()
+            if signature is None or signature == self._signature:
+                return
+            try:
+                database = GeoIPDatabase(self.path)
+            except (OSError, ValueError) as e:
+                print(f"Failed to load GeoIP database {self.path}: {e}", file=sys.stderr)
+                return
+            # Readers holding the old database finish with it; it is unmapped once unreferenced
+            self._database, self._signature = database, signature
+
+    @property
+    def database(self) -> Optional[GeoIPDatabase]:
+        self._maybe_reload()
+        return self._database
+
+    def lookup(self, address: IPAddress) -> Optional[str]:
+        """Country of an address; None if unknown or no database could be loaded."""
+        database = self.database
+        return database.lookup(address) if database is not None else None
@@ -0,0 +1,209 @@
+"""HTTP caching helpers and a file response with range and conditional GET support."""
+import hashlib
+import os
+import uuid
+from email.utils import formatdate, parsedate_to_datetime
+from stat import S_ISREG
+from typing import AsyncIterator, List, Optional, Tuple
+
+import aiofiles
+import aiofiles.os
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+
+FILE_CHUNK_SIZE = 256 * 1024  # 256KB
+# More ranges than this in one request are answered with the whole file
+MAX_RANGES = 16
+
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(content: bytes) -> str:
+    """Strong ETag for a response body."""
+    return '"' + hashlib.sha256(content).hexdigest()[:32] + '"'
+
+
+def make_file_etag(stat: os.stat_result) -> str:
+    """Strong ETag from a file's identity: inode, size and modification time."""
+    return f'"{stat.st_ino:x}-{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an ``If-None-Match`` header matches ``etag`` (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    bare = etag[2:] if etag.startswith("W/") else etag
+    return any((tag[2:] if tag.startswith("W/") else tag) == bare for tag in candidates)
+
+
+def parse_range_header(header: str, size: int) -> Optional[List[Tuple[int, int]]]:
+    """Parse a ``Range`` header into sorted, merged inclusive byte ranges.
+
+    Returns None when the header should be ignored (malformed, not bytes, or
+    too many ranges) and an empty list when no range is satisfiable.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec:
+        return None
+    parts = spec.split(",")
+    if len(parts) > MAX_RANGES:
+        return None
+
+    ranges = []
+    for part in parts:
+        start_text, dash, end_text = part.strip().partition("-")
+        if not dash:
+            return None
+        try:
+            if start_text:
+                start = int(start_text)
+                end = int(end_text) if end_text else size - 1
+                if end_text and end < start:
+                    return None
+            else:
+                # Suffix range: the last N bytes
+                length = int(end_text)
+                start, end = max(size - length, 0), size - 1
+                if length == 0:
+                    continue
+        except ValueError:
+            return None
+        if start >= size:
+            continue
+        ranges.append((start, min(end, size - 1)))
+
+    ranges.sort()
+    merged: List[Tuple[int, int]] = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _if_range_allows(request: Request, etag: str, last_modified: str) -> bool:
+    """A Range is honoured only if ``If-Range`` (when sent) still matches."""
+    if_range = request.headers.get("if-range")
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag  # strong comparison
+    return if_range == last_modified
+
+
+async def _read_ranges(path: str, ranges: List[Tuple[int, int]], parts: Optional[List[bytes]] = None,
+                       closing: bytes = b"") -> AsyncIterator[bytes]:
+    async with aiofiles.open(path, "rb") as f:
+        for index, (start, end) in enumerate(ranges):
+            if parts:
+                yield parts[index]
+            await f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = await f.read(min(FILE_CHUNK_SIZE, remaining))
+                if not chunk:
+                    return
+                remaining -= len(chunk)
+                yield chunk
+    if closing:
+        yield closing
+
+
+async def file_response(
+    request: Request,
+    path: str,
+    media_type: str,
+    immutable: bool = False,
+    filename: Optional[str] = None
+) -> Response:
+    """Serve a file with validators, conditional GET and byte ranges.
+
+    Sends ``ETag``/``Last-Modified`` and answers matching conditional
+    requests with 304. ``Range`` requests get 206 (one range) or a
+    ``multipart/byteranges`` 206 (several), or 416 when unsatisfiable.
+    ``immutable`` files may be cached by the browser for a year without
+    revalidating; others must be revalidated on every use. Raises
+    FileNotFoundError if ``path`` is not a file.
+    """
+    stat = await aiofiles.os.stat(path)
+    if not S_ISREG(stat.st_mode):
+        raise FileNotFoundError(path)
+    size = stat.st_size
+    etag = make_file_etag(stat)
+    last_modified = formatdate(stat.st_mtime, usegmt=True)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+    }
+    if filename:
+        headers["Content-Disposition"] = f'inline; filename="{filename}"'
+    head = request.method == "HEAD"
+
+    if _not_modified(request, etag, stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    ranges = None
+    if range_header and _if_range_allows(request, etag, last_modified):
+        ranges = parse_range_header(range_header, size)
+
+    if ranges is None:
+        headers["Content-Length"] = str(size)
+        if head or size == 0:
+            return Response(status_code=200, headers=headers, media_type=media_type)
+        return StreamingResponse(
+            _read_ranges(path, [(0, size - 1)]), status_code=200, headers=headers, media_type=media_type
+        )
+
+    if not ranges:
+        headers["Content-Range"] = f"bytes */{size}"
+        return Response(status_code=416, headers=headers)
+
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+        if head:
+            return Response(status_code=206, headers=headers, media_type=media_type)
+        return StreamingResponse(_read_ranges(path, ranges), status_code=206, headers=headers, media_type=media_type)
+
+    boundary = uuid.uuid4().hex
+    parts = [
+        (
+            f"\r\n--{boundary}\r\n"
+            f"Content-Type: {media_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+        ).encode()
+        for start, end in ranges
+    ]
+    closing = f"\r\n--{boundary}--\r\n".encode()
+    headers["Content-Length"] = str(
+        sum(len(part) for part in parts) + sum(end - start + 1 for start, end in ranges) + len(closing)
+    )
+    multipart_type = f"multipart/byteranges; boundary={boundary}"
+    if head:
+        return Response(status_code=206, headers=headers, media_type=multipart_type)
+    return StreamingResponse(
+        _read_ranges(path, ranges, parts, closing), status_code=206, headers=headers, media_type=multipart_type
+    )
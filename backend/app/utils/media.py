@@ -1,55 +1,307 @@
+import asyncio
+import fcntl
 import os
 import uuid
+import hashlib
+import mimetypes
+import re
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, List, Optional, Set
 from datetime import datetime
 
+import aiofiles
+import aiofiles.os
+from fastapi import UploadFile
+from sqlalchemy import BigInteger, bindparam, select, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.submission import MediaFile
+from app.utils.metrics import MEDIA_UPLOAD_BYTES, MEDIA_UPLOAD_DURATION
+from app.utils.profiling import record_timing
+
+
+# File size limits (in bytes)
+MAX_VIDEO_SIZE = 100 * 1024 * 1024  # 100MB
+MAX_IMAGE_SIZE = 10 * 1024 * 1024    # 10MB
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+MEDIA_EXTENSIONS = {"video": ".mp4", "image": ".png"}
+
+# Names produced by get_media_path end in a timestamp and a random suffix, and
+# a file is never rewritten once it has one of these names
+_GENERATED_NAME = re.compile(r"_\d{8}_\d{6}_[0-9a-f]{8}\.(png|mp4)$")
+# Content-addressed objects are named by the SHA-256 of their bytes
+_OBJECT_NAME = re.compile(r"^[0-9a-f]{64}\.\w+$")
+
+
+class MediaTooLargeError(ValueError):
+    """Raised when an upload exceeds the size limit for its media type."""
+
+    def __init__(self, media_type: str, max_size: int):
+        self.media_type = media_type
+        self.max_size = max_size
+        super().__init__(f"File too large. Maximum size for {media_type} is {max_size // (1024 * 1024)}MB")
+
+
+class UploadInterruptedError(Exception):
+    """Raised when a resumable upload chunk stops mid-stream."""
+
+    def __init__(self, offset: int):
+        self.offset = offset
+        super().__init__(f"Upload interrupted at offset {offset}")
+
+
+class UploadBusyError(Exception):
+    """Raised when another request is already writing to a resumable upload."""
+
+
+@dataclass
+class StoredMedia:
+    path: str
+    size: int
+    checksum: Optional[str] = None  # hex SHA-256
+
 
 def get_media_root() -> str:
     """Get media root directory from environment."""
     return os.getenv("MEDIA_ROOT", "./media")
 
 
+def get_media_tmp_dir() -> str:
+    """Directory for in-progress uploads (same filesystem as the final files)."""
+    return f"{get_media_root()}/tmp"
+
+
+def get_max_media_size(media_type: str) -> int:
+    """Get the upload size limit for a media type."""
+    return MAX_VIDEO_SIZE if media_type == "video" else MAX_IMAGE_SIZE
+
+
+def get_objects_dir() -> str:
+    """Root of the content-addressed media store."""
+    return f"{get_media_root()}/objects"
+
+
 def ensure_media_directories():
-    """Ensure media directories exist."""
+    """Create the media directories (blocking; done once at startup)."""
     media_root = get_media_root()
     Path(f"{media_root}/videos").mkdir(parents=True, exist_ok=True)
     Path(f"{media_root}/images").mkdir(parents=True, exist_ok=True)
+    Path(get_objects_dir()).mkdir(parents=True, exist_ok=True)
+    Path(get_media_tmp_dir()).mkdir(parents=True, exist_ok=True)
 
 
-def get_media_path(submission_id: int, media_type: str, question_number: Optional[int] = None) -> str:
-    """Generate media file path."""
-    ensure_media_directories()
-    media_root = get_media_root()
-    
+def get_media_file_name(submission_id: int, media_type: str, question_number: Optional[int] = None) -> str:
+    """Generate a unique media file name."""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     unique_id = str(uuid.uuid4())[:8]
     
     if media_type == "video":
         if question_number:
-            filename = f"submission_{submission_id}_q{question_number}_{timestamp}_{unique_id}.mp4"
-        else:
-            filename = f"submission_{submission_id}_full_{timestamp}_{unique_id}.mp4"
-        return f"{media_root}/videos/{filename}"
+            return f"submission_{submission_id}_q{question_number}_{timestamp}_{unique_id}.mp4"
+        return f"submission_{submission_id}_full_{timestamp}_{unique_id}.mp4"
     elif media_type == "image":
         if question_number:
-            filename = f"submission_{submission_id}_q{question_number}_face_{timestamp}_{unique_id}.png"
-        else:
-            filename = f"submission_{submission_id}_face_{timestamp}_{unique_id}.png"
-        return f"{media_root}/images/{filename}"
+            return f"submission_{submission_id}_q{question_number}_face_{timestamp}_{unique_id}.png"
+        return f"submission_{submission_id}_face_{timestamp}_{unique_id}.png"
     else:
         raise ValueError(f"Invalid media type: {media_type}")
 
 
-def save_media_file(file_content: bytes, submission_id: int, media_type: str, question_number: Optional[int] = None) -> str:
-    """Save media file and return path."""
-    file_path = get_media_path(submission_id, media_type, question_number)
-    
-    # Ensure directory exists
-    Path(file_path).parent.mkdir(parents=True, exist_ok=True)
+def get_media_path(submission_id: int, media_type: str, question_number: Optional[int] = None) -> str:
+    """Generate media file path."""
+    directory = "videos" if media_type == "video" else "images"
+    return f"{get_media_root()}/{directory}/{get_media_file_name(submission_id, media_type, question_number)}"
+
+
+def get_object_path(checksum: str, media_type: str) -> str:
+    """Content-addressed path of a media object: ``objects/ab/cd/<sha256>.<ext>``.
+
+    Two levels of fan-out on the hash keep every directory small.
+    """
+    return f"{get_objects_dir()}/{checksum[:2]}/{checksum[2:4]}/{checksum}{MEDIA_EXTENSIONS[media_type]}"
+
+
+def is_object_path(file_path: str) -> bool:
+    """Whether a path is in the content-addressed store (and may be shared)."""
+    return bool(_OBJECT_NAME.match(os.path.basename(file_path)))
+
+
+def is_immutable_media_path(file_path: str) -> bool:
+    """Whether a stored file's contents can never change (safe to cache forever)."""
+    name = os.path.basename(file_path)
+    return bool(_GENERATED_NAME.search(name) or _OBJECT_NAME.match(name))
+
+
+def media_lock_key(file_path: str) -> int:
+    """Advisory lock key (signed 64-bit) for a media object path."""
+    return int.from_bytes(hashlib.sha256(file_path.encode()).digest()[:8], "big", signed=True)
+
+
+async def lock_media_objects(db: AsyncSession, paths: List[str]) -> None:
+    """Lock media objects until the transaction ends (PostgreSQL only).
+
+    An object is shared by every MediaFile row with its path. Storing a new
+    reference and deleting an unreferenced object both hold this lock, so a
+    deletion cannot remove an object that a concurrent upload is about to
+    reference. Keys are taken in sorted order so concurrent callers cannot
+    deadlock. SQLite serializes writers, so there it is a no-op.
+    """
+    if db.bind.dialect.name != "postgresql" or not paths:
+        return
+    keys = sorted({media_lock_key(path) for path in paths})
+    await db.execute(
+        text("SELECT pg_advisory_xact_lock(k) FROM unnest(CAST(:keys AS bigint[])) AS k")
+        .bindparams(bindparam("keys", type_=ARRAY(BigInteger))),
+        {"keys": keys}
+    )
+
+
+async def referenced_media_paths(db: AsyncSession, paths: List[str]) -> Set[str]:
+    """The subset of ``paths`` still referenced by a MediaFile row."""
+    if not paths:
+        return set()
+    return set(await db.scalars(select(MediaFile.path).where(MediaFile.path.in_(paths)).distinct()))
+
+
+def guess_media_type(file_path: str) -> str:
+    """Content type for a media file, from its extension."""
+    media_type, _ = mimetypes.guess_type(file_path)
+    return media_type or "application/octet-stream"
+
+
+def get_media_url(file_path: str) -> str:
+    """Convert a media file path into its /api/media URL."""
+    media_root = get_media_root()
+    # Convert absolute path to relative path
+    if file_path.startswith(media_root):
+        relative_path = file_path[len(media_root):].lstrip(os.sep).replace(os.sep, "/")
+    else:
+        # If already relative, use as is
+        relative_path = file_path.replace(os.sep, "/")
+    return f"/api/media/{relative_path}"
+
+
+async def remove_file_quietly(file_path: str) -> None:
+    """Delete a file, ignoring errors (used for cleanup paths)."""
+    try:
+        await aiofiles.os.remove(file_path)
+    except OSError:
+        pass
+
+
+async def stream_upload_to_disk(file: UploadFile, media_type: str) -> StoredMedia:
+    """Stream an upload into a temp file with constant memory.
+
+    Chunks are written as they arrive while the size limit is enforced and a
+    SHA-256 is computed; on any failure the temp file is removed. The caller
+    moves the temp file into place with ``app.storage.store_media_file``.
+    """
+    max_size = get_max_media_size(media_type)
+    tmp_path = f"{get_media_tmp_dir()}/{uuid.uuid4().hex}.part"
     
-    # Write file
-    with open(file_path, "wb") as f:
-        f.write(file_content)
+    hasher = hashlib.sha256()
+    total_size = 0
+    started = time.perf_counter()
+    try:
+        async with aiofiles.open(tmp_path, "wb") as out:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                total_size += len(chunk)
+                if total_size > max_size:
+                    raise MediaTooLargeError(media_type, max_size)
+                hasher.update(chunk)
+                await out.write(chunk)
+    except BaseException:
+        await remove_file_quietly(tmp_path)
+        raise
     
-    return file_path
+    elapsed = time.perf_counter() - started
+    MEDIA_UPLOAD_BYTES.labels(media_type).inc(total_size)
+    MEDIA_UPLOAD_DURATION.labels(media_type, "form").observe(elapsed)
+    record_timing("io", elapsed)
+    return StoredMedia(path=tmp_path, size=total_size, checksum=hasher.hexdigest())
+
+
+def get_upload_session_path(upload_id: str) -> str:
+    """Path of the partial file backing a resumable upload session."""
+    return f"{get_media_tmp_dir()}/upload_{upload_id}.part"
+
+
+@asynccontextmanager
+async def locked_upload_part(part_path: str) -> AsyncIterator[None]:
+    """Hold the write lock of a resumable upload's partial file, creating it if needed.
+
+    The lock is an ``flock`` on the file, so it excludes writers in every
+    worker process on the host; it is taken without waiting and raises
+    UploadBusyError if another request holds it.
+    """
+    fd = await asyncio.to_thread(os.open, part_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadBusyError()
+        yield
+    finally:
+        # Closing the descriptor releases the lock
+        os.close(fd)
+
+
+def compute_file_checksum(file_path: str) -> str:
+    """Compute the hex SHA-256 of a file, reading it in chunks (blocking)."""
+    hasher = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while True:
+            chunk = f.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+async def write_upload_chunk(
+    part_path: str,
+    offset: int,
+    chunks: AsyncIterator[bytes],
+    media_type: str
+) -> int:
+    """Write a streamed chunk into a resumable upload at ``offset``.
+
+    Anything past ``offset`` (left over from an interrupted write) is
+    truncated first, so the file always matches the acknowledged offset.
+    Returns the new offset.
+    """
+    max_size = get_max_media_size(media_type)
+    mode = "r+b" if await aiofiles.os.path.exists(part_path) else "wb"
+    started_at, started = offset, time.perf_counter()
+    async with aiofiles.open(part_path, mode) as out:
+        await out.truncate(offset)
+        await out.seek(offset)
+        try:
+            async for chunk in chunks:
+                if not chunk:
+                    continue
+                if offset + len(chunk) > max_size:
+                    raise MediaTooLargeError(media_type, max_size)
+                await out.write(chunk)
+                offset += len(chunk)
+        except MediaTooLargeError:
+            raise
+        except Exception as e:
+            # Everything up to ``offset`` is on disk and can be kept
+            await out.flush()
+            MEDIA_UPLOAD_BYTES.labels(media_type).inc(offset - started_at)
+            raise UploadInterruptedError(offset) from e
+    elapsed = time.perf_counter() - started
+    MEDIA_UPLOAD_BYTES.labels(media_type).inc(offset - started_at)
+    MEDIA_UPLOAD_DURATION.labels(media_type, "chunk").observe(elapsed)
+    record_timing("io", elapsed)
+    return offset
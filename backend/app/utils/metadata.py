@@ -1,53 +1,92 @@
-from typing import Dict, Optional
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
 from fastapi import Request
+from app.utils.cache import TTLCache
+from app.utils.geoip import GeoIPResolver, is_reserved_address, parse_ip
+from app.utils.metrics import GEOLOCATION_LOOKUPS, GEOLOCATION_REQUEST_DURATION
+from app.utils.profiling import timed
+import asyncio
 import requests
 import os
+import re
+import time
+
+
+# Geolocation lookup settings
+GEOLOCATION_TIMEOUT = float(os.getenv("GEOLOCATION_TIMEOUT", "2.0"))
+GEOLOCATION_CACHE_SIZE = int(os.getenv("GEOLOCATION_CACHE_SIZE", "10000"))
+GEOLOCATION_CACHE_TTL = float(os.getenv("GEOLOCATION_CACHE_TTL", "86400"))
+GEOLOCATION_NEGATIVE_TTL = float(os.getenv("GEOLOCATION_NEGATIVE_TTL", "600"))
+
+# Compiled range database (see app.utils.geoip); when set, lookups never leave the process
+GEOIP_DATABASE = os.getenv("GEOIP_DATABASE", "")
+GEOIP_RELOAD_INTERVAL = float(os.getenv("GEOIP_RELOAD_INTERVAL", "60"))
+
+# Resolved locations keyed by IP; failed lookups are cached as "Unknown"
+# with a shorter TTL so a flaky upstream is not hammered on every request.
+_location_cache = TTLCache(maxsize=GEOLOCATION_CACHE_SIZE, ttl=GEOLOCATION_CACHE_TTL)
+_inflight_lookups: Dict[str, "asyncio.Future[str]"] = {}
+_geoip = GeoIPResolver(GEOIP_DATABASE, reload_interval=GEOIP_RELOAD_INTERVAL) if GEOIP_DATABASE else None
+
+
+# Classification rules, tried in order; the first pattern found in the
+# User-Agent gives the label. Order matters: iPad and Android tablet UAs also
+# match the phone patterns, Android UAs contain "Linux", iOS UAs contain
+# "like Mac OS X", and Edge and Opera UAs contain "Chrome" and "Safari".
+DEVICE_RULES = (
+    ("Tablet", re.compile(r"ipad|tablet|kindle|silk/|playbook|android(?!.*mobile)", re.IGNORECASE)),
+    ("Mobile", re.compile(r"mobi|iphone|ipod|android|windows phone|blackberry", re.IGNORECASE)),
+)
+BROWSER_RULES = (
+    ("Edge", re.compile(r"edge?/|edg(?:a|ios)/", re.IGNORECASE)),
+    ("Opera", re.compile(r"opr/|opera|opios/", re.IGNORECASE)),
+    ("Firefox", re.compile(r"firefox/|fxios/", re.IGNORECASE)),
+    ("Chrome", re.compile(r"chrome/|crios/|chromium/", re.IGNORECASE)),
+    ("Safari", re.compile(r"safari/", re.IGNORECASE)),
+)
+OS_RULES = (
+    ("iOS", re.compile(r"iphone|ipad|ipod", re.IGNORECASE)),
+    ("Android", re.compile(r"android", re.IGNORECASE)),
+    ("Windows", re.compile(r"windows", re.IGNORECASE)),
+    ("macOS", re.compile(r"macintosh|mac os x", re.IGNORECASE)),
+    ("ChromeOS", re.compile(r"cros ", re.IGNORECASE)),
+    ("Linux", re.compile(r"linux|x11", re.IGNORECASE)),
+)
+
+# Distinct User-Agents remembered; real traffic has a few thousand
+USER_AGENT_CACHE_SIZE = int(os.getenv("USER_AGENT_CACHE_SIZE", "4096"))
+# Longer User-Agents are classified (and cached) by this prefix only
+USER_AGENT_MAX_LENGTH = 512
+
+
+def _first_match(rules, user_agent: str, default: str) -> str:
+    for label, pattern in rules:
+        if pattern.search(user_agent):
+            return label
+    return default
+
+
+@lru_cache(maxsize=USER_AGENT_CACHE_SIZE)
+def _classify_user_agent(user_agent: str) -> Tuple[str, str, str]:
+    return (
+        _first_match(DEVICE_RULES, user_agent, "Desktop"),
+        _first_match(BROWSER_RULES, user_agent, "Unknown"),
+        _first_match(OS_RULES, user_agent, "Unknown"),
+    )
 
 
 def extract_user_agent_info(user_agent: str) -> Dict[str, Optional[str]]:
-    """Extract device, browser, and OS from User-Agent string."""
-    device = None
-    browser = None
-    os_name = None
-
-    user_agent_lower = user_agent.lower()
-
-    # Device detection
-    if "mobile" in user_agent_lower or "android" in user_agent_lower or "iphone" in user_agent_lower:
-        device = "Mobile"
-    elif "tablet" in user_agent_lower or "ipad" in user_agent_lower:
-        device = "Tablet"
-    else:
-        device = "Desktop"
-
-    # Browser detection
-    if "chrome" in user_agent_lower and "edg" not in user_agent_lower:
-        browser = "Chrome"
-    elif "firefox" in user_agent_lower:
-        browser = "Firefox"
-    elif "safari" in user_agent_lower and "chrome" not in user_agent_lower:
-        browser = "Safari"
-    elif "edg" in user_agent_lower:
-        browser = "Edge"
-    elif "opera" in user_agent_lower:
-        browser = "Opera"
-
-    # OS detection
-    if "windows" in user_agent_lower:
-        os_name = "Windows"
-    elif "mac" in user_agent_lower or "darwin" in user_agent_lower:
-        os_name = "macOS"
-    elif "linux" in user_agent_lower:
-        os_name = "Linux"
-    elif "android" in user_agent_lower:
-        os_name = "Android"
-    elif "ios" in user_agent_lower or "iphone" in user_agent_lower or "ipad" in user_agent_lower:
-        os_name = "iOS"
+    """Extract device, browser, and OS from User-Agent string.
 
+    Matched against ``DEVICE_RULES``, ``BROWSER_RULES`` and ``OS_RULES``;
+    results are cached per User-Agent, so a User-Agent seen before costs
+    one cache lookup.
+    """
+    device, browser, os_name = _classify_user_agent(user_agent[:USER_AGENT_MAX_LENGTH])
     return {
         "device": device,
-        "browser": browser or "Unknown",
-        "os": os_name or "Unknown"
+        "browser": browser,
+        "os": os_name
     }
 
 
@@ -65,32 +104,132 @@ def get_ip_address(request: Request) -> str:
     return request.client.host if request.client else "unknown"
 
 
-def get_location_from_ip(ip_address: str) -> Optional[str]:
-    """Get location from IP address using free geolocation API."""
-    # Skip localhost/private IPs
-    if ip_address in ["127.0.0.1", "localhost", "unknown"] or ip_address.startswith("192.168.") or ip_address.startswith("10."):
+def is_local_ip(ip_address: str) -> bool:
+    """Check whether an IP address cannot be geolocated (unparseable, private or reserved)."""
+    address = parse_ip(ip_address)
+    return address is None or is_reserved_address(address)
+
+
+def _lookup_offline(ip_address: str) -> str:
+    """Resolve from the GeoIP database, parsing the address once; needs ``_geoip``."""
+    address = parse_ip(ip_address)
+    if address is None or is_reserved_address(address):
+        GEOLOCATION_LOOKUPS.labels("local").inc()
         return "Local"
-    
+    GEOLOCATION_LOOKUPS.labels("offline").inc()
+    return _geoip.lookup(address) or "Unknown"
+
+
+def _fetch_location(ip_address: str) -> Optional[str]:
+    """Query the geolocation API. Returns None when the lookup fails."""
+    GEOLOCATION_LOOKUPS.labels("remote").inc()
+    started = time.perf_counter()
+    location = None
     try:
         # Using ip-api.com (free, no API key required for basic usage)
-        response = requests.get(f"http://ip-api.com/json/{ip_address}", timeout=5)
+        response = requests.get(f"http://ip-api.com/json/{ip_address}", timeout=GEOLOCATION_TIMEOUT)
         if response.status_code == 200:
             data = response.json()
             if data.get("status") == "success":
-                return data.get("country", "Unknown")
+                location = data.get("country", "Unknown")
     except Exception:
         pass
-    
-    return "Unknown"
 
+    outcome = "failure" if location is None else "success"
+    GEOLOCATION_REQUEST_DURATION.labels(outcome).observe(time.perf_counter() - started)
+    return location
+
+
+def _lookup_local_or_cached(ip_address: str) -> Tuple[bool, Optional[str]]:
+    """``(found, location)`` for a private address or cached IP, counting how it was answered."""
+    if is_local_ip(ip_address):
+        GEOLOCATION_LOOKUPS.labels("local").inc()
+        return True, "Local"
+    found, location = _location_cache.lookup(ip_address)
+    if found:
+        GEOLOCATION_LOOKUPS.labels("cache").inc()
+    return found, location
+
+
+def get_cached_location(ip_address: str) -> Optional[str]:
+    """Return the location for an IP if it is known without a network call."""
+    if _geoip is not None:
+        return _lookup_offline(ip_address)
+    _, location = _lookup_local_or_cached(ip_address)
+    return location
+
+
+def get_location_from_ip(ip_address: str) -> Optional[str]:
+    """Get location from IP address using the GeoIP database or free geolocation API (blocking)."""
+    if _geoip is not None:
+        return _lookup_offline(ip_address)
+    # Skip localhost/private IPs and cached ones
+    found, location = _lookup_local_or_cached(ip_address)
+    if found:
+        return location
+
+    location = _fetch_location(ip_address)
+    if location is None:
+        _location_cache.set(ip_address, "Unknown", ttl=GEOLOCATION_NEGATIVE_TTL)
+        return "Unknown"
+    _location_cache.set(ip_address, location)
+    return location
+
+
+async def _resolve_location(ip_address: str) -> str:
+    try:
+        location = await asyncio.wait_for(
+            asyncio.to_thread(_fetch_location, ip_address),
+            timeout=GEOLOCATION_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        location = None
+
+    if location is None:
+        _location_cache.set(ip_address, "Unknown", ttl=GEOLOCATION_NEGATIVE_TTL)
+        return "Unknown"
+    _location_cache.set(ip_address, location)
+    return location
+
+
+async def get_location_from_ip_async(ip_address: str) -> str:
+    """Get location from IP address without blocking the event loop.
+
+    With ``GEOIP_DATABASE`` set the lookup is local and answered inline.
+    Otherwise the HTTP call runs in a worker thread bounded by
+    ``GEOLOCATION_TIMEOUT``. Results (including failures) are cached per IP,
+    and concurrent lookups for the same IP share a single upstream request.
+    """
+    if _geoip is not None:
+        return _lookup_offline(ip_address)
+    found, location = _lookup_local_or_cached(ip_address)
+    if found:
+        return location
+
+    pending = _inflight_lookups.get(ip_address)
+    if pending is not None:
+        GEOLOCATION_LOOKUPS.labels("shared").inc()
+        return await asyncio.shield(pending)
+
+    task = asyncio.ensure_future(_resolve_location(ip_address))
+    _inflight_lookups[ip_address] = task
+    task.add_done_callback(lambda _: _inflight_lookups.pop(ip_address, None))
+    return await asyncio.shield(task)
+
+
+def extract_metadata(request: Request) -> Dict[str, Optional[str]]:
+    """Extract all metadata from request.
 
-def extract_metadata(request: Request) -> Dict[str, str]:
-    """Extract all metadata from request."""
+    Location is only filled in when it is known locally (cached, or from
+    the GeoIP database); otherwise it is None and should be resolved with
+    ``get_location_from_ip_async`` off the request path.
+    """
     ip_address = get_ip_address(request)
     user_agent = request.headers.get("User-Agent", "Unknown")
     
     ua_info = extract_user_agent_info(user_agent)
-    location = get_location_from_ip(ip_address)
+    with timed("geo"):
+        location = get_cached_location(ip_address)
     
     return {
         "ip_address": ip_address,
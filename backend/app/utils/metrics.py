@@ -0,0 +1,370 @@
+"""In-process metrics in the Prometheus text format.
+
+Counters, gauges and histograms keep their values in plain Python objects,
+one per label combination, each with its own lock, so an update is an
+uncontended lock and an addition. Gauges can instead be computed when
+collected (``Gauge.set_function``), which is how the database pool is
+reported without hooking every checkout.
+
+Each worker process has its own values. With ``METRICS_DIR`` set, every
+process writes a snapshot to ``METRICS_DIR/<pid>.json`` every
+``METRICS_FLUSH_INTERVAL`` seconds (and the scraped one right before it
+answers), and ``/metrics`` adds up all snapshots: counters and histograms
+from every process that ever wrote one, so they never go backwards when a
+worker exits, and gauges only from processes that wrote within
+``METRICS_STALE_AFTER`` seconds. Clear the directory when the service is
+(re)deployed. Without it, ``/metrics`` reports the scraped process only.
+"""
+from abc import ABC, abstractmethod
+import asyncio
+import bisect
+import glob
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+METRICS_STALE_AFTER = float(os.getenv("METRICS_STALE_AFTER", str(3 * METRICS_FLUSH_INTERVAL)))
+
+CONTENT_TYPE = "text/plain; version=0.0.4"  # Starlette adds the charset
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+LONG_DURATION_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+SIZE_BUCKETS = tuple(4 ** exponent * 1024 for exponent in range(11))  # 1 KiB .. 1 GiB
+
+LabelValues = Tuple[str, ...]
+
+
+class _CounterValue:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeValue(_CounterValue):
+    def dec(self, amount: float = 1) -> None:
+        self.inc(-amount)
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _HistogramValue:
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # per bucket, the last one is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class _Metric(ABC):
+    """A metric family: one value object per label combination."""
+
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[LabelValues, object] = {}
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    @abstractmethod
+    def _new_child(self):
+        """A value object for one label combination."""
+
+    def labels(self, *values: str):
+        """The series for these label values (in ``labelnames`` order)."""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def samples(self) -> Dict[LabelValues, object]:
+        """Current values keyed by label values: a number, or histogram counts and sum."""
+        return {key: child.value for key, child in list(self._children.items())}
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def _new_child(self):
+        return _CounterValue()
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._function: Optional[Callable[[], float]] = None
+
+    def _new_child(self):
+        return _GaugeValue()
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1) -> None:
+        self.labels().dec(amount)
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Compute the (unlabelled) value when collected instead of tracking it."""
+        self._function = function
+
+    def samples(self) -> Dict[LabelValues, object]:
+        if self._function is not None:
+            try:
+                return {(): float(self._function())}
+            except Exception:
+                return {}
+        return super().samples()
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def samples(self) -> Dict[LabelValues, object]:
+        return {
+            key: {"counts": list(child.counts), "sum": child.sum}
+            for key, child in list(self._children.items())
+        }
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+
+    def snapshot(self) -> dict:
+        """All metrics as JSON-serializable data (label values joined into keys)."""
+        return {
+            name: {
+                "type": metric.type,
+                "help": metric.documentation,
+                "labelnames": list(metric.labelnames),
+                "buckets": list(getattr(metric, "buckets", ())),
+                "samples": {json.dumps(key): value for key, value in metric.samples().items()},
+            }
+            for name, metric in self.metrics.items()
+        }
+
+
+REGISTRY = Registry()
+
+
+def merge_snapshots(snapshots: Iterable[Tuple[dict, bool]]) -> dict:
+    """Add up snapshots of several processes; gauges only from the live ones (the flag)."""
+    merged: dict = {}
+    for snapshot, live in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, {**metric, "samples": {}})
+            if metric["type"] == "gauge" and not live:
+                continue
+            samples = target["samples"]
+            for key, value in metric["samples"].items():
+                if metric["type"] != "histogram":
+                    samples[key] = samples.get(key, 0.0) + value
+                elif key not in samples:
+                    samples[key] = {"counts": list(value["counts"]), "sum": value["sum"]}
+                else:
+                    samples[key]["counts"] = [a + b for a, b in zip(samples[key]["counts"], value["counts"])]
+                    samples[key]["sum"] += value["sum"]
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Tuple[str, str] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def render(snapshot: dict) -> str:
+    """Format a snapshot in the Prometheus text exposition format."""
+    lines: List[str] = []
+    for name, metric in sorted(snapshot.items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        names = metric["labelnames"]
+        for key, value in sorted(metric["samples"].items()):
+            values = json.loads(key)
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_format_labels(names, values)} {_format_value(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(list(metric["buckets"]) + [math.inf], value["counts"]):
+                cumulative += count
+                le = ("le", _format_value(bound))
+                lines.append(f"{name}_bucket{_format_labels(names, values, le)} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(names, values)} {_format_value(value['sum'])}")
+            lines.append(f"{name}_count{_format_labels(names, values)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def write_snapshot(directory: str = METRICS_DIR) -> None:
+    """Write this process's snapshot for the others to aggregate (atomically)."""
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".metrics-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(REGISTRY.snapshot(), f)
+        os.replace(tmp_path, os.path.join(directory, f"{os.getpid()}.json"))
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def read_snapshots(directory: str = METRICS_DIR) -> List[Tuple[dict, bool]]:
+    """Snapshots of all processes, each with whether it was written recently."""
+    now = time.time()
+    snapshots = []
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        try:
+            with open(path) as f:
+                snapshot = json.load(f)
+            live = now - os.path.getmtime(path) <= METRICS_STALE_AFTER
+        except (OSError, ValueError):
+            continue  # removed or replaced while reading
+        snapshots.append((snapshot, live))
+    return snapshots
+
+
+def generate_latest() -> str:
+    """The metrics of this process, or of all processes with ``METRICS_DIR``."""
+    if not METRICS_DIR:
+        return render(REGISTRY.snapshot())
+    write_snapshot()
+    return render(merge_snapshots(read_snapshots()))
+
+
+async def flush_snapshots_periodically() -> None:
+    """Keep this process's snapshot fresh; run as a task for the life of the app."""
+    while True:
+        await asyncio.sleep(METRICS_FLUSH_INTERVAL)
+        try:
+            await asyncio.to_thread(write_snapshot)
+        except OSError as e:
+            print(f"Failed to write metrics snapshot: {e}")
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request counts, latency per route template and requests in flight.
+
+    Latency runs until the last byte of the response is sent, so streamed
+    exports are measured in full. Requests matching no route share the
+    ``<unmatched>`` label, which bounds the number of series.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_PROGRESS.dec()
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "<unmatched>"
+            method = scope["method"]
+            HTTP_REQUEST_DURATION.labels(method, template).observe(time.perf_counter() - started)
+            HTTP_REQUESTS.labels(method, template, str(status)).inc()
+
+
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests", ("method", "route", "status"))
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time from request to last response byte", ("method", "route")
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge("http_requests_in_progress", "HTTP requests being served")
+
+MEDIA_UPLOAD_BYTES = Counter("media_upload_bytes_total", "Bytes of media received", ("type",))
+MEDIA_UPLOAD_DURATION = Histogram(
+    "media_upload_duration_seconds",
+    "Time to receive a media upload (mode=form) or one chunk of a resumable upload (mode=chunk)",
+    ("type", "mode"),
+    buckets=LONG_DURATION_BUCKETS
+)
+
+EXPORT_DURATION = Histogram(
+    "export_duration_seconds", "Time to stream a ZIP export", ("kind",), buckets=LONG_DURATION_BUCKETS
+)
+EXPORT_SIZE = Histogram("export_size_bytes", "Size of streamed ZIP exports", ("kind",), buckets=SIZE_BUCKETS)
+
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Database connections in use")
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow", "Database connections open beyond the pool size")
+
+GEOLOCATION_LOOKUPS = Counter(
+    "geolocation_lookups_total",
+    "Location lookups by how they were answered (local, offline, cache, shared, remote)",
+    ("source",)
+)
+GEOLOCATION_REQUEST_DURATION = Histogram(
+    "geolocation_request_duration_seconds", "Time of remote geolocation API calls", ("outcome",)
+)
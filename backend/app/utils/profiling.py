@@ -0,0 +1,217 @@
+"""Per-request timing: SQL statements, Server-Timing, slow queries and sampled profiles.
+
+``ProfilingMiddleware`` gives each request a ``RequestTimings`` (through a
+context variable, which follows the request into SQLAlchemy's cursor events
+and ``asyncio.to_thread``). Engine hooks add every statement to it, routes
+of class ``TimedRoute`` time their response serialization, and code doing
+other slow work wraps it in ``timed("geo")``/``timed("io")``. The totals go
+out in a ``Server-Timing`` header:
+
+    Server-Timing: db;dur=12.4;desc="5 queries", io;dur=3.1, serialize;dur=0.8, app;dur=20.2
+
+Only work done before the headers are sent is included, so a streamed
+response reports what it took to start it. Statements slower than
+``SLOW_QUERY_THRESHOLD_MS`` are printed with their normalized SQL, also
+outside requests (jobs).
+
+With ``PROFILE_SAMPLE_RATE`` above 0, that fraction of requests runs under
+cProfile, and the profiles of those taking at least
+``PROFILE_MIN_DURATION_MS`` are written to ``PROFILE_DIR`` (open them with
+``python -m pstats`` or snakeviz). The profiler sees the whole event loop
+thread, so other requests served meanwhile show up in it too; one request
+per process is profiled at a time.
+"""
+import asyncio
+import cProfile
+import os
+import random
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+SERVER_TIMING = os.getenv("SERVER_TIMING", "true").lower() == "true"
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "500"))  # 0 = off
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_MIN_DURATION_MS = float(os.getenv("PROFILE_MIN_DURATION_MS", "1000"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+
+# Phases reported besides db, in header order
+PHASES = ("geo", "io", "serialize")
+
+_IN_LIST = re.compile(r"\(\s*(?:\?|\$\d+|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|\$\d+|%\(\w+\)s|:\w+))+\s*\)")
+_PLACEHOLDER = re.compile(r"\$\d+|%\(\w+\)s|(?<!:):\w+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class RequestTimings:
+    """What a request spent its time on so far (seconds)."""
+
+    __slots__ = ("method", "path", "queries", "db", "phases")
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.queries = 0
+        self.db = 0.0
+        self.phases: Dict[str, float] = {}
+
+    def server_timing(self, total: float) -> str:
+        parts = [f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries"']
+        for phase in PHASES:
+            if phase in self.phases:
+                parts.append(f"{phase};dur={self.phases[phase] * 1000:.1f}")
+        parts.append(f"app;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+_endpoint_returned: ContextVar[Optional[List[float]]] = ContextVar("endpoint_returned", default=None)
+_profiling = False
+
+
+def record_timing(phase: str, seconds: float) -> None:
+    """Add time to a phase of the current request, if there is one."""
+    timings = _current.get()
+    if timings is not None:
+        timings.phases[phase] = timings.phases.get(phase, 0.0) + seconds
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(phase, time.perf_counter() - started)
+
+
+def normalize_sql(statement: str) -> str:
+    """One line of SQL with literals and bound parameters as ``?`` and IN lists as ``(...)``."""
+    statement = _STRING.sub("?", statement)
+    statement = _PLACEHOLDER.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    statement = _IN_LIST.sub("(...)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+# Registered on the Engine class once, on import, so every engine (the API's,
+# the job worker's) is timed, and no engine twice
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _end_query(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_started
+    timings = _current.get()
+    if timings is not None:
+        timings.queries += 1
+        timings.db += elapsed
+    if SLOW_QUERY_THRESHOLD_MS and elapsed * 1000 >= SLOW_QUERY_THRESHOLD_MS:
+        where = f"{timings.method} {timings.path}" if timings is not None else "outside a request"
+        print(f"Slow query ({elapsed * 1000:.0f} ms, {where}): {normalize_sql(statement)}")
+
+
+def _mark_endpoint_returned() -> None:
+    marks = _endpoint_returned.get()
+    if marks is not None:
+        marks.append(time.perf_counter())
+
+
+class TimedRoute(APIRoute):
+    """Route that times response model serialization as the ``serialize`` phase.
+
+    Use it as a router's ``route_class``. The endpoint records when it
+    returns; everything the handler does after that (validating the result
+    against the response model, encoding it) is serialization.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Awaitable[Response]]:
+        call = self.dependant.call
+        # FastAPI runs the call in the threadpool unless it is a coroutine function
+        if asyncio.iscoroutinefunction(call):
+            async def endpoint(**values):
+                try:
+                    return await call(**values)
+                finally:
+                    _mark_endpoint_returned()
+        else:
+            def endpoint(**values):
+                try:
+                    return call(**values)
+                finally:
+                    _mark_endpoint_returned()
+        self.dependant.call = endpoint
+        handler = super().get_route_handler()
+
+        async def timed_handler(request: Request) -> Response:
+            # A list, so that a sync endpoint's thread can add to it
+            marks = []
+            token = _endpoint_returned.set(marks)
+            try:
+                return await handler(request)
+            finally:
+                _endpoint_returned.reset(token)
+                if marks:
+                    record_timing("serialize", time.perf_counter() - marks[-1])
+
+        return timed_handler
+
+
+def _write_profile(profiler: cProfile.Profile, timings: RequestTimings, elapsed: float) -> None:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    route = re.sub(r"[^\w.-]+", "_", timings.path).strip("_") or "root"
+    path = os.path.join(
+        PROFILE_DIR, f"{time.strftime('%Y%m%d_%H%M%S')}_{timings.method}_{route}_{elapsed * 1000:.0f}ms.prof"
+    )
+    profiler.dump_stats(path)
+    print(f"Profiled {timings.method} {timings.path} ({elapsed * 1000:.0f} ms, {timings.queries} queries): {path}")
+
+
+class ProfilingMiddleware:
+    """ASGI middleware collecting ``RequestTimings`` and sending them as ``Server-Timing``."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global _profiling
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings = RequestTimings(scope["method"], scope["path"])
+        token = _current.set(timings)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and SERVER_TIMING:
+                header = timings.server_timing(time.perf_counter() - started)
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", header.encode())]
+            await send(message)
+
+        profiler = None
+        if PROFILE_SAMPLE_RATE > 0 and not _profiling and random.random() < PROFILE_SAMPLE_RATE:
+            _profiling = True
+            profiler = cProfile.Profile()
+            profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            if profiler is not None:
+                profiler.disable()
+                _profiling = False
+                elapsed = time.perf_counter() - started
+                if elapsed * 1000 >= PROFILE_MIN_DURATION_MS:
+                    _write_profile(profiler, timings, elapsed)
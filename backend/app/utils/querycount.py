@@ -0,0 +1,47 @@
+"""Count the SQL statements an engine executes.
+
+Used to keep per-endpoint query counts in check (see
+``benchmarks/query_budget.py``): an N+1 pattern shows up as a count that
+grows with the amount of data instead of staying flat.
+"""
+from contextlib import contextmanager
+from typing import Iterator, List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+class QueryLog:
+    """Statements recorded while a ``count_queries`` block is active."""
+
+    def __init__(self):
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def __len__(self) -> int:
+        return len(self.statements)
+
+
+@contextmanager
+def count_queries(*engines) -> Iterator[QueryLog]:
+    """Record every statement sent to the given engines (sync or async)."""
+    log = QueryLog()
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        log.statements.append(statement)
+
+    targets: List[Engine] = [
+        engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+        for engine in engines
+    ]
+    for target in targets:
+        event.listen(target, "before_cursor_execute", record)
+    try:
+        yield log
+    finally:
+        for target in targets:
+            event.remove(target, "before_cursor_execute", record)
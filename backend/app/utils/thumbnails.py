@@ -0,0 +1,100 @@
+"""Resized and re-encoded variants of stored images, generated on demand.
+
+Variants are rendered with Pillow on a thread pool the first time they are
+requested and kept in a size-capped LRU directory. Concurrent requests for
+the same missing variant share one rendering. Sources are read through the
+storage backend, so remote storage is only fetched on a cache miss.
+"""
+import asyncio
+import hashlib
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from PIL import Image
+
+from app.storage import get_storage
+from app.utils.cache import DiskLRUCache, SingleFlight
+from app.utils.media import get_media_root
+
+
+THUMBNAIL_WIDTHS = tuple(int(width) for width in os.getenv("THUMBNAIL_WIDTHS", "80,160,320,640").split(","))
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", "80"))
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", "4"))
+THUMBNAIL_CACHE_DIR = os.getenv("THUMBNAIL_CACHE_DIR") or f"{get_media_root()}/cache/images"
+THUMBNAIL_CACHE_MAX_BYTES = int(os.getenv("THUMBNAIL_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+# fmt query value -> (Pillow format, content type)
+THUMBNAIL_FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+    "png": ("PNG", "image/png"),
+}
+
+_executor = ThreadPoolExecutor(max_workers=THUMBNAIL_WORKERS, thread_name_prefix="thumbnails")
+_variant_cache = DiskLRUCache(THUMBNAIL_CACHE_DIR, THUMBNAIL_CACHE_MAX_BYTES)
+_renders = SingleFlight()
+
+
+class InvalidVariantError(ValueError):
+    """Raised for a width or format that is not offered."""
+
+
+def render_variant(source_path: str, width: Optional[int], fmt: str) -> bytes:
+    """Resize an image to at most ``width`` pixels wide and encode it as ``fmt``.
+
+    Images are never enlarged; ``width=None`` only re-encodes.
+    """
+    pil_format, _ = THUMBNAIL_FORMATS[fmt]
+    with Image.open(source_path) as image:
+        image.load()
+        if width and image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+        if pil_format == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, pil_format, quality=THUMBNAIL_QUALITY)
+        return buffer.getvalue()
+
+
+def variant_key(version: str, width: Optional[int], fmt: str) -> str:
+    """Cache file name for a variant; changes whenever the source does (``version``)."""
+    identity = f"{version}:{width or 0}"
+    return f"{hashlib.sha256(identity.encode()).hexdigest()[:32]}.{fmt}"
+
+
+async def get_image_variant(key: str, width: Optional[int], fmt: str) -> Tuple[str, str]:
+    """Path and content type of a variant of the stored image ``key``, rendering it if needed.
+
+    Raises InvalidVariantError for widths not in ``THUMBNAIL_WIDTHS`` (so the
+    cache cannot be filled with arbitrary sizes) and unknown formats, and
+    OSError if the source is not a readable image.
+    """
+    if fmt not in THUMBNAIL_FORMATS:
+        raise InvalidVariantError(f"Unsupported format '{fmt}'. Use one of: {', '.join(THUMBNAIL_FORMATS)}")
+    if width is not None and width not in THUMBNAIL_WIDTHS:
+        raise InvalidVariantError(
+            f"Unsupported width {width}. Use one of: {', '.join(str(w) for w in THUMBNAIL_WIDTHS)}"
+        )
+    media_type = THUMBNAIL_FORMATS[fmt][1]
+
+    storage = get_storage()
+    loop = asyncio.get_running_loop()
+
+    def probe() -> Tuple[str, Optional[str]]:
+        # stat()s the source and the cache (scanning it on first use), so off the loop
+        cache_key = variant_key(storage.version(key), width, fmt)
+        return cache_key, _variant_cache.get(cache_key)
+
+    cache_key, path = await loop.run_in_executor(_executor, probe)
+    if path:
+        return path, media_type
+
+    async def render() -> str:
+        async with storage.local_file(key) as source_path:
+            data = await loop.run_in_executor(_executor, render_variant, source_path, width, fmt)
+        return await loop.run_in_executor(_executor, _variant_cache.put, cache_key, data)
+
+    return await _renders.run(cache_key, render), media_type
@@ -0,0 +1,327 @@
+"""Streaming ZIP writer.
+
+Builds an uncompressed (ZIP_STORED) archive incrementally so it can be sent
+while it is being produced. In-memory members are written with precomputed
+CRCs; file members are read from disk in chunks and followed by a data
+descriptor carrying the CRC and sizes. ZIP64 records are used whenever a
+size, offset or entry count does not fit the classic format.
+"""
+import asyncio
+import os
+import struct
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import AsyncIterable, AsyncIterator, Iterable, List, Optional, Tuple, Union
+
+import aiofiles
+
+
+ZIP_CHUNK_SIZE = 1024 * 1024  # 1MB
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP64_COUNT_LIMIT = 0xFFFF
+
+# Files up to this size are read whole when prefetching; larger ones are streamed
+PREFETCH_MAX_SIZE = 16 * 1024 * 1024  # 16MB
+
+_FLAG_DATA_DESCRIPTOR = 0x08
+_FLAG_UTF8 = 0x800
+_VERSION_DEFAULT = 20
+_VERSION_ZIP64 = 45
+
+
+@dataclass
+class ZipEntry:
+    """A member to add to the archive.
+
+    Exactly one of ``data`` (in memory), ``path`` (file on disk) or
+    ``chunks`` (async iterator producing the content) should be set.
+    """
+    name: str
+    data: Optional[bytes] = None
+    path: Optional[str] = None
+    chunks: Optional[AsyncIterator[bytes]] = None
+
+
+@dataclass
+class _CentralRecord:
+    name: bytes
+    flags: int
+    dostime: int
+    dosdate: int
+    crc: int
+    size: int
+    offset: int
+
+
+def _dos_datetime(timestamp: float) -> Tuple[int, int]:
+    t = time.localtime(timestamp)
+    year = max(t.tm_year, 1980)
+    dosdate = ((year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    dostime = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    return dostime, dosdate
+
+
+class ZipWriter:
+    """Incremental ZIP encoder; every method returns the bytes to emit next."""
+
+    def __init__(self):
+        self._offset = 0
+        self._records: List[_CentralRecord] = []
+        self._current: Optional[_CentralRecord] = None
+        self._current_zip64 = False
+
+    def _emit(self, data: bytes) -> bytes:
+        self._offset += len(data)
+        return data
+
+    def _local_header(self, record: _CentralRecord, zip64: bool) -> bytes:
+        extra = b""
+        size = record.size
+        if zip64:
+            extra = struct.pack("<HHQQ", 0x0001, 16, record.size, record.size)
+            size = ZIP64_LIMIT
+        header = struct.pack(
+            "<IHHHHHIIIHH",
+            0x04034B50,
+            _VERSION_ZIP64 if zip64 else _VERSION_DEFAULT,
+            record.flags,
+            0,  # stored
+            record.dostime,
+            record.dosdate,
+            record.crc,
+            size,
+            size,
+            len(record.name),
+            len(extra),
+        )
+        return header + record.name + extra
+
+    def add_bytes(self, name: str, data: bytes, mtime: Optional[float] = None) -> bytes:
+        """Encode an in-memory member (CRC and size known up front)."""
+        dostime, dosdate = _dos_datetime(mtime or time.time())
+        record = _CentralRecord(
+            name=name.encode("utf-8"),
+            flags=_FLAG_UTF8,
+            dostime=dostime,
+            dosdate=dosdate,
+            crc=zlib.crc32(data),
+            size=len(data),
+            offset=self._offset,
+        )
+        self._records.append(record)
+        return self._emit(self._local_header(record, zip64=len(data) >= ZIP64_LIMIT) + data)
+
+    def start_entry(self, name: str, mtime: Optional[float] = None, size_hint: int = 0) -> bytes:
+        """Begin a streamed member; its CRC and size follow in a data descriptor."""
+        dostime, dosdate = _dos_datetime(mtime or time.time())
+        self._current = _CentralRecord(
+            name=name.encode("utf-8"),
+            flags=_FLAG_UTF8 | _FLAG_DATA_DESCRIPTOR,
+            dostime=dostime,
+            dosdate=dosdate,
+            crc=0,
+            size=0,
+            offset=self._offset,
+        )
+        self._current_zip64 = size_hint >= ZIP64_LIMIT
+        return self._emit(self._local_header(self._current, zip64=self._current_zip64))
+
+    def write(self, chunk: bytes) -> bytes:
+        """Account for a chunk of the current member and return it."""
+        record = self._current
+        record.crc = zlib.crc32(chunk, record.crc)
+        record.size += len(chunk)
+        if record.size >= ZIP64_LIMIT and not self._current_zip64:
+            raise ValueError(f"{record.name.decode()} grew past 4GB after its header was written")
+        return self._emit(chunk)
+
+    def end_entry(self) -> bytes:
+        """Finish the current member with its data descriptor."""
+        record = self._current
+        if self._current_zip64:
+            descriptor = struct.pack("<IIQQ", 0x08074B50, record.crc, record.size, record.size)
+        else:
+            descriptor = struct.pack("<IIII", 0x08074B50, record.crc, record.size, record.size)
+        self._records.append(record)
+        self._current = None
+        return self._emit(descriptor)
+
+    def finish(self) -> bytes:
+        """Encode the central directory and end-of-archive records."""
+        cd_offset = self._offset
+        parts = []
+        for record in self._records:
+            zip64_fields = []
+            size = record.size
+            offset = record.offset
+            if record.size >= ZIP64_LIMIT:
+                zip64_fields += [record.size, record.size]
+                size = ZIP64_LIMIT
+            if record.offset >= ZIP64_LIMIT:
+                zip64_fields.append(record.offset)
+                offset = ZIP64_LIMIT
+            extra = b""
+            if zip64_fields:
+                extra = struct.pack(f"<HH{len(zip64_fields)}Q", 0x0001, 8 * len(zip64_fields), *zip64_fields)
+            version = _VERSION_ZIP64 if zip64_fields else _VERSION_DEFAULT
+            parts.append(struct.pack(
+                "<IHHHHHHIIIHHHHHII",
+                0x02014B50,
+                version,
+                version,
+                record.flags,
+                0,  # stored
+                record.dostime,
+                record.dosdate,
+                record.crc,
+                size,
+                size,
+                len(record.name),
+                len(extra),
+                0,  # comment length
+                0,  # disk number
+                0,  # internal attributes
+                0o100644 << 16,  # external attributes: regular file, rw-r--r--
+                offset,
+            ) + record.name + extra)
+        central_directory = b"".join(parts)
+        cd_size = len(central_directory)
+        count = len(self._records)
+
+        trailer = b""
+        if count >= ZIP64_COUNT_LIMIT or cd_offset >= ZIP64_LIMIT or cd_size >= ZIP64_LIMIT:
+            zip64_eocd_offset = cd_offset + cd_size
+            trailer += struct.pack(
+                "<IQHHIIQQQQ",
+                0x06064B50, 44, _VERSION_ZIP64, _VERSION_ZIP64, 0, 0,
+                count, count, cd_size, cd_offset,
+            )
+            trailer += struct.pack("<IIQI", 0x07064B50, 0, zip64_eocd_offset, 1)
+        trailer += struct.pack(
+            "<IHHHHIIH",
+            0x06054B50, 0, 0,
+            min(count, ZIP64_COUNT_LIMIT),
+            min(count, ZIP64_COUNT_LIMIT),
+            min(cd_size, ZIP64_LIMIT),
+            min(cd_offset, ZIP64_LIMIT),
+            0,
+        )
+        return self._emit(central_directory + trailer)
+
+
+async def stream_file_entry(writer: ZipWriter, name: str, path: str) -> AsyncIterator[bytes]:
+    """Stream one file member. Missing or empty files are skipped."""
+    try:
+        stat = await asyncio.to_thread(os.stat, path)
+        if stat.st_size == 0:
+            return
+        f = await aiofiles.open(path, "rb")
+    except OSError as e:
+        print(f"Error adding {path} to ZIP: {e}")
+        return
+
+    try:
+        yield writer.start_entry(name, mtime=stat.st_mtime, size_hint=stat.st_size)
+        while True:
+            chunk = await f.read(ZIP_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield writer.write(chunk)
+        yield writer.end_entry()
+    finally:
+        await f.close()
+
+
+async def stream_chunk_entry(writer: ZipWriter, name: str, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Stream a member whose content is produced on the fly."""
+    yield writer.start_entry(name)
+    async for chunk in chunks:
+        if chunk:
+            yield writer.write(chunk)
+    yield writer.end_entry()
+
+
+def _read_small_file(path: str) -> Optional[Tuple[Optional[bytes], float]]:
+    """Read a file for prefetching.
+
+    Returns None for missing/empty files, ``(None, mtime)`` for files too
+    large to hold in memory, otherwise ``(data, mtime)``.
+    """
+    try:
+        stat = os.stat(path)
+        if stat.st_size == 0:
+            return None
+        if stat.st_size > PREFETCH_MAX_SIZE:
+            return None, stat.st_mtime
+        with open(path, "rb") as f:
+            return f.read(), stat.st_mtime
+    except OSError as e:
+        print(f"Error adding {path} to ZIP: {e}")
+        return None
+
+
+async def _iterate(entries: Union[Iterable[ZipEntry], AsyncIterable[ZipEntry]]) -> AsyncIterator[ZipEntry]:
+    if hasattr(entries, "__aiter__"):
+        async for entry in entries:
+            yield entry
+    else:
+        for entry in entries:
+            yield entry
+
+
+async def stream_zip(
+    entries: Union[Iterable[ZipEntry], AsyncIterable[ZipEntry]],
+    executor: Optional[Executor] = None,
+    prefetch: int = 0
+) -> AsyncIterator[bytes]:
+    """Stream a ZIP archive of ``entries``; file reads happen off the event loop.
+
+    With ``prefetch > 0``, up to that many upcoming file members are read
+    concurrently on ``executor`` while earlier ones are being sent. Files
+    larger than ``PREFETCH_MAX_SIZE`` are always streamed in chunks.
+    """
+    loop = asyncio.get_running_loop()
+    writer = ZipWriter()
+    source = _iterate(entries)
+    pending = deque()
+    exhausted = False
+
+    async def fill():
+        nonlocal exhausted
+        while not exhausted and len(pending) <= prefetch:
+            try:
+                entry = await source.__anext__()
+            except StopAsyncIteration:
+                exhausted = True
+                return
+            future = None
+            if prefetch and entry.path is not None:
+                future = loop.run_in_executor(executor, _read_small_file, entry.path)
+            pending.append((entry, future))
+
+    await fill()
+    while pending:
+        entry, future = pending.popleft()
+        await fill()
+        if entry.data is not None:
+            yield writer.add_bytes(entry.name, entry.data)
+        elif entry.chunks is not None:
+            async for chunk in stream_chunk_entry(writer, entry.name, entry.chunks):
+                yield chunk
+        elif future is not None:
+            result = await future
+            if result is None:
+                continue
+            data, mtime = result
+            if data is not None:
+                yield writer.add_bytes(entry.name, data, mtime=mtime)
+            else:
+                async for chunk in stream_file_entry(writer, entry.name, entry.path):
+                    yield chunk
+        else:
+            async for chunk in stream_file_entry(writer, entry.name, entry.path):
+                yield chunk
+    yield writer.finish()
@@ -0,0 +1,75 @@
+"""Benchmark server-side face verification throughput.
+
+Runs ``verify_images`` over a set of PNGs with 1..N pool processes and
+reports images per second overall and per core. By default it synthesizes
+images of the given size; pass ``--images-dir`` to use real face images,
+e.g. ``media/images``.
+
+Requires the optional face dependencies (``pip install -r requirements-face.txt``).
+
+Usage (from backend/):
+    python -m benchmarks.bench_face_verify
+    python -m benchmarks.bench_face_verify --images-dir media/images --workers 1 2 4 8
+"""
+import argparse
+import asyncio
+import glob
+import os
+import tempfile
+import time
+
+from app.utils.face_verification import create_face_pool, verify_images
+
+
+def synthesize_images(count: int, width: int, height: int) -> list:
+    import cv2
+    import numpy as np
+
+    directory = tempfile.mkdtemp(prefix="bench_faces_")
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(count):
+        # Smooth noise, so the cascade has edges to evaluate everywhere
+        image = rng.integers(0, 256, (height // 8, width // 8), dtype=np.uint8)
+        image = cv2.resize(image, (width, height), interpolation=cv2.INTER_CUBIC)
+        path = os.path.join(directory, f"face_{i}.png")
+        cv2.imwrite(path, image)
+        paths.append(path)
+    return paths
+
+
+async def run(paths: list, workers: int) -> float:
+    pool = create_face_pool(workers)
+    try:
+        # Warm up: start the processes and load the cascade in each
+        await verify_images(paths[:workers], executor=pool, workers=workers)
+        started = time.perf_counter()
+        await verify_images(paths, executor=pool, workers=workers)
+        return time.perf_counter() - started
+    finally:
+        pool.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images-dir", help="directory of PNGs to verify instead of synthetic images")
+    parser.add_argument("--count", type=int, default=200, help="synthetic images to generate")
+    parser.add_argument("--size", type=int, nargs=2, default=[640, 480], metavar=("WIDTH", "HEIGHT"))
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    if args.images_dir:
+        paths = sorted(glob.glob(os.path.join(args.images_dir, "*.png")))
+    else:
+        paths = synthesize_images(args.count, *args.size)
+    print(f"{len(paths)} images, {os.cpu_count()} CPUs")
+
+    print(f"{'workers':>8}{'time (s)':>10}{'img/s':>9}{'img/s/core':>12}")
+    for workers in args.workers:
+        seconds = asyncio.run(run(paths, workers))
+        rate = len(paths) / seconds
+        print(f"{workers:>8}{seconds:>10.2f}{rate:>9.1f}{rate / workers:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Benchmark offline GeoIP lookups per second.
+
+Compiles a synthetic range file (or uses ``--database``, a file built with
+``python -m app.cli build-geoip``) and times lookups of random IPv4 and IPv6
+addresses: the binary search alone, through ``GeoIPResolver`` (with its
+reload check), and from a string with the private/reserved check first, as
+``get_location_from_ip`` does.
+
+Usage (from backend/):
+    python -m benchmarks.bench_geoip
+    python -m benchmarks.bench_geoip --ranges 500000 --lookups 200000
+    python -m benchmarks.bench_geoip --database /data/geoip.bin
+"""
+import argparse
+import ipaddress
+import os
+import random
+import tempfile
+import time
+
+from app.utils.geoip import GeoIPDatabase, GeoIPResolver, build_geoip_database, is_reserved_address, parse_ip
+
+COUNTRIES = ["Australia", "Brazil", "Canada", "Germany", "India", "Japan", "United Kingdom", "United States"]
+
+
+def synthesize_database(ranges: int, directory: str) -> str:
+    """Write ``ranges`` IPv4 and ``ranges`` IPv6 ranges spread over the address space."""
+    rng = random.Random(0)
+    csv_path = os.path.join(directory, "ranges.csv")
+    with open(csv_path, "w") as f:
+        # Public IPv4 space, and global unicast IPv6 (2000::/3)
+        for address, low, high in (
+            (ipaddress.IPv4Address, 1 << 24, 1 << 32),
+            (ipaddress.IPv6Address, 0x2 << 124, 0x4 << 124),
+        ):
+            starts = sorted({rng.randrange(low, high) for _ in range(ranges)})
+            for start, next_start in zip(starts, starts[1:] + [high]):
+                end = start + rng.randrange(next_start - start)
+                f.write(f"{address(start)},{address(end)},XX,{rng.choice(COUNTRIES)}\n")
+    database_path = os.path.join(directory, "geoip.bin")
+    build_geoip_database(csv_path, database_path)
+    return database_path
+
+
+def measure(lookup, addresses: list) -> float:
+    started = time.perf_counter()
+    for address in addresses:
+        lookup(address)
+    return len(addresses) / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", help="compiled database to use instead of a synthetic one")
+    parser.add_argument("--ranges", type=int, default=200000, help="synthetic ranges per address family")
+    parser.add_argument("--lookups", type=int, default=100000, help="lookups per measurement")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="bench_geoip_")
+    database_path = args.database or synthesize_database(args.ranges, directory)
+    database = GeoIPDatabase(database_path)
+    resolver = GeoIPResolver(database_path)
+    print(f"{database_path}: {len(database)} ranges, {os.path.getsize(database_path) / 1e6:.1f} MB")
+
+    rng = random.Random(1)
+    samples = {
+        "IPv4": [ipaddress.IPv4Address(rng.getrandbits(32)) for _ in range(args.lookups)],
+        "IPv6": [ipaddress.IPv6Address((0x2 << 124) | rng.getrandbits(124)) for _ in range(args.lookups)],
+    }
+    print(f"{'family':>8}{'search/s':>14}{'resolver/s':>14}{'from str/s':>14}{'us/lookup':>11}")
+
+    def from_string(ip_address: str):
+        address = parse_ip(ip_address)
+        return "Local" if address is None or is_reserved_address(address) else resolver.lookup(address)
+
+    for family, addresses in samples.items():
+        search = measure(database.lookup, addresses)
+        resolved = measure(resolver.lookup, addresses)
+        parsed = measure(from_string, [str(address) for address in addresses])
+        print(f"{family:>8}{search:>14,.0f}{resolved:>14,.0f}{parsed:>14,.0f}{1e6 / parsed:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Benchmark concurrent answer submission against a running backend.
+
+Creates a published survey, starts submissions and then fires
+``POST /api/submissions/{id}/answers`` with the requested concurrency,
+reporting throughput and latency percentiles. Run it against a build with
+the sync session and one with the async session (same worker count and
+database) to compare.
+
+Requires httpx (``pip install httpx``).
+
+Usage (from backend/):
+    uvicorn app.main:app --workers 1 &
+    python -m benchmarks.bench_submit_answer --base-url http://localhost:8000 \\
+        --requests 2000 --concurrency 1 10 50 100
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def setup_survey(client: httpx.AsyncClient) -> list:
+    survey = (await client.post("/api/surveys", json={"title": "bench"})).json()
+    question_ids = []
+    for order in range(1, 6):
+        question = (await client.post(
+            f"/api/surveys/{survey['id']}/questions",
+            json={"question_text": f"Question {order}", "order": order}
+        )).json()
+        question_ids.append(question["id"])
+    await client.post(f"/api/surveys/{survey['id']}/publish", json={"is_active": True})
+    return survey["id"], question_ids
+
+
+async def run_level(client: httpx.AsyncClient, survey_id: int, question_ids: list,
+                    total: int, concurrency: int) -> dict:
+    # One submission per 5 answers so every request is a real insert/update
+    submissions = []
+    for _ in range(max(1, total // len(question_ids))):
+        r = await client.post(f"/api/surveys/{survey_id}/start")
+        submissions.append(r.json()["submission_id"])
+
+    jobs = [(submissions[i // len(question_ids) % len(submissions)], question_ids[i % len(question_ids)])
+            for i in range(total)]
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(submission_id: int, question_id: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            r = await client.post(
+                f"/api/submissions/{submission_id}/answers",
+                json={"question_id": question_id, "answer": "Yes", "face_detected": True, "face_score": 90}
+            )
+            latencies.append(time.perf_counter() - start)
+            if r.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(s, q) for s, q in jobs))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "req_per_s": total / elapsed,
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "mean_ms": statistics.mean(latencies) * 1000,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 100])
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=max(args.concurrency))
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        survey_id, question_ids = await setup_survey(client)
+        print(f"{'conc':>6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for concurrency in args.concurrency:
+            r = await run_level(client, survey_id, question_ids, args.requests, concurrency)
+            print(f"{r['concurrency']:>6}{r['req_per_s']:>10.1f}{r['p50_ms']:>10.1f}"
+                  f"{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['errors']:>8}")
+        await client.delete(f"/api/surveys/{survey_id}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
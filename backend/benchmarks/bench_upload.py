@@ -0,0 +1,127 @@
+"""Benchmark media upload memory and time.
+
+Measures both upload paths of the API for 10/50/100 MB files: a form upload
+(``stream_upload_to_disk``) and a resumable upload sent in ``--chunk-mb``
+chunks (``write_upload_chunk``). Both should stay at constant memory
+whatever the file size. Each case runs in a fresh subprocess so peak RSS is
+measured in isolation.
+
+Usage (from backend/):
+    python -m benchmarks.bench_upload
+    python -m benchmarks.bench_upload --sizes 10 50 100 --modes form chunked --chunk-mb 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+CHUNK = 1024 * 1024
+
+
+class SyntheticUpload:
+    """Minimal stand-in for ``UploadFile`` that yields ``size`` bytes lazily."""
+
+    def __init__(self, size: int):
+        self.remaining = size
+        self.block = os.urandom(CHUNK)
+
+    async def read(self, n: int = -1) -> bytes:
+        if self.remaining <= 0:
+            return b""
+        n = CHUNK if n < 0 else min(n, CHUNK)
+        n = min(n, self.remaining)
+        self.remaining -= n
+        return self.block[:n]
+
+
+async def run_form(size: int, chunk_size: int) -> None:
+    from app.utils import media
+    media.MAX_VIDEO_SIZE = size + 1
+    stored = await media.stream_upload_to_disk(SyntheticUpload(size), "video")
+    os.remove(stored.path)
+
+
+async def run_chunked(size: int, chunk_size: int) -> None:
+    from app.utils import media
+    media.MAX_VIDEO_SIZE = size + 1
+    part_path = media.get_upload_session_path(uuid.uuid4().hex)
+    offset = 0
+    while offset < size:
+        # One request body per chunk, read from the socket in CHUNK pieces
+        upload = SyntheticUpload(min(chunk_size, size - offset))
+
+        async def body():
+            while True:
+                data = await upload.read(CHUNK)
+                if not data:
+                    return
+                yield data
+
+        offset = await media.write_upload_chunk(part_path, offset, body(), "video")
+    os.remove(part_path)
+
+
+MODES = {"form": run_form, "chunked": run_chunked}
+
+
+def run_case(mode: str, size_mb: int, chunk_mb: int) -> dict:
+    from app.utils.media import ensure_media_directories  # keep import cost out of the measurement
+    ensure_media_directories()
+    size = size_mb * 1024 * 1024
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    start = time.perf_counter()
+    asyncio.run(MODES[mode](size, chunk_mb * 1024 * 1024))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "mode": mode,
+        "size_mb": size_mb,
+        "seconds": round(elapsed, 3),
+        "mb_per_s": round(size_mb / elapsed, 1),
+        "py_peak_mb": round(peak / 1024 / 1024, 2),
+        "rss_growth_mb": round((rss_after - rss_before) / 1024, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--chunk-mb", type=int, default=5, help="request size of resumable uploads")
+    parser.add_argument("--case", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args.case[0], int(args.case[1]), args.chunk_mb)))
+        return
+
+    env = dict(os.environ)
+    env.setdefault("MEDIA_ROOT", tempfile.mkdtemp(prefix="bench_media_"))
+    results = []
+    for size_mb in args.sizes:
+        for mode in args.modes:
+            out = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_upload", "--case", mode, str(size_mb),
+                 "--chunk-mb", str(args.chunk_mb)],
+                capture_output=True, text=True, check=True, env=env
+            )
+            results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(f"{'mode':<9}{'size':>8}{'time (s)':>10}{'MB/s':>9}{'py peak MB':>12}{'RSS +MB':>10}")
+    for r in results:
+        print(f"{r['mode']:<9}{r['size_mb']:>6}MB{r['seconds']:>10}{r['mb_per_s']:>9}"
+              f"{r['py_peak_mb']:>12}{r['rss_growth_mb']:>10}")
+
+
+if __name__ == "__main__":
+    main()
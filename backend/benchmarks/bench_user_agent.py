@@ -0,0 +1,128 @@
+"""Check user-agent classification against a labelled corpus, and time it.
+
+Classifies ``CORPUS`` with ``extract_user_agent_info`` and lists every
+User-Agent whose device, browser or OS differs from its label; exits
+non-zero if any does (``tests/test_user_agent.py`` checks the same corpus
+under pytest). Then times classification with the rule tables alone (cache
+bypassed) and with the per-User-Agent cache, cycling through ``--distinct``
+User-Agents as real traffic does.
+
+Usage (from backend/):
+    python -m benchmarks.bench_user_agent
+    python -m benchmarks.bench_user_agent --calls 500000 --distinct 2000
+"""
+import argparse
+import sys
+import time
+
+from app.utils.metadata import _classify_user_agent, extract_user_agent_info
+
+
+# (User-Agent, device, browser, OS)
+CORPUS = [
+    # Desktop
+    ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+     "Chrome/120.0.0.0 Safari/537.36", "Desktop", "Chrome", "Windows"),
+    ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+     "Chrome/120.0.0.0 Safari/537.36 Edg/120.0.2210.91", "Desktop", "Edge", "Windows"),
+    ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+     "Chrome/70.0.3538.102 Safari/537.36 Edge/18.19045", "Desktop", "Edge", "Windows"),
+    ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+     "Chrome/120.0.0.0 Safari/537.36 OPR/106.0.0.0", "Desktop", "Opera", "Windows"),
+    ("Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0",
+     "Desktop", "Firefox", "Windows"),
+    ("Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) "
+     "Version/17.2 Safari/605.1.15", "Desktop", "Safari", "macOS"),
+    ("Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) "
+     "Chrome/120.0.0.0 Safari/537.36", "Desktop", "Chrome", "macOS"),
+    ("Mozilla/5.0 (Macintosh; Intel Mac OS X 14.2; rv:121.0) Gecko/20100101 Firefox/121.0",
+     "Desktop", "Firefox", "macOS"),
+    ("Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
+     "Chrome/120.0.0.0 Safari/537.36", "Desktop", "Chrome", "Linux"),
+    ("Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:121.0) Gecko/20100101 Firefox/121.0",
+     "Desktop", "Firefox", "Linux"),
+    ("Mozilla/5.0 (X11; CrOS x86_64 14541.0.0) AppleWebKit/537.36 (KHTML, like Gecko) "
+     "Chrome/120.0.0.0 Safari/537.36", "Desktop", "Chrome", "ChromeOS"),
+    ("Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
+     "Chromium/119.0.6045.199 Chrome/119.0.6045.199 Safari/537.36", "Desktop", "Chrome", "Linux"),
+    # Phones
+    ("Mozilla/5.0 (iPhone; CPU iPhone OS 17_2 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) "
+     "Version/17.2 Mobile/15E148 Safari/604.1", "Mobile", "Safari", "iOS"),
+    ("Mozilla/5.0 (iPhone; CPU iPhone OS 17_2 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) "
+     "CriOS/120.0.6099.119 Mobile/15E148 Safari/604.1", "Mobile", "Chrome", "iOS"),
+    ("Mozilla/5.0 (iPhone; CPU iPhone OS 17_2 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) "
+     "FxiOS/121.0 Mobile/15E148 Safari/605.1.15", "Mobile", "Firefox", "iOS"),
+    ("Mozilla/5.0 (iPhone; CPU iPhone OS 17_2 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) "
+     "EdgiOS/120.0.2210.150 Mobile/15E148 Safari/605.1.15", "Mobile", "Edge", "iOS"),
+    ("Mozilla/5.0 (iPod touch; CPU iPhone OS 15_7 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) "
+     "Version/15.6 Mobile/15E148 Safari/604.1", "Mobile", "Safari", "iOS"),
+    ("Mozilla/5.0 (Linux; Android 10; K) AppleWebKit/537.36 (KHTML, like Gecko) "
+     "Chrome/120.0.0.0 Mobile Safari/537.36", "Mobile", "Chrome", "Android"),
+    ("Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) "
+     "Chrome/120.0.6099.144 Mobile Safari/537.36", "Mobile", "Chrome", "Android"),
+    ("Mozilla/5.0 (Android 14; Mobile; rv:121.0) Gecko/121.0 Firefox/121.0", "Mobile", "Firefox", "Android"),
+    ("Mozilla/5.0 (Linux; Android 13; SM-S918B) AppleWebKit/537.36 (KHTML, like Gecko) "
+     "Chrome/120.0.0.0 Mobile Safari/537.36 EdgA/120.0.2210.115", "Mobile", "Edge", "Android"),
+    ("Mozilla/5.0 (Linux; Android 13; SM-A536B) AppleWebKit/537.36 (KHTML, like Gecko) "
+     "Chrome/120.0.0.0 Mobile Safari/537.36 OPR/79.0.4195.76783", "Mobile", "Opera", "Android"),
+    ("Mozilla/5.0 (Linux; Android 13; SM-S911B) AppleWebKit/537.36 (KHTML, like Gecko) "
+     "SamsungBrowser/23.0 Chrome/115.0.0.0 Mobile Safari/537.36", "Mobile", "Chrome", "Android"),
+    # Tablets
+    ("Mozilla/5.0 (iPad; CPU OS 17_2 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) "
+     "Version/17.2 Mobile/15E148 Safari/604.1", "Tablet", "Safari", "iOS"),
+    ("Mozilla/5.0 (iPad; CPU OS 17_2 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) "
+     "CriOS/120.0.6099.119 Mobile/15E148 Safari/604.1", "Tablet", "Chrome", "iOS"),
+    ("Mozilla/5.0 (Linux; Android 13; SM-X700) AppleWebKit/537.36 (KHTML, like Gecko) "
+     "Chrome/120.0.0.0 Safari/537.36", "Tablet", "Chrome", "Android"),
+    ("Mozilla/5.0 (Android 13; Tablet; rv:121.0) Gecko/121.0 Firefox/121.0", "Tablet", "Firefox", "Android"),
+    ("Mozilla/5.0 (Linux; Android 9; KFTRWI) AppleWebKit/537.36 (KHTML, like Gecko) "
+     "Silk/120.3.1 like Chrome/120.0.6099.230 Safari/537.36", "Tablet", "Chrome", "Android"),
+    # Unrecognized
+    ("curl/8.4.0", "Desktop", "Unknown", "Unknown"),
+    ("Unknown", "Desktop", "Unknown", "Unknown"),
+]
+
+
+def check_corpus() -> int:
+    """Print misclassified User-Agents; returns how many there were."""
+    failures = 0
+    for user_agent, *expected in CORPUS:
+        info = extract_user_agent_info(user_agent)
+        actual = [info["device"], info["browser"], info["os"]]
+        if actual != expected:
+            failures += 1
+            print(f"MISMATCH {user_agent}\n  expected {expected}, got {actual}")
+    print(f"{len(CORPUS) - failures}/{len(CORPUS)} User-Agents classified correctly")
+    return failures
+
+
+def measure(classify, user_agents: list, calls: int) -> float:
+    """Mean microseconds per call, cycling through ``user_agents``."""
+    count = len(user_agents)
+    started = time.perf_counter()
+    for i in range(calls):
+        classify(user_agents[i % count])
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--distinct", type=int, default=1000, help="distinct User-Agents in the traffic")
+    args = parser.parse_args()
+
+    failures = check_corpus()
+
+    # Variants of the corpus, as different browser builds would send
+    user_agents = [f"{CORPUS[i % len(CORPUS)][0]} build/{i}" for i in range(args.distinct)]
+    uncached = measure(_classify_user_agent.__wrapped__, user_agents, args.calls)
+    _classify_user_agent.cache_clear()
+    cached = measure(extract_user_agent_info, user_agents, args.calls)
+    info = _classify_user_agent.cache_info()
+    print(f"{'rules only':>12}{uncached:>9.2f} us/call")
+    print(f"{'cached':>12}{cached:>9.2f} us/call ({info.hits / (info.hits + info.misses):.1%} hits)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
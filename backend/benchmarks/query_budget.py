@@ -0,0 +1,149 @@
+"""Check the number of SQL statements each endpoint issues.
+
+Seeds a throwaway SQLite database twice, with a small and a larger data set,
+calls each endpoint and counts the statements it sends. The check fails if
+an endpoint goes over its budget or if its count grows with the data set,
+which is what an N+1 query pattern looks like. Exits non-zero on failure;
+``tests/test_query_budget.py`` runs the same check under pytest.
+
+Usage (from backend/):
+    python -m benchmarks.query_budget
+    python -m benchmarks.query_budget --verbose   # print the statements
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+# Point the app at a scratch database before it is imported
+_workdir = tempfile.mkdtemp(prefix="query_budget_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_workdir}/budget.db"
+os.environ.setdefault("MEDIA_ROOT", os.path.join(_workdir, "media"))
+# Measure the database path of cached endpoints
+os.environ["SURVEY_CACHE_TTL"] = "0"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.database import Base, SessionLocal, async_engine, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.submission import MediaFile, SurveyAnswer, SurveySubmission  # noqa: E402
+from app.models.survey import Survey, SurveyQuestion  # noqa: E402
+from app.utils.querycount import count_queries  # noqa: E402
+
+
+# Maximum statements per request. Keys are (method, path template).
+QUERY_BUDGETS = {
+    ("GET", "/api/surveys"): 2,
+    ("GET", "/api/surveys/{survey_id}"): 2,
+    ("GET", "/api/surveys/{survey_id}/submissions"): 2,
+    ("GET", "/api/submissions/{submission_id}"): 2,
+    ("GET", "/api/submissions/{submission_id}/export"): 3,
+    ("GET", "/api/surveys/{survey_id}/analytics"): 4,
+    ("GET", "/api/surveys/{survey_id}/timeseries"): 3,
+    ("DELETE", "/api/submissions/{submission_id}"): 5,
+    ("DELETE", "/api/surveys/{survey_id}"): 6,
+}
+
+
+def seed(surveys: int, submissions_per_survey: int) -> dict:
+    """Create surveys with five questions and fully answered submissions."""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        survey_ids, submission_ids = [], []
+        for s in range(surveys):
+            survey = Survey(title=f"Survey {s}", is_active=True)
+            survey.questions = [
+                SurveyQuestion(question_text=f"Question {order}", order=order)
+                for order in range(1, 6)
+            ]
+            db.add(survey)
+            db.flush()
+            survey_ids.append(survey.id)
+            for n in range(submissions_per_survey):
+                submission = SurveySubmission(
+                    survey=survey, ip_address="127.0.0.1", device="Desktop", browser="Chrome"
+                )
+                submission.answers = [
+                    SurveyAnswer(question=question, answer="Yes", face_detected=True, face_score=90.0)
+                    for question in survey.questions
+                ]
+                submission.media_files = []
+                for q in range(1, 6):
+                    # Empty placeholder files: exports skip them without reading
+                    path = os.path.join(_workdir, f"submission_{s}_{n}_q{q}_face.png")
+                    open(path, "wb").close()
+                    submission.media_files.append(MediaFile(type="image", path=path, question_number=q))
+                db.add(submission)
+                db.flush()
+                submission_ids.append(submission.id)
+        db.commit()
+        return {"survey_id": survey_ids[0], "submission_id": submission_ids[0]}
+    finally:
+        db.close()
+
+
+def measure(client: TestClient, ids: dict) -> dict:
+    counts = {}
+    for method, template in QUERY_BUDGETS:
+        if method == "DELETE":
+            continue
+        counts[(method, template)] = run(client, method, template.format(**ids))
+    # Deletes go last since they remove the seeded rows
+    for method, template in [
+        ("DELETE", "/api/submissions/{submission_id}"),
+        ("DELETE", "/api/surveys/{survey_id}"),
+    ]:
+        counts[(method, template)] = run(client, method, template.format(**ids))
+    return counts
+
+
+def run(client: TestClient, method: str, path: str):
+    with count_queries(engine, async_engine) as log:
+        response = client.request(method, path)
+        response.read()
+    if response.status_code >= 400:
+        raise RuntimeError(f"{method} {path} returned {response.status_code}: {response.text}")
+    return log
+
+
+def check(small: dict, large: dict) -> dict:
+    """Status per endpoint: "ok", "OVER BUDGET" or "GROWS WITH DATA"."""
+    statuses = {}
+    for key, budget in QUERY_BUDGETS.items():
+        if large[key].count > budget:
+            statuses[key] = "OVER BUDGET"
+        elif large[key].count != small[key].count:
+            statuses[key] = "GROWS WITH DATA"
+        else:
+            statuses[key] = "ok"
+    return statuses
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--small", type=int, nargs=2, default=[2, 3], metavar=("SURVEYS", "SUBMISSIONS"))
+    parser.add_argument("--large", type=int, nargs=2, default=[10, 30], metavar=("SURVEYS", "SUBMISSIONS"))
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    client = TestClient(app)
+    small = measure(client, seed(*args.small))
+    large = measure(client, seed(*args.large))
+
+    statuses = check(small, large)
+    print(f"{'endpoint':<48}{'small':>7}{'large':>7}{'budget':>8}")
+    for key, budget in QUERY_BUDGETS.items():
+        method, template = key
+        status = statuses[key]
+        print(f"{method + ' ' + template:<48}{small[key].count:>7}{large[key].count:>7}{budget:>8}  {status}")
+        if args.verbose or status != "ok":
+            for statement in large[key].statements:
+                print("    " + " ".join(statement.split())[:160])
+
+    sys.exit(1 if any(status != "ok" for status in statuses.values()) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import os
+import tempfile
+
+import pytest
+
+# Tests never touch a configured database: point the app at a scratch SQLite
+# database and media root before anything imports it
+_workdir = tempfile.mkdtemp(prefix="backend_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_workdir}/test.db"
+os.environ["MEDIA_ROOT"] = os.path.join(_workdir, "media")
+os.environ["SURVEY_CACHE_TTL"] = "0"
+
+
+@pytest.fixture(autouse=True)
+def tables():
+    """Tables exist for every test (the app creates them on import; a seed may drop them)."""
+    from app.database import Base, engine
+    import app.models  # noqa: F401
+
+    Base.metadata.create_all(bind=engine)
+
+
+@pytest.fixture
+def create_submission():
+    """Make a published survey with questions (orders 1..n) and a submission of it.
+
+    Returns ``(survey_id, question_ids, submission_id)``; extra keyword
+    arguments are set on the submission.
+    """
+    from app.database import SessionLocal
+    from app.models import Survey, SurveyQuestion, SurveySubmission
+
+    def create(questions=5, **fields):
+        db = SessionLocal()
+        try:
+            survey = Survey(title="Test survey", is_active=True)
+            survey.questions = [
+                SurveyQuestion(question_text=f"Question {order}", order=order) for order in range(1, questions + 1)
+            ]
+            submission = SurveySubmission(survey=survey, ip_address="127.0.0.1", **fields)
+            db.add(submission)
+            db.commit()
+            return survey.id, [question.id for question in survey.questions], submission.id
+        finally:
+            db.close()
+
+    return create
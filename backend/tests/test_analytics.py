@@ -0,0 +1,138 @@
+"""Survey answer analytics: rollups kept up to date by every write agree with a rebuild from the rows."""
+import asyncio
+import itertools
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, func, select
+
+from app.database import AsyncSessionLocal, SessionLocal
+from app.jobs.queue import claim_jobs
+from app.jobs.worker import run_job
+from app.main import app
+from app.models.analytics import SurveyStats
+from app.models.job import Job
+from app.models.submission import SurveySubmission
+from app.utils import analytics
+from app.utils.analytics import histogram_percentile, load_survey_totals, rebuild_survey_analytics
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def survey(create_submission):
+    """A published survey with five questions and no submissions."""
+    survey_id, question_ids, submission_id = create_submission()
+    db = SessionLocal()
+    try:
+        db.execute(delete(SurveySubmission).where(SurveySubmission.id == submission_id))
+        db.commit()
+    finally:
+        db.close()
+    return survey_id, question_ids
+
+
+def answer(question_id, value, face_score=None):
+    return {"question_id": question_id, "answer": value, "face_detected": face_score is not None,
+            "face_score": face_score}
+
+
+def respond(client, survey_id, *answers, overall_score=None, complete=True):
+    submission_id = client.post(f"/api/surveys/{survey_id}/start").json()["submission_id"]
+    response = client.post(f"/api/submissions/{submission_id}/answers:batch", json={"answers": list(answers)})
+    assert response.status_code == 201
+    if complete:
+        response = client.post(f"/api/submissions/{submission_id}/complete", json={"overall_score": overall_score})
+        assert response.status_code == 200
+    return submission_id
+
+
+def run_due_jobs():
+    async def drain():
+        while True:
+            async with AsyncSessionLocal() as db:
+                jobs = await claim_jobs(db, 10)
+            if not jobs:
+                return
+            for job in jobs:
+                await run_job(job)
+
+    asyncio.run(drain())
+
+
+def test_histogram_percentile():
+    histogram = {60: 1, 80: 3}
+    assert [histogram_percentile(histogram, p) for p in (1, 25, 26, 50, 100)] == [60, 60, 80, 80, 80]
+    assert histogram_percentile({}, 50) is None
+
+
+def test_analytics_follow_answers_and_match_a_rebuild(client, survey, monkeypatch):
+    # Spread the totals over every shard deterministically
+    shards = itertools.count()
+    monkeypatch.setattr(analytics, "SURVEY_STATS_SHARDS", 4)
+    monkeypatch.setattr(analytics.random, "randrange", lambda n: next(shards) % n)
+    survey_id, (q1, q2, q3, q4, q5) = survey
+    rest = [answer(q, "No") for q in (q3, q4, q5)]
+
+    respond(client, survey_id, answer(q1, "Yes", 80.4), answer(q2, "No"), *rest, overall_score=90)
+    deleted = respond(client, survey_id, answer(q1, "No", 60), answer(q2, "Yes"), *rest, overall_score=70)
+    unfinished = respond(client, survey_id, answer(q1, "Yes", 70), complete=False)
+    # Replacing an answer swaps its contribution
+    client.post(f"/api/submissions/{unfinished}/answers:batch", json={"answers": [answer(q1, "No")]})
+
+    response = client.get(f"/api/surveys/{survey_id}/analytics")
+    assert response.status_code == 200
+    stats = response.json()
+    assert (stats["started"], stats["completed"], stats["overall_score_mean"]) == (3, 2, 80)
+    assert stats["completion_rate"] == pytest.approx(2 / 3)
+    first, second = stats["questions"][:2]
+    assert first == {
+        "question_id": q1, "question_order": 1, "question_text": "Question 1",
+        "answers": 3, "yes_answers": 1, "no_answers": 2, "face_detected": 2,
+        "face_detected_ratio": pytest.approx(2 / 3), "face_scores": 2, "face_score_mean": pytest.approx(70.2),
+        "face_score_percentiles": {"p25": 60.0, "p50": 60.0, "p75": 80.0, "p90": 80.0},
+    }
+    assert (second["answers"], second["yes_answers"], second["face_scores"], second["face_score_mean"]) == (2, 1, 0, None)
+
+    async def totals_and_shards():
+        async with AsyncSessionLocal() as db:
+            shard_rows = await db.scalar(
+                select(func.count()).select_from(SurveyStats).where(SurveyStats.survey_id == survey_id)
+            )
+            return await load_survey_totals(db, survey_id), shard_rows
+
+    totals, shard_rows = asyncio.run(totals_and_shards())
+    assert shard_rows == 4
+    assert totals == {"started": 3, "completed": 2, "scored": 2, "overall_score_sum": 160}
+
+    async def rebuild():
+        async with AsyncSessionLocal() as db:
+            await rebuild_survey_analytics(db, survey_id)
+            await db.commit()
+
+    asyncio.run(rebuild())
+    rebuilt = client.get(f"/api/surveys/{survey_id}/analytics").json()
+    assert rebuilt == stats
+
+    # Deleting a submission takes its answers back out
+    async def clear_jobs():
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(Job))
+            await db.commit()
+
+    asyncio.run(clear_jobs())
+    assert client.delete(f"/api/submissions/{deleted}").status_code == 202
+    run_due_jobs()
+    stats = client.get(f"/api/surveys/{survey_id}/analytics").json()
+    assert (stats["started"], stats["completed"], stats["overall_score_mean"]) == (2, 1, 90)
+    first, second = stats["questions"][:2]
+    assert (first["answers"], first["yes_answers"], first["face_scores"], first["face_score_mean"]) == (2, 1, 1, 80.4)
+    assert (second["answers"], second["yes_answers"]) == (1, 0)
+
+
+def test_unknown_survey(client):
+    assert client.get("/api/surveys/999999/analytics").status_code == 404
@@ -0,0 +1,69 @@
+"""Batch answer submission: one upsert statement, all answers written or none."""
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+def submit(client, submission_id, *answers):
+    return client.post(f"/api/submissions/{submission_id}/answers:batch", json={"answers": [
+        {"question_id": question_id, "answer": answer, "face_detected": answer == "Yes", "face_score": 80.0}
+        for question_id, answer in answers
+    ]})
+
+
+def stored_answers(client, submission_id):
+    answers = client.get(f"/api/submissions/{submission_id}").json()["answers"]
+    return {answer["question_id"]: answer["answer"] for answer in answers}
+
+
+def test_batch_inserts_then_replaces(client, create_submission):
+    _, questions, submission_id = create_submission()
+
+    first = submit(client, submission_id, (questions[0], "Yes"), (questions[1], "No"))
+    assert first.status_code == 201
+    assert [a["question_id"] for a in first.json()["answers"]] == questions[:2]
+
+    second = submit(client, submission_id, (questions[1], "Yes"), (questions[2], "No"))
+    assert second.status_code == 201
+    # Replaced in place: same row, new answer
+    assert second.json()["answers"][0]["id"] == first.json()["answers"][1]["id"]
+    assert stored_answers(client, submission_id) == {questions[0]: "Yes", questions[1]: "Yes", questions[2]: "No"}
+
+
+def test_question_of_another_survey_writes_nothing(client, create_submission):
+    _, questions, submission_id = create_submission()
+    _, other_questions, _ = create_submission()
+    submit(client, submission_id, (questions[0], "No"))
+
+    response = submit(client, submission_id, (questions[0], "Yes"), (other_questions[1], "Yes"))
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Question not found"
+    assert stored_answers(client, submission_id) == {questions[0]: "No"}
+
+
+def test_duplicate_questions_are_rejected(client, create_submission):
+    _, questions, submission_id = create_submission()
+    response = submit(client, submission_id, (questions[0], "Yes"), (questions[0], "No"))
+    assert response.status_code == 400
+    assert stored_answers(client, submission_id) == {}
+
+
+def test_completed_submission_is_closed(client, create_submission):
+    _, questions, submission_id = create_submission(completed_at=datetime.utcnow())
+    response = submit(client, submission_id, (questions[0], "Yes"))
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Submission already completed"
+
+
+def test_unknown_submission(client):
+    assert submit(client, 10 ** 9, (1, "Yes")).status_code == 404
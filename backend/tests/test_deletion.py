@@ -0,0 +1,139 @@
+"""Background deletion: targets disappear at once, rows and files go in batches of jobs."""
+import asyncio
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, func, select
+
+from app.database import AsyncSessionLocal, SessionLocal
+from app.jobs import deletion
+from app.jobs.queue import claim_jobs
+from app.jobs.worker import run_job
+from app.main import app
+from app.models.job import Job
+from app.models.submission import MediaFile, SurveyAnswer, SurveySubmission
+from app.models.survey import Survey, SurveyQuestion
+from app.storage import get_storage
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def empty_queue():
+    # Only this test's jobs are run
+    async def clear():
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(Job))
+            await db.commit()
+
+    asyncio.run(clear())
+
+
+def run_due_jobs():
+    async def drain():
+        while True:
+            async with AsyncSessionLocal() as db:
+                jobs = await claim_jobs(db, 10)
+            if not jobs:
+                return
+            for job in jobs:
+                await run_job(job)
+
+    asyncio.run(drain())
+
+
+def stored_file(name):
+    path = get_storage().staging_key("image", name)
+    with open(path, "wb") as f:
+        f.write(name.encode())
+    return path
+
+
+def add_submission(client, survey_id, question_ids, *paths):
+    db = SessionLocal()
+    try:
+        submission = SurveySubmission(survey_id=survey_id, ip_address="127.0.0.1")
+        submission.media_files = [MediaFile(type="image", path=path, question_number=1) for path in paths]
+        db.add(submission)
+        db.commit()
+        submission_id = submission.id
+    finally:
+        db.close()
+    response = client.post(f"/api/submissions/{submission_id}/answers:batch", json={"answers": [
+        {"question_id": question_ids[0], "answer": "Yes", "face_detected": True}
+    ]})
+    assert response.status_code == 201
+    return submission_id
+
+
+def count(model, *where):
+    db = SessionLocal()
+    try:
+        return db.scalar(select(func.count()).select_from(model).where(*where))
+    finally:
+        db.close()
+
+
+def test_survey_deletion(client, create_submission, monkeypatch):
+    monkeypatch.setattr(deletion, "DELETION_BATCH_SIZE", 2)
+    survey_id, question_ids, first_id = create_submission()
+    other_survey_id, other_question_ids, _ = create_submission()
+    shared = stored_file("deletion_shared.png")
+    own = [stored_file(f"deletion_own_{n}.png") for n in range(3)]
+    submission_ids = [first_id] + [
+        add_submission(client, survey_id, question_ids, path, shared) for path in own
+    ]
+    keeper = add_submission(client, other_survey_id, other_question_ids, shared)
+
+    response = client.delete(f"/api/surveys/{survey_id}")
+    assert response.status_code == 202
+    progress = response.json()
+    assert (progress["status"], progress["submissions_total"]) == ("deleting_rows", 4)
+
+    # Hidden before any row is removed
+    assert client.get(f"/api/surveys/{survey_id}").status_code == 404
+    assert client.get(f"/api/submissions/{submission_ids[1]}").status_code == 404
+    assert client.delete(f"/api/surveys/{survey_id}").status_code == 404
+    assert count(SurveySubmission, SurveySubmission.survey_id == survey_id) == 4
+
+    run_due_jobs()
+
+    progress = client.get(f"/api/deletions/{progress['id']}").json()
+    assert progress["status"] == "completed"
+    assert progress["submissions_deleted"] == 4
+    # The shared file is queued once per batch that references it
+    assert progress["files_deleted"] == progress["files_total"] >= 4
+    assert count(Survey, Survey.id == survey_id) == 0
+    assert count(SurveyQuestion, SurveyQuestion.survey_id == survey_id) == 0
+    assert count(SurveySubmission, SurveySubmission.id.in_(submission_ids)) == 0
+    assert count(SurveyAnswer, SurveyAnswer.submission_id.in_(submission_ids)) == 0
+    assert count(MediaFile, MediaFile.submission_id.in_(submission_ids)) == 0
+    assert not any(os.path.exists(path) for path in own)
+    # Still referenced by the other survey's submission
+    assert os.path.exists(shared)
+    assert client.get(f"/api/submissions/{keeper}").status_code == 200
+
+
+def test_submission_deletion(client, create_submission):
+    survey_id, question_ids, _ = create_submission()
+    path = stored_file("deletion_single.png")
+    doomed = add_submission(client, survey_id, question_ids, path)
+    kept = add_submission(client, survey_id, question_ids)
+
+    response = client.delete(f"/api/submissions/{doomed}")
+    assert response.status_code == 202
+    listed = client.get(f"/api/surveys/{survey_id}/submissions").json()["submissions"]
+    assert doomed not in [submission["id"] for submission in listed]
+
+    run_due_jobs()
+
+    assert client.get(f"/api/deletions/{response.json()['id']}").json()["status"] == "completed"
+    assert count(SurveySubmission, SurveySubmission.id == doomed) == 0
+    assert not os.path.exists(path)
+    assert client.get(f"/api/submissions/{kept}").status_code == 200
+    assert client.get(f"/api/surveys/{survey_id}").status_code == 200
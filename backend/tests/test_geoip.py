@@ -0,0 +1,124 @@
+"""Offline GeoIP: range files compile into a database that answers lookups at every boundary."""
+import ipaddress
+import os
+
+import pytest
+
+from app.utils import metadata
+from app.utils.geoip import GeoIPDatabase, GeoIPResolver, build_geoip_database, parse_ip, read_ranges
+
+RANGES = """\
+ip_start,ip_end,country_code,country_name
+1.0.0.0,1.0.0.255,AU,Australia
+1.0.1.0,1.0.3.255,CN,China
+1.0.4.0,1.0.7.255,AU,Australia
+1.0.8.0,1.0.8.255,AU,Australia
+16843008,16843263,CN,China
+1.1.2.0,1.1.2.255,ZZ,
+2.0.0.0,2.0.0.255,FR,-
+255.255.255.0,255.255.255.255,XX,Last
+2001:200::,2001:200:0:ffff:ffff:ffff:ffff:ffff,JP,Japan
+2001:200:1::,2001:200:1:ffff:ffff:ffff:ffff:ffff,JP,Japan
+"""
+
+
+def write(path, text):
+    path.write_text(text)
+    return str(path)
+
+
+def ip(value):
+    return ipaddress.ip_address(value)
+
+
+@pytest.fixture
+def database(tmp_path):
+    output = str(tmp_path / "geoip.bin")
+    assert build_geoip_database(write(tmp_path / "ranges.csv", RANGES), output) == (6, 1)
+    return GeoIPDatabase(output)
+
+
+@pytest.mark.parametrize("address, country", [
+    ("0.255.255.255", None),
+    ("1.0.0.0", "Australia"),
+    ("1.0.0.255", "Australia"),
+    ("1.0.1.0", "China"),
+    ("1.0.3.255", "China"),
+    ("1.0.4.0", "Australia"),
+    ("1.0.7.255", "Australia"),
+    ("1.0.8.255", "Australia"),
+    ("1.0.9.0", None),
+    ("1.1.1.1", "China"),  # integer bounds
+    ("1.1.2.1", None),  # unassigned
+    ("2.0.0.7", "FR"),  # no name: the code
+    ("255.255.255.255", "Last"),
+    ("2001:200::", "Japan"),
+    ("2001:200:1:ffff:ffff:ffff:ffff:ffff", "Japan"),
+    ("2001:200:2::", None),
+    ("2001:1ff:ffff:ffff:ffff:ffff:ffff:ffff", None),
+    ("::", None),
+])
+def test_lookup(database, address, country):
+    assert database.lookup(ip(address)) == country
+
+
+def test_adjacent_ranges_of_a_country_are_merged(database):
+    assert len(database) == 7
+    assert database.countries == ["Australia", "China", "FR", "Japan", "Last"]
+
+
+def test_mapped_addresses_are_looked_up_as_ipv4(database):
+    assert parse_ip("::ffff:1.0.1.7") == ip("1.0.1.7")
+    assert database.lookup(parse_ip("::ffff:1.0.1.7")) == "China"
+    assert parse_ip("not an address") is None
+
+
+@pytest.mark.parametrize("rows, error", [
+    ("1.0.0.0,1.0.0.255,AU\n1.0.0.128,1.0.1.0,CN\n", "overlapping"),
+    ("1.0.0.0,1.0.0.255,AU\n1.0.0.9,1.0.0.1,CN\n", "invalid range"),
+    ("1.0.0.0,::1,AU\n", "invalid range"),
+    ("1.0.0.0,1.0.0.255,AU\nnope,1.0.0.1,CN\n", "line 2: invalid address"),
+    ("1.0.0.0,1.0.0.255\n", "expected start,end,country"),
+])
+def test_invalid_ranges(tmp_path, rows, error):
+    output = tmp_path / "geoip.bin"
+    with pytest.raises(ValueError, match=error):
+        build_geoip_database(write(tmp_path / "ranges.csv", rows), str(output))
+    # Nothing half-written is left behind
+    assert os.listdir(tmp_path) == ["ranges.csv"]
+
+
+def test_read_ranges_skips_comments_and_the_header():
+    assert read_ranges(["start,end,code", "# comment", "", "1.2.3.4,1.2.3.4,DE"]) == [
+        (ip("1.2.3.4"), ip("1.2.3.4"), "DE")
+    ]
+
+
+def test_not_a_database(tmp_path):
+    with pytest.raises(ValueError, match="not a compiled GeoIP database"):
+        GeoIPDatabase(write(tmp_path / "ranges.csv", RANGES * 4))
+
+
+def test_resolver_picks_up_a_rebuilt_file(tmp_path):
+    output = str(tmp_path / "geoip.bin")
+    resolver = GeoIPResolver(output, reload_interval=0)
+    assert resolver.lookup(ip("1.0.0.1")) is None  # no file yet
+
+    build_geoip_database(write(tmp_path / "a.csv", "1.0.0.0,1.0.0.255,AU,Australia\n"), output)
+    assert resolver.lookup(ip("1.0.0.1")) == "Australia"
+
+    build_geoip_database(write(tmp_path / "b.csv", "1.0.0.0,1.0.0.255,NZ,New Zealand\n"), output)
+    assert resolver.lookup(ip("1.0.0.1")) == "New Zealand"
+
+    # A broken replacement is reported and the loaded database kept
+    os.replace(write(tmp_path / "broken.bin", "garbage"), output)
+    assert resolver.lookup(ip("1.0.0.1")) == "New Zealand"
+
+
+def test_locations_come_from_the_database(database, monkeypatch):
+    monkeypatch.setattr(metadata, "_geoip", GeoIPResolver(database.path, reload_interval=3600))
+    assert metadata.get_cached_location("1.0.1.7") == "China"
+    assert metadata.get_location_from_ip("2001:200::1") == "Japan"
+    assert metadata.get_cached_location("9.9.9.9") == "Unknown"
+    assert metadata.get_cached_location("192.168.1.10") == "Local"
+    assert metadata.get_cached_location("garbage") == "Local"
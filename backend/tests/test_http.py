@@ -0,0 +1,184 @@
+"""Byte ranges, conditional GETs and If-Range in ``file_response``."""
+import os
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.utils import http
+from app.utils.http import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, file_response, parse_range_header
+
+CONTENT = bytes(range(256)) * 4  # 1024 bytes, every offset distinguishable
+SIZE = len(CONTENT)
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-0", [(0, 0)]),
+    ("bytes=0-", [(0, SIZE - 1)]),
+    ("bytes=1-1", [(1, 1)]),
+    (f"bytes={SIZE - 1}-{SIZE - 1}", [(SIZE - 1, SIZE - 1)]),
+    (f"bytes={SIZE - 1}-", [(SIZE - 1, SIZE - 1)]),
+    (f"bytes=10-{SIZE}", [(10, SIZE - 1)]),
+    ("bytes=-1", [(SIZE - 1, SIZE - 1)]),
+    (f"bytes=-{SIZE}", [(0, SIZE - 1)]),
+    (f"bytes=-{SIZE + 10}", [(0, SIZE - 1)]),
+    ("bytes=0-1,2-3", [(0, 3)]),  # adjacent ranges merge
+    ("bytes=5-9,0-6", [(0, 9)]),  # overlapping, out of order
+    ("bytes=0-1,3-4", [(0, 1), (3, 4)]),
+    (" Bytes = 0-1 , 3-4 ", [(0, 1), (3, 4)]),
+    (f"bytes={SIZE}-", []),
+    (f"bytes={SIZE}-{SIZE + 5}", []),
+    ("bytes=-0", []),
+    (f"bytes=0-1,{SIZE}-", [(0, 1)]),
+    ("bytes=3-2", None),
+    ("bytes=a-b", None),
+    ("bytes=-", None),
+    ("bytes=5", None),
+    ("items=0-1", None),
+    ("bytes=", None),
+    ("bytes=" + ",".join(f"{n}-{n}" for n in range(0, 2 * (http.MAX_RANGES + 1), 2)), None),
+])
+def test_parse_range_header(header, expected):
+    assert parse_range_header(header, SIZE) == expected
+
+
+def test_parse_range_header_empty_file():
+    assert parse_range_header("bytes=0-", 0) == []
+    assert parse_range_header("bytes=-5", 0) == []
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "file.bin"
+    path.write_bytes(CONTENT)
+    (tmp_path / "empty.bin").write_bytes(b"")
+    app = FastAPI()
+
+    @app.api_route("/{name}", methods=["GET", "HEAD"])
+    async def serve(name: str, request: Request, immutable: bool = False):
+        return await file_response(request, str(tmp_path / name), "video/mp4", immutable=immutable)
+
+    with TestClient(app) as client:
+        yield client
+
+
+def get(client, **headers):
+    return client.get("/file.bin", headers=headers)
+
+
+def test_full_response(client):
+    response = get(client)
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["content-length"] == str(SIZE)
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["cache-control"] == REVALIDATE_CACHE_CONTROL
+    assert client.get("/file.bin", params={"immutable": True}).headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+
+
+@pytest.mark.parametrize("header, start, end", [
+    ("bytes=0-0", 0, 0),
+    ("bytes=0-99", 0, 99),
+    ("bytes=100-199", 100, 199),
+    (f"bytes={SIZE - 1}-", SIZE - 1, SIZE - 1),
+    ("bytes=-10", SIZE - 10, SIZE - 1),
+    (f"bytes=1000-{SIZE * 2}", 1000, SIZE - 1),
+])
+def test_single_range(client, header, start, end):
+    response = get(client, Range=header)
+    assert response.status_code == 206
+    assert response.content == CONTENT[start:end + 1]
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{SIZE}"
+    assert response.headers["content-length"] == str(end - start + 1)
+
+
+def test_multiple_ranges(client):
+    response = get(client, Range="bytes=0-0,10-19,-5")
+    assert response.status_code == 206
+    content_type = response.headers["content-type"]
+    assert content_type.startswith("multipart/byteranges; boundary=")
+    boundary = content_type.split("boundary=")[1]
+    assert response.headers["content-length"] == str(len(response.content))
+
+    parts = response.content.split(f"--{boundary}".encode())
+    assert parts[0] == b"\r\n" and parts[-1] == b"--\r\n"
+    bodies = []
+    for part in parts[1:-1]:
+        head, body = part.split(b"\r\n\r\n", 1)
+        assert body.endswith(b"\r\n")
+        bodies.append((head.decode().split("Content-Range: ")[1], body[:-2]))
+    assert bodies == [
+        (f"bytes 0-0/{SIZE}", CONTENT[0:1]),
+        (f"bytes 10-19/{SIZE}", CONTENT[10:20]),
+        (f"bytes {SIZE - 5}-{SIZE - 1}/{SIZE}", CONTENT[-5:]),
+    ]
+
+
+def test_unsatisfiable_range(client):
+    response = get(client, Range=f"bytes={SIZE}-")
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{SIZE}"
+
+
+def test_malformed_range_is_ignored(client):
+    response = get(client, Range="bytes=9-3")
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+def test_not_modified(client):
+    validators = get(client).headers
+    etag, last_modified = validators["etag"], validators["last-modified"]
+
+    for headers in ({"If-None-Match": etag}, {"If-None-Match": f'"other", W/{etag}'}, {"If-None-Match": "*"},
+                    {"If-Modified-Since": last_modified}):
+        response = get(client, **headers)
+        assert response.status_code == 304, headers
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    assert get(client, **{"If-None-Match": '"other"'}).status_code == 200
+    # If-None-Match wins over If-Modified-Since
+    assert get(client, **{"If-None-Match": '"other"', "If-Modified-Since": last_modified}).status_code == 200
+    assert get(client, **{"If-Modified-Since": "Thu, 01 Jan 1970 00:00:00 GMT"}).status_code == 200
+    assert get(client, **{"If-Modified-Since": "not a date"}).status_code == 200
+
+
+def test_if_range(client):
+    validators = get(client).headers
+    etag, last_modified = validators["etag"], validators["last-modified"]
+
+    assert get(client, Range="bytes=0-9", **{"If-Range": etag}).status_code == 206
+    assert get(client, Range="bytes=0-9", **{"If-Range": last_modified}).status_code == 206
+    # A changed file (or a weak validator) gets the whole file instead
+    for stale in ('"stale"', f"W/{etag}", "Thu, 01 Jan 1970 00:00:00 GMT"):
+        response = get(client, Range="bytes=0-9", **{"If-Range": stale})
+        assert response.status_code == 200, stale
+        assert response.content == CONTENT
+
+
+def test_changed_file_gets_a_new_etag(client, tmp_path):
+    etag = get(client).headers["etag"]
+    path = tmp_path / "file.bin"
+    path.write_bytes(CONTENT[::-1])
+    os.utime(path, ns=(0, 10 ** 9))
+    response = get(client, **{"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.content == CONTENT[::-1]
+
+
+def test_head(client):
+    response = client.head("/file.bin", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == b""
+    assert response.headers["content-length"] == "10"
+    assert response.headers["content-range"] == f"bytes 10-19/{SIZE}"
+    assert client.head("/file.bin").headers["content-length"] == str(SIZE)
+
+
+def test_empty_file(client):
+    response = client.get("/empty.bin")
+    assert response.status_code == 200
+    assert response.content == b""
+    assert response.headers["content-length"] == "0"
+    assert client.get("/empty.bin", headers={"Range": "bytes=0-"}).status_code == 416
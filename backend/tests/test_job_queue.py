@@ -0,0 +1,171 @@
+"""Job queue: claiming due jobs once, visibility timeouts, retries with backoff."""
+import asyncio
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import delete, update
+from sqlalchemy.dialects import postgresql
+
+from app.database import AsyncSessionLocal
+from app.jobs import queue
+from app.jobs.queue import HANDLERS, claim_jobs, complete_job, enqueue, fail_job, utcnow
+from app.jobs.rollup import as_utc
+from app.jobs.worker import run_job
+from app.models.job import Job
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture(autouse=True)
+def empty_queue():
+    # Other tests leave jobs behind (media inspection, deletions)
+    async def clear():
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(Job))
+            await db.commit()
+
+    run(clear())
+
+
+async def add_jobs(*jobs):
+    """Enqueue ``(kind, delay, max_attempts)`` jobs; returns their ids."""
+    async with AsyncSessionLocal() as db:
+        added = [enqueue(db, kind, {"n": n}, delay=delay, max_attempts=attempts)
+                 for n, (kind, delay, attempts) in enumerate(jobs)]
+        await db.commit()
+        return [job.id for job in added]
+
+
+async def claim(limit=10):
+    async with AsyncSessionLocal() as db:
+        return await claim_jobs(db, limit)
+
+
+async def load(job_id):
+    async with AsyncSessionLocal() as db:
+        return await db.get(Job, job_id)
+
+
+async def set_job(job_id, **values):
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(Job).where(Job.id == job_id).values(**values))
+        await db.commit()
+
+
+def test_claim_takes_due_jobs_once_in_run_at_order():
+    later, first, second = run(add_jobs(("test", 60, None), ("test", -2, None), ("test", -1, None)))
+
+    claimed = run(claim())
+    assert [job.id for job in claimed] == [first, second]
+    job = claimed[0]
+    assert (job.status, job.attempts) == ("running", 1)
+    assert as_utc(job.locked_until) > utcnow() + timedelta(seconds=queue.JOB_VISIBILITY_TIMEOUT - 60)
+    # Claimed jobs (and jobs not due yet) are not handed out again
+    assert run(claim()) == []
+    assert run(load(later)).status == "queued"
+
+
+def test_claim_limit():
+    ids = run(add_jobs(*[("test", -10 + n, None) for n in range(5)]))
+    assert [job.id for job in run(claim(2))] == ids[:2]
+    assert [job.id for job in run(claim(10))] == ids[2:]
+
+
+def test_claim_skips_rows_locked_by_other_workers():
+    captured = []
+
+    class Result:
+        def all(self):
+            return []
+
+    class Session:
+        async def scalars(self, stmt):
+            captured.append(stmt)
+            return Result()
+
+        async def commit(self):
+            pass
+
+    run(claim_jobs(Session(), 3))
+    sql = str(captured[0].compile(dialect=postgresql.dialect()))
+    assert "FOR UPDATE SKIP LOCKED" in sql
+
+
+def test_expired_visibility_timeout_makes_a_job_claimable_again():
+    job_id, = run(add_jobs(("test", 0, None)))
+    stale, = run(claim())
+    run(set_job(job_id, locked_until=utcnow() - timedelta(seconds=1)))
+
+    reclaimed, = run(claim())
+    assert reclaimed.id == job_id
+    assert reclaimed.attempts == 2
+
+    async def complete(job):
+        async with AsyncSessionLocal() as db:
+            await complete_job(db, job)
+
+    # The first worker finishing late doesn't remove the job from under the second
+    run(complete(stale))
+    assert run(load(job_id)) is not None
+    run(complete(reclaimed))
+    assert run(load(job_id)) is None
+
+
+def test_failed_job_is_retried_with_backoff_then_given_up():
+    job_id, = run(add_jobs(("test", 0, 2)))
+
+    async def fail(job):
+        async with AsyncSessionLocal() as db:
+            await fail_job(db, job, "boom")
+
+    job, = run(claim())
+    run(fail(job))
+    retried = run(load(job_id))
+    assert (retried.status, retried.last_error, retried.locked_until) == ("queued", "boom", None)
+    assert as_utc(retried.run_at) >= utcnow() + timedelta(seconds=queue.JOB_RETRY_BASE_DELAY / 2 - 5)
+    # Not due until the backoff has passed
+    assert run(claim()) == []
+
+    run(set_job(job_id, run_at=utcnow() - timedelta(seconds=1)))
+    job, = run(claim())
+    assert job.attempts == 2
+    run(fail(job))
+    failed = run(load(job_id))
+    assert failed.status == "failed"
+    assert failed.finished_at is not None
+    assert run(claim()) == []
+
+
+def test_retry_delay_grows_and_is_capped(monkeypatch):
+    monkeypatch.setattr(queue, "JOB_RETRY_BASE_DELAY", 10)
+    monkeypatch.setattr(queue, "JOB_RETRY_MAX_DELAY", 60)
+    for attempts, ceiling in [(1, 10), (2, 20), (3, 40), (4, 60), (10, 60)]:
+        delay = queue.retry_delay(attempts)
+        assert ceiling / 2 <= delay <= ceiling
+
+
+def test_worker_runs_completes_and_fails_jobs(monkeypatch):
+    calls = []
+
+    async def succeed(payload):
+        calls.append(payload)
+
+    async def explode(payload):
+        raise RuntimeError("handler failed")
+
+    monkeypatch.setitem(HANDLERS, "test.ok", succeed)
+    monkeypatch.setitem(HANDLERS, "test.error", explode)
+    ok, error, unknown = run(add_jobs(("test.ok", 0, None), ("test.error", 0, None), ("test.unknown", 0, None)))
+
+    async def work():
+        for job in await claim():
+            await run_job(job)
+
+    run(work())
+    assert calls == [{"n": 0}]
+    assert run(load(ok)) is None
+    assert run(load(error)).status == "queued"
+    assert "handler failed" in run(load(error)).last_error
+    assert run(load(unknown)).status == "failed"
@@ -0,0 +1,113 @@
+"""The /metrics exposition parses, and snapshots of several processes add up per label."""
+import json
+import math
+import os
+import re
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.utils.metrics import Counter, Gauge, Histogram, Registry, merge_snapshots, read_snapshots, render
+
+_NAME = r"[a-zA-Z_:][a-zA-Z0-9_:]*"
+_LABEL = re.compile(r'\s*([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\\n]|\\[\\"n])*)"\s*(,|$)')
+_SAMPLE = re.compile(rf"^({_NAME})(?:\{{(.*)\}})? (\S+)$")
+_SUFFIXES = {"histogram": ("_bucket", "_sum", "_count")}
+
+
+def _unescape(value):
+    return re.sub(r"\\(.)", lambda m: "\n" if m.group(1) == "n" else m.group(1), value)
+
+
+def parse_exposition(text):
+    """Samples of a text exposition as {(name, labels): value}; asserts it is well formed."""
+    assert text.endswith("\n")
+    types, samples = {}, {}
+    for line in text[:-1].split("\n"):
+        if line.startswith("# HELP "):
+            assert re.match(rf"^# HELP {_NAME} ", line + " "), line
+            continue
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            assert kind in ("counter", "gauge", "histogram", "summary", "untyped"), line
+            assert name not in types, f"{name} typed twice"
+            types[name] = kind
+            continue
+        match = _SAMPLE.match(line)
+        assert match, f"not a sample: {line!r}"
+        name, raw_labels, raw_value = match.groups()
+        family = next(
+            (family for family, kind in types.items()
+             if name == family or name in (family + suffix for suffix in _SUFFIXES.get(kind, ()))),
+            None
+        )
+        assert family is not None, f"{name} has no TYPE before it"
+        labels, rest = {}, raw_labels or ""
+        while rest:
+            label = _LABEL.match(rest)
+            assert label, f"bad labels in {line!r}"
+            labels[label.group(1)] = _unescape(label.group(2))
+            rest = rest[label.end():]
+        value = float(raw_value.replace("Inf", "inf"))
+        key = (name, frozenset(labels.items()))
+        assert key not in samples, f"duplicate sample {line!r}"
+        samples[key] = value
+    return samples
+
+
+def sample(samples, name, **labels):
+    return samples[(name, frozenset(labels.items()))]
+
+
+def write_process_snapshot(directory, pid, requests, latencies, in_progress, live=True):
+    registry = Registry()
+    counter = Counter("test_requests_total", "Requests", ("method", "route"), registry=registry)
+    histogram = Histogram("test_latency_seconds", "Latency", ("route",), buckets=(0.1, 1), registry=registry)
+    gauge = Gauge("test_in_progress", "Requests in progress", registry=registry)
+    for (method, route), count in requests.items():
+        counter.labels(method, route).inc(count)
+    for route, value in latencies:
+        histogram.labels(route).observe(value)
+    gauge.set(in_progress)
+    path = os.path.join(directory, f"{pid}.json")
+    with open(path, "w") as f:
+        json.dump(registry.snapshot(), f)
+    if not live:
+        os.utime(path, (0, 0))
+
+
+def test_metrics_endpoint_parses():
+    with TestClient(app) as client:
+        client.get("/health")
+        response = client.get("/metrics")
+    assert response.status_code == 200
+    samples = parse_exposition(response.text)
+    assert sample(samples, "http_requests_total", method="GET", route="/health", status="200") >= 1
+    count = sample(samples, "http_request_duration_seconds_count", method="GET", route="/health")
+    assert sample(samples, "http_request_duration_seconds_bucket", method="GET", route="/health", le="+Inf") == count
+
+
+def test_snapshots_aggregate_per_label(tmp_path):
+    odd_route = '/a"b\\c'
+    write_process_snapshot(
+        tmp_path, 101, {("GET", "/a"): 3, ("POST", "/a"): 1}, [("/a", 0.05), ("/a", 0.5)], in_progress=2
+    )
+    write_process_snapshot(
+        tmp_path, 102, {("GET", "/a"): 2, ("GET", odd_route): 4}, [("/a", 5), (odd_route, 0.05)],
+        in_progress=7, live=False
+    )
+
+    samples = parse_exposition(render(merge_snapshots(read_snapshots(str(tmp_path)))))
+
+    assert sample(samples, "test_requests_total", method="GET", route="/a") == 5
+    assert sample(samples, "test_requests_total", method="POST", route="/a") == 1
+    assert sample(samples, "test_requests_total", method="GET", route=odd_route) == 4
+    # Cumulative buckets: 0.05 | 0.5 | 5 for /a
+    assert sample(samples, "test_latency_seconds_bucket", route="/a", le="0.1") == 1
+    assert sample(samples, "test_latency_seconds_bucket", route="/a", le="1") == 2
+    assert sample(samples, "test_latency_seconds_bucket", route="/a", le="+Inf") == 3
+    assert sample(samples, "test_latency_seconds_count", route="/a") == 3
+    assert math.isclose(sample(samples, "test_latency_seconds_sum", route="/a"), 5.55)
+    assert sample(samples, "test_latency_seconds_count", route=odd_route) == 1
+    # Gauges only come from processes that wrote recently
+    assert sample(samples, "test_in_progress") == 2
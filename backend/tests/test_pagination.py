@@ -0,0 +1,87 @@
+"""Keyset pagination: cursors round-trip, and paging through ties on the timestamp loses or repeats nothing."""
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import SessionLocal
+from app.main import app
+from app.models.submission import SurveySubmission
+from app.models.survey import Survey
+from app.utils.pagination import InvalidCursorError, decode_cursor, encode_cursor
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+def pages(client, url, key, limit):
+    """Ids of every row, following ``next_cursor`` page by page."""
+    ids, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = client.get(url, params=params)
+        assert response.status_code == 200
+        body = response.json()
+        assert len(body[key]) <= limit
+        ids += [row["id"] for row in body[key]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+def test_cursor_round_trip():
+    timestamp = datetime(2024, 3, 1, 12, 30, 5, 123456)
+    cursor = encode_cursor(timestamp, 42)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (timestamp, 42)
+
+
+@pytest.mark.parametrize("cursor", ["", "not base64!", encode_cursor(datetime(2024, 1, 1), 1)[:-3], "WzFd"])
+def test_invalid_cursor(client, cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor)
+    if cursor:
+        assert client.get("/api/surveys", params={"cursor": cursor}).status_code == 400
+
+
+def test_submission_pages_with_tied_start_times(client, create_submission):
+    survey_id, _, first_id = create_submission()
+    base = datetime(2024, 5, 1, 9, 0, 0)
+    # Ties on whole seconds and on microseconds, and
+    # neighbours a microsecond apart; inserted out of order so ids don't follow time
+    started = [base + timedelta(microseconds=500_000), base, base + timedelta(seconds=1),
+               base + timedelta(microseconds=1), base, base + timedelta(seconds=1),
+               base + timedelta(microseconds=1), base]
+    db = SessionLocal()
+    try:
+        db.get(SurveySubmission, first_id).started_at = base - timedelta(days=1)
+        rows = [SurveySubmission(survey_id=survey_id, ip_address="127.0.0.1", started_at=at) for at in started]
+        db.add_all(rows)
+        db.commit()
+        expected = [row.id for row in sorted(rows, key=lambda row: (row.started_at, row.id), reverse=True)]
+    finally:
+        db.close()
+    expected.append(first_id)
+
+    for limit in (1, 2, 3, len(expected)):
+        assert pages(client, f"/api/surveys/{survey_id}/submissions", "submissions", limit) == expected
+
+
+def test_survey_pages_with_tied_creation_times(client):
+    # Created in one transaction: the same server-default created_at
+    db = SessionLocal()
+    try:
+        surveys = [Survey(title=f"Tied {n}", is_active=True) for n in range(5)]
+        db.add_all(surveys)
+        db.commit()
+        created = {survey.id for survey in surveys}
+    finally:
+        db.close()
+
+    for limit in (1, 2, 4):
+        ids = pages(client, "/api/surveys", "surveys", limit)
+        assert len(ids) == len(set(ids))
+        assert [survey_id for survey_id in ids if survey_id in created] == sorted(created, reverse=True)
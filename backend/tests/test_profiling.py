@@ -0,0 +1,29 @@
+"""Server-Timing counts each SQL statement once and times response serialization."""
+import re
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.database import async_engine
+from app.main import app
+
+
+def test_server_timing_reports_queries_and_serialization():
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with TestClient(app) as client:
+        survey_id = client.post("/api/surveys", json={"title": "Timed"}).json()["id"]
+        event.listen(async_engine.sync_engine, "after_cursor_execute", count)
+        try:
+            response = client.get(f"/api/surveys/{survey_id}")
+        finally:
+            event.remove(async_engine.sync_engine, "after_cursor_execute", count)
+
+    assert response.status_code == 200
+    header = response.headers["server-timing"]
+    assert re.search(r'db;dur=[\d.]+;desc="(\d+) queries"', header).group(1) == str(len(statements))
+    assert statements
+    assert re.search(r"serialize;dur=[\d.]+", header)
@@ -0,0 +1,22 @@
+"""SQL statements per endpoint stay within ``QUERY_BUDGETS`` and don't grow with the data."""
+import pytest
+from fastapi.testclient import TestClient
+
+from benchmarks.query_budget import QUERY_BUDGETS, check, measure, seed
+from app.database import engine
+from app.main import app
+
+
+@pytest.fixture(scope="module")
+def statuses():
+    # seed() drops every table
+    assert engine.url.get_backend_name() == "sqlite"
+    client = TestClient(app)
+    small = measure(client, seed(2, 3))
+    large = measure(client, seed(10, 30))
+    return check(small, large)
+
+
+@pytest.mark.parametrize("key", list(QUERY_BUDGETS), ids=lambda key: " ".join(key))
+def test_query_budget(statuses, key):
+    assert statuses[key] == "ok"
@@ -0,0 +1,54 @@
+"""Media reconciliation matches stored files to rows by what the paths point at."""
+import asyncio
+import os
+
+from app.database import SessionLocal
+from app.jobs import reconcile
+from app.models.submission import MediaFile, SurveySubmission
+from app.models.survey import Survey
+from app.utils.media import ensure_media_directories
+
+
+def write_old_file(path):
+    with open(path, "wb") as f:
+        f.write(b"media")
+    # Past any grace period
+    os.utime(path, (0, 0))
+
+
+def test_rows_written_with_another_media_root_spelling_are_referenced(monkeypatch, tmp_path):
+    # A media root of its own: files other tests leave behind may have lost their rows
+    media_root = str(tmp_path / "media")
+    # The same directory, spelled relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("MEDIA_ROOT", "./media")
+    ensure_media_directories()
+    referenced = f"{media_root}/images/reconcile_referenced.png"
+    orphan = f"{media_root}/images/reconcile_orphan.png"
+    write_old_file(referenced)
+    write_old_file(orphan)
+
+    db = SessionLocal()
+    try:
+        submission = SurveySubmission(survey=Survey(title="Reconcile", is_active=True), ip_address="127.0.0.1")
+        submission.media_files = [MediaFile(type="image", path=referenced, question_number=1)]
+        db.add(submission)
+        db.commit()
+    finally:
+        db.close()
+
+    async def run_pass():
+        state = reconcile.new_reconcile_state(delete=True, grace=0)
+        while await reconcile.reconcile_step(state):
+            pass
+        return reconcile.ReconcileReport(**state["report"])
+
+    report = asyncio.run(run_pass())
+    assert os.path.exists(referenced)
+    assert not os.path.exists(orphan)
+    assert report.deleted_files == 1
+
+
+def test_scheduled_passes_only_report_by_default():
+    assert "MEDIA_GC_DELETE" not in os.environ
+    assert reconcile.MEDIA_GC_DELETE is False
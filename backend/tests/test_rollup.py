@@ -0,0 +1,127 @@
+"""Submission rollups: every start and completion is counted once, including rows committed late."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, select
+
+from app.database import AsyncSessionLocal, SessionLocal
+from app.jobs import rollup
+from app.jobs.rollup import as_utc, rollup_step
+from app.main import app
+from app.models.analytics import HourlySubmissionRollup, RollupWatermark
+from app.models.submission import SurveySubmission
+
+# Far past anything other tests write, so only this test's rows are past the watermarks
+T0 = datetime(2100, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Set the rollup job's current time; the watermarks start at ``T0``."""
+    monkeypatch.setattr(rollup, "ROLLUP_LAG", 120)
+    db = SessionLocal()
+    try:
+        # Rows of earlier tests here would be read again
+        db.execute(delete(SurveySubmission).where(SurveySubmission.started_at >= T0))
+        db.execute(delete(RollupWatermark))
+        db.add_all([RollupWatermark(name=name, position_at=T0, position_id=0) for name in rollup.STREAMS])
+        db.commit()
+    finally:
+        db.close()
+
+    def set_now(minutes):
+        monkeypatch.setattr(rollup, "utcnow", lambda: T0 + timedelta(minutes=minutes))
+
+    return set_now
+
+
+def add(survey_id, started, completed=None, overall_score=None, device="Desktop"):
+    """Commit a submission started (and completed) the given minutes after ``T0``."""
+    db = SessionLocal()
+    try:
+        submission = SurveySubmission(
+            survey_id=survey_id, ip_address="127.0.0.1", device=device,
+            started_at=T0 + timedelta(minutes=started),
+            completed_at=T0 + timedelta(minutes=completed) if completed is not None else None,
+            overall_score=overall_score
+        )
+        db.add(submission)
+        db.commit()
+        return submission.id
+    finally:
+        db.close()
+
+
+def step():
+    async def run():
+        async with AsyncSessionLocal() as db:
+            return await rollup_step(db)
+
+    return asyncio.run(run())
+
+
+def counted(survey_id):
+    """``(starts, completions, scored, overall_score_sum)`` over the survey's hourly rows."""
+    db = SessionLocal()
+    try:
+        rows = db.scalars(select(HourlySubmissionRollup).where(HourlySubmissionRollup.survey_id == survey_id)).all()
+        return tuple(sum(getattr(row, name) for row in rows) for name in ("starts", "completions", "scored", "overall_score_sum"))
+    finally:
+        db.close()
+
+
+def test_rows_committed_late_within_the_lag_are_counted_once(client, create_submission, clock):
+    survey_id, _, _ = create_submission()
+    add(survey_id, started=1, completed=5, overall_score=80)
+    add(survey_id, started=9)
+
+    clock(10)
+    assert step() is False
+    # The start at 9 minutes is younger than the lag and waits
+    assert counted(survey_id) == (1, 1, 1, 80)
+
+    # Committed after that run, but stamped before the newest row already seen
+    add(survey_id, started=8.5, completed=9.5)
+    clock(20)
+    step()
+    assert counted(survey_id) == (3, 2, 1, 80)
+
+    # Nothing is counted twice however often the job runs
+    step()
+    clock(60)
+    step()
+    assert counted(survey_id) == (3, 2, 1, 80)
+
+    response = client.get(f"/api/surveys/{survey_id}/timeseries", params={
+        "interval": "hour", "start": T0.isoformat(), "end": (T0 + timedelta(hours=1)).isoformat()
+    })
+    assert response.status_code == 200
+    body = response.json()
+    assert as_utc(datetime.fromisoformat(body["complete_until"].replace("Z", "+00:00"))) == T0 + timedelta(minutes=58)
+    assert [(point["starts"], point["completions"]) for point in body["points"]] == [(3, 2)]
+
+
+def test_full_batches_resume_after_the_last_row_read(create_submission, clock, monkeypatch):
+    monkeypatch.setattr(rollup, "ROLLUP_BATCH_SIZE", 2)
+    survey_id, _, _ = create_submission()
+    # Ties on the timestamp straddle the batch boundaries
+    for device in ("Desktop", "Mobile", "Tablet", "Desktop", "Mobile"):
+        add(survey_id, started=3, completed=4, device=device)
+
+    clock(30)
+    runs = 1
+    while step():
+        runs += 1
+    assert runs == 3
+    assert counted(survey_id) == (5, 5, 0, 0)
+
+    step()
+    assert counted(survey_id) == (5, 5, 0, 0)
@@ -0,0 +1,128 @@
+"""Resumable uploads: chunk offsets, conflicts and finalizing."""
+import asyncio
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import uploads
+from app.database import SessionLocal
+from app.main import app
+from app.models.submission import MediaFile, SurveySubmission
+from app.models.survey import Survey
+from app.utils.media import get_upload_session_path, locked_upload_part
+
+
+@pytest.fixture(scope="module")
+def client():
+    # Entering the client runs the startup handlers (media directories)
+    with TestClient(app, raise_server_exceptions=False) as client:
+        yield client
+
+
+@pytest.fixture
+def submission_id():
+    db = SessionLocal()
+    try:
+        submission = SurveySubmission(survey=Survey(title="Uploads", is_active=True), ip_address="127.0.0.1")
+        db.add(submission)
+        db.commit()
+        return submission.id
+    finally:
+        db.close()
+
+
+def start_upload(client, submission_id, total_size):
+    response = client.post(
+        f"/api/submissions/{submission_id}/uploads", json={"type": "video", "total_size": total_size}
+    )
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def test_failed_finalize_keeps_the_upload(client, submission_id, monkeypatch):
+    upload_id = start_upload(client, submission_id, 4)
+    assert client.put(f"/api/uploads/{upload_id}", params={"offset": 0}, content=b"data").status_code == 200
+    part_path = get_upload_session_path(upload_id)
+
+    def fail(db, media_file_id):
+        raise RuntimeError("queue unavailable")
+
+    monkeypatch.setattr(uploads, "enqueue_media_inspection", fail)
+    assert client.post(f"/api/uploads/{upload_id}/finalize").status_code == 500
+    assert os.path.exists(part_path)
+    monkeypatch.undo()
+
+    response = client.post(f"/api/uploads/{upload_id}/finalize")
+    assert response.status_code == 201
+    assert not os.path.exists(part_path)
+    db = SessionLocal()
+    try:
+        path = db.get(MediaFile, response.json()["id"]).path
+    finally:
+        db.close()
+    with open(path, "rb") as f:
+        assert f.read() == b"data"
+
+
+def put_chunk(client, upload_id, offset, content):
+    return client.put(f"/api/uploads/{upload_id}", params={"offset": offset}, content=content)
+
+
+def test_chunks_append_at_the_current_offset(client, submission_id):
+    upload_id = start_upload(client, submission_id, 10)
+    assert put_chunk(client, upload_id, 0, b"01234").json()["offset"] == 5
+    assert put_chunk(client, upload_id, 5, b"56789").json()["offset"] == 10
+    assert client.get(f"/api/uploads/{upload_id}").json()["offset"] == 10
+    with open(get_upload_session_path(upload_id), "rb") as f:
+        assert f.read() == b"0123456789"
+
+
+@pytest.mark.parametrize("offset", [0, 3, 6])
+def test_chunk_at_another_offset_conflicts(client, submission_id, offset):
+    upload_id = start_upload(client, submission_id, 10)
+    put_chunk(client, upload_id, 0, b"01234")
+    response = put_chunk(client, upload_id, offset, b"xx")
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Offset mismatch. Current offset is 5"
+    # The rejected chunk left the file and the offset alone
+    assert client.get(f"/api/uploads/{upload_id}").json()["offset"] == 5
+    assert os.path.getsize(get_upload_session_path(upload_id)) == 5
+
+
+def test_chunk_while_another_is_written_conflicts(client, submission_id):
+    upload_id = start_upload(client, submission_id, 10)
+
+    async def put_while_locked():
+        async with locked_upload_part(get_upload_session_path(upload_id)):
+            # The app runs on the client's own thread and loop
+            return put_chunk(client, upload_id, 0, b"01234"), client.post(f"/api/uploads/{upload_id}/finalize")
+
+    chunk, finalize = asyncio.run(put_while_locked())
+    assert chunk.status_code == 409
+    assert finalize.status_code == 409
+    assert client.get(f"/api/uploads/{upload_id}").json()["offset"] == 0
+    assert put_chunk(client, upload_id, 0, b"01234").status_code == 200
+
+
+def test_chunk_past_declared_size_is_rejected(client, submission_id):
+    upload_id = start_upload(client, submission_id, 4)
+    assert put_chunk(client, upload_id, 0, b"01234").status_code == 400
+    assert client.get(f"/api/uploads/{upload_id}").json()["offset"] == 0
+
+
+def test_finalize(client, submission_id):
+    upload_id = start_upload(client, submission_id, 6)
+    put_chunk(client, upload_id, 0, b"abc")
+    response = client.post(f"/api/uploads/{upload_id}/finalize")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Upload incomplete. Received 3 of 6 bytes"
+
+    put_chunk(client, upload_id, 3, b"def")
+    first = client.post(f"/api/uploads/{upload_id}/finalize")
+    assert first.status_code == 201
+    assert first.json()["size_bytes"] == 6
+    # A retried finalize returns the same file; more chunks are refused
+    assert client.post(f"/api/uploads/{upload_id}/finalize").json()["id"] == first.json()["id"]
+    assert put_chunk(client, upload_id, 6, b"g").status_code == 409
+    assert client.get(f"/api/uploads/{upload_id}").json()["status"] == "completed"
@@ -0,0 +1,11 @@
+"""User-agent classification matches the labelled corpus of ``bench_user_agent``."""
+import pytest
+
+from benchmarks.bench_user_agent import CORPUS
+from app.utils.metadata import extract_user_agent_info
+
+
+@pytest.mark.parametrize("user_agent,device,browser,os_name", CORPUS, ids=[ua[:60] for ua, *_ in CORPUS])
+def test_classification(user_agent, device, browser, os_name):
+    info = extract_user_agent_info(user_agent)
+    assert (info["device"], info["browser"], info["os"]) == (device, browser, os_name)
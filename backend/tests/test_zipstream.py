@@ -0,0 +1,114 @@
+"""Streamed ZIP archives read back with zipfile, and the submission export built on them."""
+import asyncio
+import io
+import json
+import os
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import SessionLocal
+from app.main import app
+from app.models.submission import MediaFile, SurveyAnswer, SurveySubmission
+from app.models.survey import Survey, SurveyQuestion
+from app.utils import zipstream
+from app.utils.zipstream import ZipEntry, stream_zip
+
+
+def build_zip(entries, **kwargs):
+    async def collect():
+        return [chunk async for chunk in stream_zip(entries, **kwargs)]
+
+    return asyncio.run(collect())
+
+
+async def produce(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+def write_file(path, content):
+    with open(path, "wb") as f:
+        f.write(content)
+    return str(path)
+
+
+@pytest.mark.parametrize("prefetch", [0, 2])
+def test_members_of_every_kind(tmp_path, monkeypatch, prefetch):
+    # Small chunks, and the large file too big to prefetch, so both file paths run
+    monkeypatch.setattr(zipstream, "ZIP_CHUNK_SIZE", 1000)
+    monkeypatch.setattr(zipstream, "PREFETCH_MAX_SIZE", 4000)
+    large = os.urandom(10_000)
+    entries = [
+        ZipEntry("metadata.json", data=b'{"a": 1}'),
+        ZipEntry("images/small.png", path=write_file(tmp_path / "small.png", b"small")),
+        ZipEntry("videos/large.mp4", path=write_file(tmp_path / "large.mp4", large)),
+        ZipEntry("missing.png", path=str(tmp_path / "missing.png")),
+        ZipEntry("empty.png", path=write_file(tmp_path / "empty.png", b"")),
+        ZipEntry("answers.csv", chunks=produce(b"id,answer\n", b"", b"1,Yes\n")),
+        ZipEntry("näme.txt", data=b""),
+    ]
+
+    chunks = build_zip(entries, prefetch=prefetch)
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+
+    assert archive.testzip() is None
+    assert archive.namelist() == [
+        "metadata.json", "images/small.png", "videos/large.mp4", "answers.csv", "näme.txt"
+    ]
+    assert archive.read("videos/large.mp4") == large
+    assert archive.read("images/small.png") == b"small"
+    assert archive.read("answers.csv") == b"id,answer\n1,Yes\n"
+    # The large file went out in pieces rather than as one buffer
+    assert max(len(chunk) for chunk in chunks) < len(large)
+
+
+def test_zip64_end_records_for_many_members(monkeypatch):
+    monkeypatch.setattr(zipstream, "ZIP64_COUNT_LIMIT", 3)
+    entries = [ZipEntry(f"{n}.txt", data=str(n).encode()) for n in range(5)]
+
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(build_zip(entries))))
+
+    assert archive.testzip() is None
+    assert [archive.read(f"{n}.txt") for n in range(5)] == [str(n).encode() for n in range(5)]
+
+
+def test_submission_export(tmp_path):
+    video = write_file(tmp_path / "session.mp4", b"video bytes")
+    face = write_file(tmp_path / "face.png", b"face bytes")
+    db = SessionLocal()
+    try:
+        survey = Survey(title="Export", is_active=True)
+        survey.questions = [SurveyQuestion(question_text=f"Question {order}", order=order) for order in (1, 2)]
+        submission = SurveySubmission(survey=survey, ip_address="127.0.0.1", device="Desktop")
+        submission.answers = [
+            SurveyAnswer(question=survey.questions[1], answer="No", face_detected=False),
+            SurveyAnswer(question=survey.questions[0], answer="Yes", face_detected=True, face_score=88.0),
+        ]
+        submission.media_files = [
+            MediaFile(type="video", path=video),
+            MediaFile(type="image", path=face, question_number=1),
+        ]
+        db.add(submission)
+        db.commit()
+        submission_id = submission.id
+    finally:
+        db.close()
+
+    with TestClient(app) as client:
+        response = client.get(f"/api/submissions/{submission_id}/export")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert archive.testzip() is None
+    assert sorted(archive.namelist()) == ["images/q1_face.png", "metadata.json", "videos/full_session.mp4"]
+    assert archive.read("videos/full_session.mp4") == b"video bytes"
+    assert archive.read("images/q1_face.png") == b"face bytes"
+    metadata = json.loads(archive.read("metadata.json"))
+    assert metadata["submission_id"] == str(submission_id)
+    assert [(r["question"], r["answer"], r["face_image"]) for r in metadata["responses"]] == [
+        ("Question 1", "Yes", "/images/q1_face.png"),
+        ("Question 2", "No", None),
+    ]
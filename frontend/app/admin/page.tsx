@@ -23,6 +23,8 @@ export default function AdminPage() {
   const [loading, setLoading] = useState(false);
   const [message, setMessage] = useState("");
   const [loadingSurveys, setLoadingSurveys] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   // Load all surveys on page load
   useEffect(() => {
@@ -32,8 +34,9 @@ export default function AdminPage() {
   const loadAllSurveys = async () => {
     try {
       setLoadingSurveys(true);
-      const loadedSurveys = await surveyApi.list();
-      setSurveys(loadedSurveys);
+      const page = await surveyApi.list();
+      setSurveys(page.surveys);
+      setNextCursor(page.next_cursor);
     } catch (error: any) {
       console.error("Failed to load surveys:", error);
       setMessage("Failed to load surveys");
@@ -42,6 +45,21 @@ export default function AdminPage() {
     }
   };
 
+  const loadMoreSurveys = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const page = await surveyApi.list({ cursor: nextCursor });
+      setSurveys((current) => [...current, ...page.surveys]);
+      setNextCursor(page.next_cursor);
+    } catch (error: any) {
+      console.error("Failed to load more surveys:", error);
+      setMessage("Failed to load more surveys");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const createSurvey = async () => {
     if (!newSurveyTitle.trim()) {
       setMessage("Please enter a survey title");
@@ -51,7 +69,7 @@ export default function AdminPage() {
     setLoading(true);
     try {
       const survey = await surveyApi.create(newSurveyTitle);
-      setSurveys([...surveys, survey]);
+      setSurveys([survey, ...surveys]);
       setNewSurveyTitle("");
       setMessage("Survey created successfully!");
     } catch (error: any) {
@@ -265,6 +283,21 @@ export default function AdminPage() {
                     </div>
                   </div>
                 ))}
+                {nextCursor && (
+                  <div className="flex justify-center pt-2">
+                    <Button
+                      variant="outline"
+                      size="sm"
+                      onClick={loadMoreSurveys}
+                      disabled={loadingMore}
+                    >
+                      {loadingMore && (
+                        <Loader2 className="w-4 h-4 mr-2 animate-spin" />
+                      )}
+                      Load More
+                    </Button>
+                  </div>
+                )}
               </div>
             )}
           </CardContent>
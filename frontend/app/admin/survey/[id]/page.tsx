@@ -46,6 +46,9 @@ export default function SurveyDetailPage() {
   const surveyId = parseInt(params.id as string);
   const [survey, setSurvey] = useState<any>(null);
   const [responses, setResponses] = useState<any[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [totalResponses, setTotalResponses] = useState<number | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [expandedResponses, setExpandedResponses] = useState<Set<number>>(
     new Set()
   );
@@ -66,9 +69,13 @@ export default function SurveyDetailPage() {
       const surveyData = await surveyApi.get(surveyId);
       setSurvey(surveyData);
 
-      // Load responses (submissions)
-      const submissionsData = await submissionApi.getBySurvey(surveyId);
+      // Load the first page of responses (submissions)
+      const submissionsData = await submissionApi.getBySurvey(surveyId, {
+        include_total: true,
+      });
       setResponses(submissionsData.submissions || []);
+      setNextCursor(submissionsData.next_cursor ?? null);
+      setTotalResponses(submissionsData.total ?? null);
     } catch (err: any) {
       console.error("Failed to load data:", err);
       setError(err.response?.data?.detail || "Failed to load survey data");
@@ -77,6 +84,29 @@ export default function SurveyDetailPage() {
     }
   };
 
+  const loadMoreResponses = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const submissionsData = await submissionApi.getBySurvey(surveyId, {
+        cursor: nextCursor,
+      });
+      setResponses((current) => [
+        ...current,
+        ...(submissionsData.submissions || []),
+      ]);
+      setNextCursor(submissionsData.next_cursor ?? null);
+    } catch (err: any) {
+      console.error("Failed to load more responses:", err);
+      alert(
+        "Failed to load more responses: " +
+          (err.response?.data?.detail || err.message)
+      );
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const togglePublish = async () => {
     if (!survey) return;
     try {
@@ -95,6 +125,7 @@ export default function SurveyDetailPage() {
     try {
       await submissionApi.delete(responseId);
       setResponses(responses.filter((r) => r.id !== responseId));
+      setTotalResponses((total) => (total !== null ? total - 1 : total));
     } catch (err: any) {
       console.error("Failed to delete response:", err);
       alert(
@@ -142,40 +173,8 @@ export default function SurveyDetailPage() {
 
   const downloadAllResponses = () => {
     if (!survey) return;
-    const data = {
-      survey: {
-        id: survey.id,
-        title: survey.title,
-        is_active: survey.is_active,
-        questions: survey.questions,
-      },
-      responses: responses.map((r) => ({
-        id: r.id,
-        submission_id: r.submission_id,
-        completed_at: r.completed_at,
-        overall_score: r.overall_score,
-        answers: r.answers,
-        metadata: {
-          ip_address: r.ip_address,
-          device: r.device,
-          browser: r.browser,
-          os: r.os,
-          location: r.location,
-        },
-      })),
-      exportedAt: new Date().toISOString(),
-    };
-    const blob = new Blob([JSON.stringify(data, null, 2)], {
-      type: "application/json",
-    });
-    const url = URL.createObjectURL(blob);
-    const a = document.createElement("a");
-    a.href = url;
-    a.download = `${survey.title
-      .replace(/\s+/g, "-")
-      .toLowerCase()}-responses.json`;
-    a.click();
-    URL.revokeObjectURL(url);
+    // The server streams a single ZIP (answers.csv + per-submission metadata and media)
+    window.location.href = surveyApi.exportUrl(survey.id);
   };
 
   if (loading) {
@@ -345,7 +344,7 @@ export default function SurveyDetailPage() {
         {/* Responses */}
         <div className="flex flex-col sm:flex-row sm:items-center sm:justify-between gap-3 mb-4">
           <h2 className="text-lg sm:text-xl font-bold">
-            Responses ({responses.length})
+            Responses ({totalResponses ?? responses.length})
           </h2>
           {responses.length > 0 && (
             <Button
@@ -506,6 +505,14 @@ export default function SurveyDetailPage() {
                                 Face Visible:{" "}
                                 {answer.face_detected ? "Yes" : "No"}
                               </span>
+                              {answer.server_face_detected != null && (
+                                <span>
+                                  Server Check:{" "}
+                                  {answer.server_face_detected
+                                    ? `Face found (${answer.server_face_score}%)`
+                                    : "No face found"}
+                                </span>
+                              )}
                             </div>
                           </div>
                         ))
@@ -521,6 +528,20 @@ export default function SurveyDetailPage() {
                 )}
               </Card>
             ))}
+            {nextCursor && (
+              <div className="flex justify-center">
+                <Button
+                  variant="outline"
+                  onClick={loadMoreResponses}
+                  disabled={loadingMore}
+                >
+                  {loadingMore && (
+                    <Loader2 className="w-4 h-4 mr-2 animate-spin" />
+                  )}
+                  Load More
+                </Button>
+              </div>
+            )}
           </div>
         )}
       </main>
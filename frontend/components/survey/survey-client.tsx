@@ -4,9 +4,13 @@ import { useState, useCallback, useEffect, useRef } from "react";
 import { CameraPermission } from "./camera-permission";
 import { SurveyQuestion } from "./survey-question";
 import { useRouter } from "next/navigation";
-import { submissionApi } from "@/lib/api";
+import { submissionApi, uploadApi } from "@/lib/api";
 import { FaceDetector, FaceDetectionResult } from "@/lib/faceDetection";
 import { VideoRecorder } from "@/lib/videoRecorder";
+import { ResumableUpload } from "@/lib/resumableUpload";
+
+// Send the full session video to the server every few seconds while recording
+const RECORDING_TIMESLICE_MS = 5000;
 
 interface SurveyClientProps {
   surveyId: number;
@@ -34,6 +38,7 @@ export function SurveyClient({
   const videoRef = useRef<HTMLVideoElement>(null);
   const faceDetectorRef = useRef<FaceDetector | null>(null);
   const fullSessionRecorderRef = useRef<VideoRecorder | null>(null);
+  const fullSessionUploadRef = useRef<ResumableUpload | null>(null);
   const streamRef = useRef<MediaStream | null>(null);
 
   // Start submission when permission is granted
@@ -118,8 +123,14 @@ export function SurveyClient({
             faceDetectorRef.current = detector;
 
             // Start full session recording (only one video required by assignment)
+            // Chunks are uploaded while recording so only the tail is left at the end
+            const fullUpload = new ResumableUpload(submissionId, "video");
+            fullSessionUploadRef.current = fullUpload;
             const fullRecorder = new VideoRecorder();
-            await fullRecorder.start(stream);
+            await fullRecorder.start(stream, {
+              timeslice: RECORDING_TIMESLICE_MS,
+              onChunk: (chunk) => fullUpload.append(chunk),
+            });
             fullSessionRecorderRef.current = fullRecorder;
 
             // Start recording duration timer
@@ -197,7 +208,7 @@ export function SurveyClient({
               }
             );
             // Await image upload to ensure face_image_path is set in database
-            await submissionApi.uploadMedia(
+            await uploadApi.uploadDirect(
               submissionId,
               imageFile,
               "image",
@@ -248,10 +259,16 @@ export function SurveyClient({
       // Stop full session recording
       if (fullSessionRecorderRef.current && streamRef.current) {
         const fullVideoBlob = await fullSessionRecorderRef.current.stop();
-        const fullVideoFile = new File([fullVideoBlob], "full_session.webm", {
-          type: "video/webm",
-        });
-        await submissionApi.uploadMedia(submissionId, fullVideoFile, "video");
+        try {
+          await fullSessionUploadRef.current!.finish();
+        } catch (err) {
+          // Fall back to a single upload of the whole recording
+          console.error("Resumable upload failed, uploading in one go:", err);
+          const fullVideoFile = new File([fullVideoBlob], "full_session.webm", {
+            type: "video/webm",
+          });
+          await uploadApi.uploadDirect(submissionId, fullVideoFile, "video");
+        }
       }
 
       // Calculate overall score
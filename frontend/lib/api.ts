@@ -30,6 +30,11 @@ export interface Survey {
   questions: Question[];
 }
 
+export interface SurveyPage {
+  surveys: Survey[];
+  next_cursor: string | null;
+}
+
 export interface Question {
   id: number;
   survey_id: number;
@@ -50,10 +55,60 @@ export interface AnswerSubmit {
   face_score: number | null;
 }
 
+export interface SubmissionListParams {
+  limit?: number;
+  cursor?: string;
+  completed?: boolean;
+  started_from?: string;
+  started_to?: string;
+  device?: string;
+  browser?: string;
+  location?: string;
+  min_score?: number;
+  max_score?: number;
+  include_total?: boolean;
+}
+
+export interface UploadSession {
+  id: string;
+  submission_id: number;
+  type: "video" | "image";
+  question_number: number | null;
+  offset: number;
+  total_size: number | null;
+  status: "active" | "completed";
+  media_file_id: number | null;
+  created_at: string;
+}
+
+export interface Deletion {
+  id: number;
+  target: "survey" | "submission";
+  target_id: number;
+  status: "deleting_rows" | "deleting_files" | "completed";
+  submissions_total: number;
+  submissions_deleted: number;
+  files_total: number;
+  files_deleted: number;
+  created_at: string;
+  finished_at: string | null;
+}
+
+export interface DirectUpload {
+  upload_id: string;
+  url: string;
+  method: string;
+  headers: Record<string, string>;
+  expires_at: string | null;
+}
+
 // Survey APIs
 export const surveyApi = {
-  list: async (): Promise<Survey[]> => {
-    const response = await api.get("/api/surveys");
+  // One page of surveys, newest first; pass next_cursor back as cursor
+  list: async (
+    params: { limit?: number; cursor?: string } = {}
+  ): Promise<SurveyPage> => {
+    const response = await api.get("/api/surveys", { params });
     return response.data;
   },
 
@@ -90,9 +145,31 @@ export const surveyApi = {
   },
 
   delete: async (surveyId: number) => {
-    const response = await api.delete(`/api/surveys/${surveyId}`);
+    // Hidden at once; rows and files are removed in the background
+    const response = await api.delete<Deletion>(`/api/surveys/${surveyId}`);
     return response.data;
   },
+
+  // URL of the streamed survey-wide ZIP export (navigate to it to download)
+  exportUrl: (
+    surveyId: number,
+    filters: {
+      completed_only?: boolean;
+      started_from?: string;
+      started_to?: string;
+      completed_from?: string;
+      completed_to?: string;
+    } = {}
+  ): string => {
+    const params = new URLSearchParams();
+    Object.entries(filters).forEach(([key, value]) => {
+      if (value !== undefined && value !== null) {
+        params.append(key, String(value));
+      }
+    });
+    const query = params.toString();
+    return `${API_URL}/api/surveys/${surveyId}/export${query ? `?${query}` : ""}`;
+  },
 };
 
 // Submission APIs
@@ -110,6 +187,15 @@ export const submissionApi = {
     return response.data;
   },
 
+  // Submit several answers at once (all or nothing)
+  submitAnswers: async (submissionId: number, answers: AnswerSubmit[]) => {
+    const response = await api.post(
+      `/api/submissions/${submissionId}/answers:batch`,
+      { answers }
+    );
+    return response.data;
+  },
+
   uploadMedia: async (
     submissionId: number,
     file: File,
@@ -156,13 +242,88 @@ export const submissionApi = {
     return response.data;
   },
 
-  getBySurvey: async (surveyId: number) => {
-    const response = await api.get(`/api/surveys/${surveyId}/submissions`);
+  // One page of submissions, newest first; pass next_cursor back as cursor
+  getBySurvey: async (surveyId: number, params: SubmissionListParams = {}) => {
+    const response = await api.get(`/api/surveys/${surveyId}/submissions`, {
+      params,
+    });
     return response.data;
   },
 
   delete: async (submissionId: number) => {
-    const response = await api.delete(`/api/submissions/${submissionId}`);
+    const response = await api.delete<Deletion>(`/api/submissions/${submissionId}`);
+    return response.data;
+  },
+};
+
+// Resumable upload APIs
+export const uploadApi = {
+  create: async (
+    submissionId: number,
+    type: "video" | "image",
+    questionNumber?: number,
+    totalSize?: number
+  ): Promise<UploadSession> => {
+    const response = await api.post(
+      `/api/submissions/${submissionId}/uploads`,
+      {
+        type,
+        question_number: questionNumber ?? null,
+        total_size: totalSize ?? null,
+      }
+    );
+    return response.data;
+  },
+
+  get: async (uploadId: string): Promise<UploadSession> => {
+    const response = await api.get(`/api/uploads/${uploadId}`);
+    return response.data;
+  },
+
+  putChunk: async (
+    uploadId: string,
+    offset: number,
+    chunk: Blob
+  ): Promise<UploadSession> => {
+    const response = await api.put(`/api/uploads/${uploadId}`, chunk, {
+      params: { offset },
+      headers: {
+        "Content-Type": "application/octet-stream",
+      },
+    });
+    return response.data;
+  },
+
+  finalize: async (uploadId: string) => {
+    const response = await api.post(`/api/uploads/${uploadId}/finalize`);
+    return response.data;
+  },
+
+  // Upload a whole file in one request: straight to storage when the backend
+  // presigns URLs (S3), otherwise to this API; then record it
+  uploadDirect: async (
+    submissionId: number,
+    file: File,
+    type: "video" | "image",
+    questionNumber?: number
+  ) => {
+    const { data: target } = await api.post<DirectUpload>(
+      `/api/submissions/${submissionId}/uploads/presign`,
+      {
+        type,
+        question_number: questionNumber ?? null,
+        size: file.size,
+        content_type: file.type,
+      }
+    );
+    // Plain axios: the URL is absolute and must get exactly the signed headers
+    await axios.request({
+      method: target.method,
+      url: target.url,
+      data: file,
+      headers: target.headers,
+    });
+    const response = await api.post(`/api/uploads/${target.upload_id}/confirm`);
     return response.data;
   },
 };
@@ -0,0 +1,93 @@
+import { uploadApi } from "./api";
+
+const MAX_RETRIES = 5;
+const RETRY_BASE_DELAY_MS = 500;
+
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
+/**
+ * Uploads a media file in pieces while it is still being produced
+ * (e.g. MediaRecorder timeslice chunks). Chunks are sent in order; anything
+ * not yet acknowledged by the server stays buffered and is retried, resuming
+ * from the server's offset, so a dropped connection never re-sends bytes the
+ * server already has.
+ */
+export class ResumableUpload {
+  private uploadId: string | null = null;
+  private offset = 0;
+  private buffer: Blob[] = [];
+  private queue: Promise<void>;
+
+  constructor(
+    private submissionId: number,
+    private type: "video" | "image",
+    private questionNumber?: number
+  ) {
+    this.queue = this.createSession();
+  }
+
+  private async createSession() {
+    const session = await uploadApi.create(
+      this.submissionId,
+      this.type,
+      this.questionNumber
+    );
+    this.uploadId = session.id;
+    this.offset = session.offset;
+  }
+
+  append(chunk: Blob) {
+    this.buffer.push(chunk);
+    this.queue = this.queue
+      .then(() => this.flush())
+      .catch((err) => {
+        // Keep the data buffered; it is retried with the next chunk or on finish
+        console.warn("Chunk upload failed, will retry:", err);
+      });
+  }
+
+  private async flush() {
+    if (!this.uploadId) {
+      await this.createSession();
+    }
+    if (this.buffer.length === 0) return;
+
+    const count = this.buffer.length;
+    await this.send(new Blob(this.buffer.slice(0, count)));
+    this.buffer.splice(0, count);
+  }
+
+  private async send(blob: Blob) {
+    const start = this.offset;
+    let remaining = blob;
+
+    for (let attempt = 0; ; attempt++) {
+      try {
+        const session = await uploadApi.putChunk(
+          this.uploadId!,
+          this.offset,
+          remaining
+        );
+        this.offset = session.offset;
+        return;
+      } catch (err) {
+        if (attempt >= MAX_RETRIES) throw err;
+        await sleep(RETRY_BASE_DELAY_MS * 2 ** attempt);
+
+        // Resync with the server and skip whatever part of this blob it already has
+        const session = await uploadApi.get(this.uploadId!);
+        const received = Math.max(0, session.offset - start);
+        remaining = blob.slice(received);
+        this.offset = session.offset;
+        if (remaining.size === 0) return;
+      }
+    }
+  }
+
+  /** Send any remaining data and turn the upload into a media file. */
+  async finish() {
+    await this.queue;
+    await this.flush();
+    return uploadApi.finalize(this.uploadId!);
+  }
+}
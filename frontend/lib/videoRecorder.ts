@@ -1,9 +1,15 @@
+export interface RecorderOptions {
+  // Emit a chunk every `timeslice` ms instead of one blob at the end
+  timeslice?: number
+  onChunk?: (chunk: Blob) => void
+}
+
 export class VideoRecorder {
   private mediaRecorder: MediaRecorder | null = null
   private recordedChunks: Blob[] = []
   private stream: MediaStream | null = null
 
-  async start(stream: MediaStream): Promise<void> {
+  async start(stream: MediaStream, recorderOptions: RecorderOptions = {}): Promise<void> {
     this.stream = stream
     this.recordedChunks = []
 
@@ -24,10 +30,11 @@ export class VideoRecorder {
     this.mediaRecorder.ondataavailable = (event) => {
       if (event.data && event.data.size > 0) {
         this.recordedChunks.push(event.data)
+        recorderOptions.onChunk?.(event.data)
       }
     }
 
-    this.mediaRecorder.start()
+    this.mediaRecorder.start(recorderOptions.timeslice)
   }
 
   stop(): Promise<Blob> {